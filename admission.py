@@ -0,0 +1,238 @@
+"""
+Admission control for expensive routes.
+
+Each route class gets, per worker process:
+  - a concurrency cap: requests beyond it wait up to max_wait seconds for a
+    slot, then get 429
+  - a priority share: the class may only fill that fraction of
+    ADMISSION_MAX_IN_FLIGHT across all classes, so proctoring frames (lowest)
+    can never take the slots submit_quiz (highest) needs
+  - token buckets: one for the class as a whole (rate/burst) and one per
+    client (client_rate/client_burst), refused with 429 + Retry-After
+
+Clients are the logged-in email, else the email/username being logged in
+with, else the remote address - a class behind one school NAT still gets
+separate buckets per student. Routes not listed in ROUTE_CLASSES (admin
+pages, static files, metrics) are never limited.
+
+Settings (environment):
+  ADMISSION_CONTROL         1 (default) to enforce, 0 to turn it off
+  ADMISSION_MAX_IN_FLIGHT   requests in flight per worker across all classes (default 64)
+  ADMISSION_<CLASS>_<FIELD> override one field of a class, e.g.
+                            ADMISSION_PROCTORING_MAX_CONCURRENT=2 or ADMISSION_AUTH_CLIENT_RATE=0.2
+                            (a rate of 0 means unlimited)
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, make_response, request, session
+
+import app_logging
+import metrics
+
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', '1') == '1'
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '64'))
+
+# Per-class limits; rates are requests per second (0 = unlimited)
+DEFAULT_CLASSES = {
+    # Graded answers - never crowded out, queues longest
+    'submit': {'max_concurrent': 32, 'max_wait': 15.0, 'share': 1.0,
+               'rate': 0, 'burst': 0, 'client_rate': 2.0, 'client_burst': 20},
+    # Password hashing (pbkdf2) is CPU bound - few at a time
+    'auth': {'max_concurrent': 4, 'max_wait': 10.0, 'share': 0.8,
+             'rate': 0, 'burst': 0, 'client_rate': 0.2, 'client_burst': 5},
+    'quiz': {'max_concurrent': 16, 'max_wait': 5.0, 'share': 0.8,
+             'rate': 0, 'burst': 0, 'client_rate': 2.0, 'client_burst': 20},
+    # Webcam frames - the next frame replaces a dropped one, so shed instead of queueing
+    'proctoring': {'max_concurrent': 4, 'max_wait': 0.0, 'share': 0.5,
+                   'rate': 0, 'burst': 0, 'client_rate': 1.0, 'client_burst': 3}
+}
+
+ROUTE_CLASSES = {
+    'submit_quiz': 'submit',
+    'fail_quiz': 'submit',
+    'autosave_answers': 'submit',
+    'login': 'auth',
+    'signup': 'auth',
+    'verify_otp': 'auth',
+    'resend_otp': 'auth',
+    'change_password': 'auth',
+    'admin_login': 'auth',
+    'create_teacher': 'auth',
+    'dashboard': 'quiz',
+    'start_quiz': 'quiz',
+    'get_quiz_question': 'quiz',
+    'quiz_results': 'quiz',
+    'check_eyes': 'proctoring'
+}
+
+# Per-client buckets kept per worker (least recently used are dropped first)
+MAX_CLIENT_BUCKETS = 10000
+
+log = app_logging.get_logger('admission')
+
+def load_classes():
+    classes = {}
+    for name, defaults in DEFAULT_CLASSES.items():
+        limits = {}
+        for field, default in defaults.items():
+            value = os.getenv(f'ADMISSION_{name.upper()}_{field.upper()}')
+            limits[field] = type(default)(value) if value is not None else default
+        classes[name] = limits
+    return classes
+
+class TokenBucket:
+    """rate tokens per second up to burst; not thread-safe on its own"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """0 if a token was taken, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    def __init__(self, classes, max_in_flight):
+        self.classes = classes
+        self.max_in_flight = max_in_flight
+        self.lock = threading.Lock()
+        self.slot_freed = threading.Condition(self.lock)
+        self.in_flight = dict.fromkeys(classes, 0)
+        self.total_in_flight = 0
+        self.class_buckets = {
+            name: TokenBucket(limits['rate'], limits['burst'])
+            for name, limits in classes.items() if limits['rate'] > 0
+        }
+        self.client_buckets = OrderedDict()
+
+    def _take_tokens(self, route_class, client):
+        limits = self.classes[route_class]
+        bucket = self.class_buckets.get(route_class)
+        if bucket is not None:
+            wait = bucket.take()
+            if wait:
+                raise Rejected('class_rate', wait)
+        if limits['client_rate'] > 0 and client:
+            key = (route_class, client)
+            bucket = self.client_buckets.get(key)
+            if bucket is None:
+                bucket = self.client_buckets[key] = TokenBucket(limits['client_rate'], limits['client_burst'])
+                if len(self.client_buckets) > MAX_CLIENT_BUCKETS:
+                    self.client_buckets.popitem(last=False)
+            else:
+                self.client_buckets.move_to_end(key)
+            wait = bucket.take()
+            if wait:
+                raise Rejected('client_rate', wait)
+
+    def _has_slot(self, route_class):
+        limits = self.classes[route_class]
+        return (self.in_flight[route_class] < limits['max_concurrent']
+                and self.total_in_flight < max(1, int(self.max_in_flight * limits['share'])))
+
+    def acquire(self, route_class, client):
+        """Take a slot for one request; returns seconds spent queued, raises Rejected"""
+        limits = self.classes[route_class]
+        with self.lock:
+            self._take_tokens(route_class, client)
+            waited = 0.0
+            if not self._has_slot(route_class):
+                if limits['max_wait'] <= 0:
+                    raise Rejected('concurrency', 1)
+                metrics.registry.inc_counter('quiz_admission_queued_total',
+                                             'Requests that waited for a concurrency slot', {'class': route_class})
+                started = time.monotonic()
+                deadline = started + limits['max_wait']
+                while not self._has_slot(route_class):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected('queue_timeout', 1)
+                    self.slot_freed.wait(remaining)
+                waited = time.monotonic() - started
+            self.in_flight[route_class] += 1
+            self.total_in_flight += 1
+            self._report(route_class)
+            return waited
+
+    def release(self, route_class):
+        with self.lock:
+            self.in_flight[route_class] -= 1
+            self.total_in_flight -= 1
+            self._report(route_class)
+            self.slot_freed.notify_all()
+
+    def _report(self, route_class):
+        metrics.registry.set_gauge('quiz_admission_in_flight', 'Requests holding a concurrency slot',
+                                   self.in_flight[route_class], {'class': route_class})
+
+def client_key():
+    email = session.get('user_email')
+    if email:
+        return email
+    # Logging in: the account being logged into, so students behind one NAT don't share a bucket
+    if request.method == 'POST':
+        account = request.form.get('email') or request.form.get('username')
+        if account:
+            return f'{account.strip().lower()}@{request.remote_addr}'
+    return request.remote_addr
+
+def too_many_requests(retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    message = 'Too many requests - please try again in a moment.'
+    if request.path.startswith('/api/') or request.is_json:
+        response = jsonify({'error': message, 'retry_after': retry_after})
+    else:
+        response = make_response(message)
+        response.mimetype = 'text/plain'
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def init_app(app):
+    if not ADMISSION_CONTROL:
+        return
+    controller = AdmissionController(load_classes(), ADMISSION_MAX_IN_FLIGHT)
+    app.extensions['admission'] = controller
+
+    @app.before_request
+    def admit_request():
+        route_class = ROUTE_CLASSES.get(request.endpoint)
+        if route_class is None:
+            return None
+        try:
+            waited = controller.acquire(route_class, client_key())
+        except Rejected as e:
+            metrics.registry.inc_counter('quiz_admission_shed_total', 'Requests refused with 429',
+                                         {'class': route_class, 'reason': e.reason})
+            log.debug("Shed %s request (%s)", request.endpoint, e.reason,
+                     extra={'route_class': route_class, 'reason': e.reason})
+            return too_many_requests(e.retry_after)
+        g._admission_class = route_class
+        if waited:
+            metrics.registry.inc_counter('quiz_admission_queued_seconds_total',
+                                         'Time requests waited for a concurrency slot', {'class': route_class},
+                                         value=waited)
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        route_class = g.pop('_admission_class', None)
+        if route_class is not None:
+            controller.release(route_class)
@@ -0,0 +1,110 @@
+"""
+Compact encoding of quiz_attempts.answers.
+
+submit_quiz stores the graded question_results of an attempt in
+quiz_attempts.answers. Every result repeats its question's text, type and
+correct answer, so every row carried a copy of the whole quiz:
+
+  [{"question": "Which organelle ...", "question_type": "multiple_choice",
+    "user_answer": 2, "correct_answer": 1, "is_correct": false,
+    "feedback": ""}, ...]
+
+The question part is now stored once per quiz version, in the
+quiz_question_sets table, and the row keeps only what the student did:
+
+  {"f": 1, "qv": "3f2a9c0e51b7d864", "a": [[2, 0, 0], ...]}
+
+  f    format (1)
+  qv   quiz version: hash of the question set (text, type and correct
+       answer of every question, in order), so editing a quiz starts a new
+       version and older attempts still show the questions they were graded on
+  a    one [user answer, correct (1/0), feedback code] per question, by
+       position in the question set
+
+Feedback codes are the index in FEEDBACK; any other feedback is stored as
+its text. Results that don't fit (extra keys, like the "Quiz failed" rows
+of fail_quiz) are stored as they are. decode() takes both forms, so rows
+written before the change and not yet migrated (migrate_answers.py) read
+the same.
+"""
+import hashlib
+import threading
+
+import json_codec
+
+FORMAT = 1
+# Feedback submit_quiz gives, by code
+FEEDBACK = ('', 'Partially correct but accepted.')
+QUESTION_KEYS = ('question', 'question_type', 'correct_answer')
+RESULT_KEYS = frozenset(QUESTION_KEYS + ('user_answer', 'is_correct', 'feedback'))
+# Question sets kept per worker; they never change once written
+CACHE_SIZE = 512
+
+_FEEDBACK_CODES = {text: code for code, text in enumerate(FEEDBACK)}
+
+_lock = threading.Lock()
+_cache = {}  # (quiz_id, version) -> question set
+
+def question_set(question_results):
+    """The question part of graded results: [[question, question_type, correct_answer], ...]"""
+    return [[result.get(key) for key in QUESTION_KEYS] for result in question_results]
+
+def version(questions):
+    # Content-addressed: two workers grading the same quiz arrive at the same version
+    return hashlib.sha1(json_codec.dumpb(questions)).hexdigest()[:16]
+
+def is_compact(answers):
+    return isinstance(answers, dict) and answers.get('f') == FORMAT
+
+def encode(question_results):
+    """(answers value, (version, question set) or None) - None when the results are stored as they are"""
+    if not question_results or any(set(result) - RESULT_KEYS for result in question_results):
+        return question_results, None
+    questions = question_set(question_results)
+    quiz_version = version(questions)
+    answers = [
+        [result.get('user_answer'), 1 if result.get('is_correct') else 0,
+         _FEEDBACK_CODES.get(result.get('feedback') or '', result.get('feedback'))]
+        for result in question_results
+    ]
+    return {'f': FORMAT, 'qv': quiz_version, 'a': answers}, (quiz_version, questions)
+
+def decode(answers, quiz_id, load_question_set):
+    """
+    question_results from an answers value (JSON text or parsed), either
+    form; load_question_set(quiz_id, version) returns a stored question set
+    """
+    if isinstance(answers, (str, bytes)):
+        answers = json_codec.loads(answers)
+    if not is_compact(answers):
+        return answers or []
+    questions = cached_question_set(quiz_id, answers['qv'], load_question_set)
+    results = []
+    for position, (user_answer, is_correct, feedback) in enumerate(answers['a']):
+        question = questions[position] if questions and position < len(questions) else [None, None, None]
+        result = dict(zip(QUESTION_KEYS, question))
+        if result['question'] is None:
+            result['question'] = f'Question {position + 1}'  # Question set missing - still show the answer
+        result['user_answer'] = user_answer
+        result['is_correct'] = bool(is_correct)
+        result['feedback'] = FEEDBACK[feedback] if isinstance(feedback, int) and feedback < len(FEEDBACK) else feedback
+        results.append(result)
+    return results
+
+def cached_question_set(quiz_id, quiz_version, load_question_set):
+    questions = _cache.get((quiz_id, quiz_version))
+    if questions is None:
+        questions = load_question_set(quiz_id, quiz_version)
+        if questions is not None:
+            remember(quiz_id, quiz_version, questions)
+    return questions
+
+def remember(quiz_id, quiz_version, questions):
+    """Cache a question set that is stored (or was just stored by this worker)"""
+    with _lock:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[(quiz_id, quiz_version)] = questions
+
+def is_known(quiz_id, quiz_version):
+    return (quiz_id, quiz_version) in _cache
@@ -1,32 +1,68 @@
-from flask import Flask, request, render_template, session, redirect, url_for, flash, jsonify
+from flask import Flask, request, render_template, session, redirect, url_for, flash, jsonify, get_template_attribute, send_file
+from markupsafe import Markup
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
 import random
 import string
 import json
+import logging
 import requests
 from datetime import datetime, timedelta
 import base64
+import hashlib
 import io
+import time
 import uuid
 import pymysql  # Add MySQL connector
-
-# Add a custom JSON encoder to handle datetime objects
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+import metrics
+import query_log
+import app_logging
+import session_store
+import fragment_cache
+import http_cache
+import compression
+import template_cache
+import assets
+import images
+import checkpoint_log
+import submission_spool
+import admission
+import password_hashing
+import roster_import
+import user_cache
+import user_store
+import models
+import json_codec
+import answer_codec
+import attempt_archive
+
+# OpenCV is only needed for webcam proctoring (/api/check-eyes)
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+    np = None
 
 load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
-app.json_encoder = DateTimeEncoder  # Use our custom JSON encoder for all JSON serialization
+json_codec.init_app(app)  # orjson (when installed) for jsonify and sessions, ISO 8601 datetimes
+metrics.init_app(app)  # Per-route latency, DB and file storage metrics
+query_log.init_app(app)  # Slow query log and N+1 detection
+# Before setup_logging: the hashing processes are forked while no other thread is running
+password_hashing.init_app(app)  # Busy hashing pool -> 429
+log = app_logging.setup_logging(app)  # Structured, queue-based logging with request ids
+admission.init_app(app)  # Per-route concurrency caps and token buckets (429 + Retry-After)
+http_cache.init_app(app)  # Fingerprinted, long-lived static URLs
+compression.init_app(app)  # gzip/brotli responses and precompressed static files
+template_cache.init_app(app)  # Persistent Jinja bytecode cache with load timings
+assets.init_app(app)  # asset_url() for the minified, fingerprinted CSS/JS bundles
+images.init_app(app)  # srcset/background helpers for the resized image variants
 
 # Database configuration
 DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -34,22 +70,28 @@ DB_USER = os.getenv('DB_USER', 'root')
 DB_PASSWORD = os.getenv('DB_PASSWORD', '')
 DB_NAME = os.getenv('DB_NAME', 'quiz_app')
 
+# 'progressive' sends only the first question with the quiz page; the rest are fetched one at a time
+QUIZ_DELIVERY = os.getenv('QUIZ_DELIVERY', 'full')
+
 # Database connection function
 def get_db_connection():
+    metrics.record_db_connection()
     try:
         conn = pymysql.connect(
             host=DB_HOST,
             user=DB_USER,
             password=DB_PASSWORD,
             database=DB_NAME,
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=query_log.ProfilingCursor
         )
         return conn
     except Exception as e:
-        print(f"Database connection error: {e}")
-        print("Using file-based storage as fallback")
+        log.warning("Database connection error: %s - using file-based storage as fallback", e)
         return None
 
+# Keep session data server-side; the cookie only carries a signed session id
+session_store.init_app(app, lambda: get_db_connection())
+
 # Register custom filters
 @app.template_filter('datetime')
 def format_datetime(value, format='%B %d, %Y at %I:%M %p'):
@@ -60,6 +102,11 @@ def format_datetime(value, format='%B %d, %Y at %I:%M %p'):
             return value
     return value.strftime(format)
 
+# Load every template now (from the bytecode cache when built) rather than on each first render.
+# Templates are checked against the filters above when compiled, so this has to come after them.
+if template_cache.TEMPLATE_PRELOAD:
+    template_cache.preload(app)
+
 EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 
@@ -84,10 +131,13 @@ def init_files():
 
 # Database user management functions
 def get_user_by_email(email):
+    # Memoized per request and cached per worker for a few seconds (user_cache.py)
+    return user_cache.get(email, load_user_by_email)
+
+def load_user_by_email(email):
     conn = get_db_connection()
     if not conn:  # If connection failed, check file storage
-        users = load_users()
-        user = users.get(email)
+        user = load_file_user(email)
         if user:
             # Convert file-based user to similar format as database user
             return {
@@ -109,10 +159,9 @@ def get_user_by_email(email):
             user = cursor.fetchone()
             return user
     except Exception as e:
-        print(f"Error fetching user: {e}")
+        log.error("Error fetching user: %s", e)
         # Fallback to file-based storage
-        users = load_users()
-        user = users.get(email)
+        user = load_file_user(email)
         if user:
             return {
                 'id': 0,
@@ -130,19 +179,21 @@ def get_user_by_email(email):
         if conn:
             conn.close()
 
-def create_user(username, fullname, lrn, email, password, strand):
+def create_user(username, fullname, lrn, email, password, strand, hashed_password=None):
+    # Hashed before taking a connection, so a busy hashing pool doesn't hold one
+    hashed_password = hashed_password or password_hashing.hash_password(password)
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
             cursor.execute(
                 "INSERT INTO users (username, fullname, lrn, email, password, strand) VALUES (%s, %s, %s, %s, %s, %s)",
                 (username, fullname, lrn, email, hashed_password, strand)
             )
         conn.commit()
+        user_cache.invalidate(email)
         return True
     except pymysql.MySQLError as e:
-        print(f"Database error: {e}")
+        log.error("Database error: %s", e)
         return False
     finally:
         conn.close()
@@ -165,59 +216,147 @@ def update_user(email, data):
             query = f"UPDATE users SET {', '.join(fields)} WHERE email = %s"
             cursor.execute(query, values)
         conn.commit()
+        user_cache.invalidate(email)
         return True
     except pymysql.MySQLError as e:
-        print(f"Database error: {e}")
+        log.error("Database error: %s", e)
         return False
     finally:
         conn.close()
 
+def save_password_hash(email, hashed_password):
+    """Store a rehashed password (see password_hashing.verify_password) wherever the account lives"""
+    try:
+        conn = get_db_connection()
+        if conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE users SET password = %s WHERE email = %s", (hashed_password, email))
+                conn.commit()
+            finally:
+                conn.close()
+        with user_store.locked(USERS_FILE):
+            users = load_users()
+            if email in users:
+                users[email]['password'] = hashed_password
+                save_users(users)
+        user_cache.invalidate(email)
+    except Exception as e:
+        # The old hash still works - try again on the next login
+        log.error("Error storing rehashed password for %s: %s", email, e)
+
 def delete_user(email):
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
             cursor.execute("DELETE FROM users WHERE email = %s", (email,))
         conn.commit()
+        user_cache.invalidate(email)
         return True
     except pymysql.MySQLError as e:
-        print(f"Database error: {e}")
+        log.error("Database error: %s", e)
         return False
     finally:
         conn.close()
 
-# Legacy file functions (can be deprecated once migration is complete)
-def load_users():
+# Roster imports (roster_import.py) go to the database, or to users.txt without one
+def existing_user_emails(emails):
+    conn = get_db_connection()
+    if not conn:
+        registered = user_store.emails(USERS_FILE)
+        return {email for email in emails if email in registered}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT email FROM users WHERE email IN ({', '.join(['%s'] * len(emails))})", emails
+            )
+            return {row['email'].lower() for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+def insert_users(users):
+    """Create student accounts (passwords already hashed) in one multi-row INSERT; returns how many were created"""
+    conn = get_db_connection()
+    if not conn:
+        created_at = datetime.now().isoformat()
+        # Under the users.txt lock, and only the new records written: an import during an exam
+        # must not drop attempts or signups saved between its read and its write
+        with user_store.locked(USERS_FILE):
+            registered = user_store.emails(USERS_FILE)
+            new_users = {
+                user['email']: {
+                    'username': user['username'],
+                    'fullname': user['fullname'],
+                    'lrn': user['lrn'],
+                    'password': user['password'],
+                    'strand': user['strand'],
+                    'role': 'student',
+                    'created_at': created_at
+                }
+                for user in users if user['email'] not in registered
+            }
+            if new_users:
+                user_store.update(USERS_FILE, new_users)
+        return len(new_users)
+    try:
+        with conn.cursor() as cursor:
+            # Emails registered since the lookup are skipped by the unique key
+            inserted = cursor.executemany(
+                "INSERT IGNORE INTO users (username, fullname, lrn, email, password, strand) VALUES (%s, %s, %s, %s, %s, %s)",
+                [(user['username'], user['fullname'], user['lrn'], user['email'], user['password'], user['strand'])
+                 for user in users]
+            )
+        conn.commit()
+        return inserted or 0
+    finally:
+        conn.close()
+
+roster_import.init_app(app, existing_user_emails, insert_users)
+
+# File storage helpers - reads and writes are timed and sized for the request metrics
+def read_json_file(path, default):
     try:
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            content = f.read()
+        metrics.record_file_read(len(content), time.perf_counter() - started)
+        return json_codec.loads(content)
     except:
-        return {}
+        return default
+
+def write_json_file(path, data):
+    started = time.perf_counter()
+    # Compact unless JSON_PRETTY_FILES=1 - only the app reads these files
+    content = json_codec.dumpb(data, pretty=json_codec.JSON_PRETTY_FILES)
+    with open(path, 'wb') as f:
+        f.write(content)
+    metrics.record_file_write(len(content), time.perf_counter() - started)
+
+# Legacy file functions (can be deprecated once migration is complete)
+# load_users() -> change -> save_users() goes inside user_store.locked(USERS_FILE), or a concurrent save is lost
+def load_users():
+    return read_json_file(USERS_FILE, {})
 
 def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2, cls=DateTimeEncoder)
+    # One user per line plus an email -> offset index (user_store.py)
+    user_store.save(USERS_FILE, users)
+
+def load_file_user(email):
+    """One users.txt entry, without parsing everyone else's"""
+    return user_store.get(USERS_FILE, email)
 
 def load_stories():
-    try:
-        with open(STORIES_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+    return read_json_file(STORIES_FILE, [])
 
 def save_stories(stories):
-    with open(STORIES_FILE, 'w') as f:
-        json.dump(stories, f, indent=2, cls=DateTimeEncoder)
+    write_json_file(STORIES_FILE, stories)
 
 def load_quizzes():
-    try:
-        with open(QUIZZES_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+    return read_json_file(QUIZZES_FILE, [])
 
 def save_quizzes(quizzes):
-    with open(QUIZZES_FILE, 'w') as f:
-        json.dump(quizzes, f, indent=2, cls=DateTimeEncoder)
+    write_json_file(QUIZZES_FILE, quizzes)
+    fragment_cache.invalidate()
 
 def get_icons_by_category():
     return {
@@ -278,7 +417,7 @@ def send_otp_email(email, otp):
         server.quit()
         return True
     except Exception as e:
-        print(f"Error sending email: {e}")
+        log.error("Error sending email: %s", e)
         return False
 
 @app.route('/')
@@ -356,6 +495,7 @@ def verify_otp():
         return redirect(url_for('index'))
 
     session.pop('signup_data', None)
+    session_store.regenerate(session)
     session['user_email'] = signup_data['email']
     session['username'] = signup_data['username']
     session['strand'] = signup_data['strand']
@@ -403,10 +543,14 @@ def login():
         flash('Teacher accounts must log in through the admin panel', 'error')
         return redirect(url_for('index'))
 
-    if not check_password_hash(user['password'], password):
+    valid, new_hash = password_hashing.verify_password(user['password'], password)
+    if not valid:
         flash('Invalid email or password', 'error')
         return redirect(url_for('index'))
+    if new_hash:
+        save_password_hash(email, new_hash)
 
+    session_store.regenerate(session)
     session['user_email'] = email
     session['username'] = user['username']
     session['strand'] = user.get('strand', '')
@@ -423,8 +567,7 @@ def dashboard():
     user = get_user_by_email(session['user_email'])
     if not user:
         # Try from legacy file storage
-        users = load_users()
-        user = users.get(session['user_email'])
+        user = load_file_user(session['user_email'])
         if not user:
             flash('User not found', 'error')
             return redirect(url_for('index'))
@@ -433,12 +576,9 @@ def dashboard():
     if request.args.get('source') == 'quiz_policy':
         flash('Remember: Each quiz can only be taken once. Complete each quiz carefully!', 'info')
     
-    # Load quizzes
-    all_quizzes = load_quizzes()
-    
-    # Filter quizzes based on user's strand
+    # Quiz menu and cards are rendered once per strand and catalog version
     user_strand = user.get('strand', '')
-    quizzes = [quiz for quiz in all_quizzes if not quiz.get('strand') or quiz.get('strand') == user_strand]
+    quiz_list = fragment_cache.get_quiz_list(user_strand, QUIZZES_FILE, load_quizzes)
     
     # Get quiz attempts from database for this user
     quiz_stats = {}
@@ -447,7 +587,7 @@ def dashboard():
     try:
         conn = get_db_connection()
         if conn:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            with conn.cursor() as cursor:
                 # Get all user quiz attempts
                 cursor.execute(
                     """SELECT quiz_id, score, raw_score, total_questions, passed FROM quiz_attempts 
@@ -496,19 +636,16 @@ def dashboard():
                         'passed': passed
                     }
     except Exception as e:
-        print(f"Error fetching quiz attempts: {e}")
+        log.error("Error fetching quiz attempts: %s", e)
         # Fallback to file-based quiz history
         if isinstance(user, dict):
             quiz_history = user.get('quiz_history', [])
             total_completed_quizzes = len(quiz_history)
     
-    # Add question_count to each quiz
-    for quiz in quizzes:
-        quiz['question_count'] = len(quiz.get('questions', []))
-    
     return render_template('dashboard.html', 
         user=user,
-        quizzes=quizzes,
+        quiz_menu_html=Markup(quiz_list['menu']),
+        quiz_grid_html=fragment_cache.overlay_stats(quiz_list['grid'], quiz_stats),
         total_completed_quizzes=total_completed_quizzes,
         quiz_stats=quiz_stats
     )
@@ -523,10 +660,12 @@ def update_username():
         flash('Username must be at least 3 characters long', 'error')
         return redirect(url_for('dashboard'))
 
-    users = load_users()
-    users[session['user_email']]['username'] = new_username
+    with user_store.locked(USERS_FILE):
+        users = load_users()
+        users[session['user_email']]['username'] = new_username
+        save_users(users)
     session['username'] = new_username
-    save_users(users)
+    user_cache.invalidate(session['user_email'])
 
     flash('Username updated successfully', 'success')
     return redirect(url_for('dashboard'))
@@ -556,17 +695,60 @@ def change_password():
     user = users[session['user_email']]
 
     # Verify current password
-    if not check_password_hash(user['password'], current_password):
+    if not password_hashing.verify_password(user['password'], current_password)[0]:
         flash('Current password is incorrect', 'error')
         return redirect(url_for('dashboard'))
 
-    # Update password
-    user['password'] = generate_password_hash(new_password, method='pbkdf2:sha256')
-    save_users(users)
+    # Update password - hashed outside the lock, stored into a fresh read so concurrent changes survive
+    hashed_password = password_hashing.hash_password(new_password)
+    with user_store.locked(USERS_FILE):
+        users = load_users()
+        users[session['user_email']]['password'] = hashed_password
+        save_users(users)
+    user_cache.invalidate(session['user_email'])
 
     flash('Password changed successfully', 'success')
     return redirect(url_for('dashboard'))
 
+def delete_quiz_attempts(quiz_id):
+    """Remove every recorded attempt at a quiz; returns (database rows, file-store users) changed"""
+    # Attempts still waiting in the spool would reappear after the reset
+    if submission_spool.SUBMISSION_SPOOL:
+        submission_spool.flush()
+
+    deleted_rows = 0
+    conn = get_db_connection()
+    if conn:
+        try:
+            with conn.cursor() as cursor:
+                # One set-based DELETE on the indexed quiz_id column, in a single transaction
+                cursor.execute("DELETE FROM quiz_attempts WHERE quiz_id = %s", (quiz_id,))
+                deleted_rows = cursor.rowcount
+                cursor.execute("DELETE FROM quiz_attempts_archive WHERE quiz_id = %s", (quiz_id,))
+            conn.commit()
+        except pymysql.MySQLError:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # File store: only the users the quiz index lists, everyone else's records are copied as they are
+    changed = {}
+    with user_store.locked(USERS_FILE):
+        for email in user_store.quiz_emails(USERS_FILE, quiz_id):
+            user = load_file_user(email)
+            if user:
+                user['quiz_history'] = [
+                    quiz_result for quiz_result in user.get('quiz_history', [])
+                    if quiz_result.get('quiz_id') != quiz_id
+                ]
+                changed[email] = user
+        if changed:
+            user_store.update(USERS_FILE, changed)
+    log.info("Removed attempts at quiz %s: %s database rows, %s file-store users", quiz_id, deleted_rows, len(changed),
+             extra={'quiz_id': quiz_id})
+    return deleted_rows, len(changed)
+
 @app.route('/nimda/delete_quiz/<quiz_id>', methods=['POST'])
 def delete_quiz(quiz_id):
     if 'admin_logged_in' not in session:
@@ -576,6 +758,11 @@ def delete_quiz(quiz_id):
     quizzes = [q for q in quizzes if q['id'] != quiz_id]
     save_quizzes(quizzes)
     
+    try:
+        delete_quiz_attempts(quiz_id)
+    except Exception as e:
+        log.error("Error removing attempts of deleted quiz %s: %s", quiz_id, e, extra={'quiz_id': quiz_id})
+    
     return jsonify({"success": True})
 
 @app.route('/nimda/reset_quiz/<quiz_id>', methods=['POST'])
@@ -584,20 +771,9 @@ def reset_quiz(quiz_id):
         return jsonify({"error": "Unauthorized"}), 401
     
     try:
-        # Load user data
-        users = load_users()
-        
-        # For each user, remove the specified quiz from their quiz history
-        for email, user_data in users.items():
-            if 'quiz_history' in user_data:
-                # Filter out the quiz with the given quiz_id
-                user_data['quiz_history'] = [
-                    quiz_result for quiz_result in user_data['quiz_history'] 
-                    if quiz_result.get('quiz_id') != quiz_id
-                ]
-        
-        # Save the updated user data
-        save_users(users)
+        # Remove the quiz from the database and from the quiz histories of the students who took it
+        delete_quiz_attempts(quiz_id)
+        fragment_cache.invalidate()
         
         return jsonify({"success": True, "message": "Quiz reset successful. Students can now retake it."})
     except Exception as e:
@@ -622,14 +798,14 @@ def start_quiz(quiz_id):
     try:
         with conn.cursor() as cursor:
             cursor.execute(
-                "SELECT * FROM quiz_attempts WHERE user_id = %s AND quiz_id = %s", 
+                "SELECT id FROM quiz_attempts WHERE user_id = %s AND quiz_id = %s LIMIT 1", 
                 (user['id'], quiz_id)
             )
             existing_attempt = cursor.fetchone()
             if existing_attempt:
                 quiz_attempts_exist = True
     except Exception as e:
-        print(f"Error checking quiz attempts: {e}")
+        log.error("Error checking quiz attempts: %s", e)
     finally:
         if conn:
             conn.close()
@@ -641,6 +817,12 @@ def start_quiz(quiz_id):
                 quiz_attempts_exist = True
                 break
     
+    # Submitted moments ago and not yet drained from the spool
+    if not quiz_attempts_exist and submission_spool.SUBMISSION_SPOOL:
+        quiz_attempts_exist = submission_spool.find(
+            lambda record: record['user_email'] == session['user_email'] and record['history']['quiz_id'] == quiz_id
+        ) is not None
+    
     # If attempts exist, redirect to dashboard with message
     if quiz_attempts_exist:
         flash('You have already completed this quiz. Each quiz can only be taken once.', 'error')
@@ -649,18 +831,15 @@ def start_quiz(quiz_id):
     quizzes = load_quizzes()
     quiz = next((q for q in quizzes if q['id'] == quiz_id), None)
     
-    # Debug: print quiz details
-    print("\n===== QUIZ DEBUG INFO =====")
-    print(f"Quiz ID: {quiz_id}")
-    print(f"Quiz found: {quiz is not None}")
-    if quiz:
-        print(f"Quiz title: {quiz.get('title', 'No title')}")
-        print(f"Questions count: {len(quiz.get('questions', []))}")
-        if 'questions' in quiz and len(quiz['questions']) > 0:
-            print(f"First question: {quiz['questions'][0].get('question', 'No question text')}")
-        else:
-            print("No questions found in quiz")
-    print("===========================\n")
+    # Debug: quiz details (sampled, see app_logging)
+    log.debug(
+        "Starting quiz %s: found=%s, title=%r, questions=%d",
+        quiz_id,
+        quiz is not None,
+        quiz.get('title', 'No title') if quiz else None,
+        len(quiz.get('questions', [])) if quiz else 0,
+        extra={'quiz_id': quiz_id}
+    )
     
     if not quiz or 'questions' not in quiz:
         flash('Quiz not found or no questions available', 'error')
@@ -674,6 +853,20 @@ def start_quiz(quiz_id):
         flash(f'This quiz is for {quiz_strand} students only', 'error')
         return redirect(url_for('dashboard'))
     
+    normalize_question_times(quiz)
+    
+    # Lets the student fetch this quiz's questions (see get_quiz_question) and autosave until they submit.
+    # Reloading the page resumes the same attempt with its saved answers.
+    if session.get('active_quiz_id') != quiz_id or not session.get('active_attempt_id'):
+        session['active_quiz_id'] = quiz_id
+        session['active_attempt_id'] = str(uuid.uuid4())
+        checkpoint_log.maybe_prune()
+    saved_answers, autosave_seq = checkpoint_log.replay(session['active_attempt_id'])
+    
+    return render_template('quiz.html', quiz=quiz, progressive=QUIZ_DELIVERY == 'progressive',
+                           saved_answers=saved_answers, autosave_seq=autosave_seq)
+
+def normalize_question_times(quiz):
     # Make sure all questions have time limits set and standardized field names
     for question in quiz['questions']:
         # Set default time if neither field exists
@@ -689,8 +882,72 @@ def start_quiz(quiz_id):
     # Calculate and set total quiz time if not already set
     if 'total_time' not in quiz:
         quiz['total_time'] = sum(q.get('time_per_question', 30) for q in quiz['questions'])
+
+# Question fields students may see - never correct_answer or matching_pairs
+PUBLIC_QUESTION_FIELDS = ('question', 'question_type', 'options', 'left_items', 'right_items', 'word_limit',
+                          'time_per_question', 'time_limit')
+
+@app.route('/api/quiz-question/<quiz_id>')
+def get_quiz_question(quiz_id):
+    # One question of the quiz being taken, without its answer, for progressive delivery (QUIZ_DELIVERY)
+    if 'user_email' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Only while the student is taking this quiz - start_quiz already checked strand and previous attempts
+    if session.get('active_quiz_id') != quiz_id:
+        return jsonify({'error': 'Quiz not started'}), 403
+    
+    index = request.args.get('index', type=int)
+    version, last_modified = http_cache.file_version(QUIZZES_FILE)
     
-    return render_template('quiz.html', quiz=quiz)
+    def build_payload():
+        quiz = next((q for q in load_quizzes() if q['id'] == quiz_id), None)
+        if not quiz or 'questions' not in quiz:
+            return {'error': 'Quiz not found'}, 404
+        
+        questions = quiz['questions']
+        if index is None or not 0 <= index < len(questions):
+            return {'error': 'Question not found'}, 404
+        
+        normalize_question_times(quiz)
+        question = {field: questions[index][field] for field in PUBLIC_QUESTION_FIELDS if field in questions[index]}
+        render_question = get_template_attribute('partials/quiz_question.html', 'quiz_question')
+        return {
+            'index': index,
+            'total': len(questions),
+            'question': question,
+            'html': str(render_question(question, index))
+        }
+    
+    return http_cache.conditional_json(f'quiz-{quiz_id}-{version}-q{index}', last_modified, build_payload)
+
+@app.route('/api/autosave', methods=['POST'])
+def autosave_answers():
+    # Answers changed since the last save, appended to the attempt's checkpoint log (see checkpoint_log.py)
+    if 'user_email' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    attempt_id = session.get('active_attempt_id')
+    if not attempt_id or session.get('active_quiz_id') != data.get('quiz_id'):
+        return jsonify({'error': 'Quiz not started'}), 403
+    
+    seq = data.get('seq')
+    if not isinstance(seq, int):
+        return jsonify({'error': 'seq must be an integer'}), 400
+    try:
+        answers = checkpoint_log.clean_answers(data.get('answers'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        checkpoint_log.append(attempt_id, seq, answers)
+    except OSError as e:
+        # The client keeps the answers and the final submit still carries them
+        log.error("Error saving checkpoint for attempt %s: %s", attempt_id, e, extra={'quiz_id': data.get('quiz_id')})
+        return jsonify({'error': 'Autosave unavailable'}), 503
+    
+    return jsonify({'saved': seq})
 
 def create_tables(cursor):
     """Create all required tables if they don't exist"""
@@ -757,6 +1014,17 @@ def create_tables(cursor):
     )
     """)
     
+    # Question sets the compact quiz_attempts.answers refer to, one row per quiz version (answer_codec.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_question_sets (
+        quiz_id VARCHAR(255) NOT NULL,
+        version CHAR(16) NOT NULL,
+        questions JSON NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (quiz_id, version)
+    )
+    """)
+    
     # Create mapping table between UUID and database IDs
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS quiz_id_mapping (
@@ -769,31 +1037,59 @@ def create_tables(cursor):
     )
     """)
     
+    # Create server-side session table (used when SESSION_BACKEND=mysql)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sessions (
+        id VARCHAR(64) PRIMARY KEY,
+        data MEDIUMTEXT NOT NULL,
+        expires_at DOUBLE NOT NULL,
+        INDEX (expires_at)
+    )
+    """)
+    
     # Check if raw_score and total_questions columns exist in quiz_attempts, add if not
     try:
         cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'raw_score'")
         if not cursor.fetchone():
             cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN raw_score INT DEFAULT 0")
-            print("Added raw_score column to quiz_attempts table")
+            log.info("Added raw_score column to quiz_attempts table")
     
         cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'total_questions'")
         if not cursor.fetchone():
             cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN total_questions INT DEFAULT 0")
-            print("Added total_questions column to quiz_attempts table")
+            log.info("Added total_questions column to quiz_attempts table")
             
         # Check if student_name column exists, add if not
         cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'student_name'")
         if not cursor.fetchone():
             cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN student_name VARCHAR(255)")
-            print("Added student_name column to quiz_attempts table")
+            log.info("Added student_name column to quiz_attempts table")
             
         # Check if student_strand column exists, add if not
         cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'student_strand'")
         if not cursor.fetchone():
             cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN student_strand VARCHAR(50)")
-            print("Added student_strand column to quiz_attempts table")
+            log.info("Added student_strand column to quiz_attempts table")
+            
+        # Check if attempt_uuid column exists, add if not (quiz_results looks attempts up by it)
+        cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'attempt_uuid'")
+        if not cursor.fetchone():
+            cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN attempt_uuid VARCHAR(36), ADD INDEX (attempt_uuid)")
+            log.info("Added attempt_uuid column to quiz_attempts table")
+        
+        # Spooled submissions are replayed after a crash - a unique attempt_uuid makes the replay a no-op
+        cursor.execute("SHOW INDEX FROM quiz_attempts WHERE Key_name = 'attempt_uuid_unique'")
+        if not cursor.fetchone():
+            cursor.execute("ALTER TABLE quiz_attempts ADD UNIQUE INDEX attempt_uuid_unique (attempt_uuid)")
+            log.info("Added unique attempt_uuid index to quiz_attempts table")
+    except Exception as e:
+        log.error("Error checking or adding columns: %s", e)
+    
+    # Attempts of past school years (attempt_archive.py)
+    try:
+        attempt_archive.create_tables(cursor)
     except Exception as e:
-        print(f"Error checking or adding columns: {e}")
+        log.error("Error creating quiz_attempts_archive: %s", e)
 
 # Make sure tables exist when app starts
 try:
@@ -804,10 +1100,9 @@ try:
         conn.commit()
         conn.close()
     else:
-        print("Skipping table creation - using file-based storage")
+        log.info("Skipping table creation - using file-based storage")
 except Exception as e:
-    print(f"Error creating tables: {e}")
-    print("Continuing with file-based storage")
+    log.error("Error creating tables: %s - continuing with file-based storage", e)
 
 # Initialize files
 init_files()
@@ -837,12 +1132,17 @@ def submit_quiz():
     user = get_user_by_email(session['user_email'])
     if not user:
         # Try file-based storage
-        users = load_users()
-        user = users.get(session['user_email'])
+        user = load_file_user(session['user_email'])
         if not user:
             flash('User not found', 'error')
         return redirect(url_for('dashboard'))
     
+    # Answers autosaved during the attempt, overlaid with whatever the final form carries
+    # (inputs disabled by a question timer, or a submit sent after a lost connection, only exist in the log)
+    attempt_id = session.get('active_attempt_id') if session.get('active_quiz_id') == quiz_id else None
+    answers = checkpoint_log.replay(attempt_id)[0] if attempt_id else {}
+    answers.update(request.form.to_dict())
+    
     # Initialize results
     correct_count = 0
     total_questions = len(quiz.get('questions', []))
@@ -857,30 +1157,28 @@ def submit_quiz():
         
         # Get user's answer based on question type
         if question_type == 'multiple_choice':
-            user_answer = request.form.get(f'answer_{i}')
-            print(f"Debug - Question {i}: Raw user answer = {user_answer}")
+            user_answer = answers.get(f'answer_{i}')
+            log.debug("Question %d: raw user answer = %r", i, user_answer, extra={'quiz_id': quiz_id})
             if user_answer is not None:
                 try:
                     # Convert to int and add question data for debugging
-                user_answer = int(user_answer)
+                    user_answer = int(user_answer)
                     correct_answer = question.get('correct_answer')
-                    options = question.get('options', [])
-                    print(f"Debug - Question {i}: Processed user answer = {user_answer}, Correct answer = {correct_answer}")
-                    print(f"Debug - Options: {options}")
+                    log.debug("Question %d: user answer = %r, correct answer = %r, options = %r",
+                              i, user_answer, correct_answer, question.get('options', []), extra={'quiz_id': quiz_id})
                     
                     # Compare the user's answer with the correct answer
                     is_correct = user_answer == correct_answer
                 except (ValueError, TypeError) as e:
-                    print(f"Debug - Error processing answer: {e}")
-                    pass
+                    log.debug("Question %d: error processing answer: %s", i, e, extra={'quiz_id': quiz_id})
         
         elif question_type == 'true_false':
-            user_answer = request.form.get(f'answer_{i}')
+            user_answer = answers.get(f'answer_{i}')
             correct_answer = question.get('correct_answer')
             is_correct = user_answer == correct_answer if user_answer is not None and correct_answer is not None else False
         
         elif question_type == 'short_answer':
-            user_answer_raw = request.form.get(f'answer_{i}', '')
+            user_answer_raw = answers.get(f'answer_{i}', '')
             user_answer = user_answer_raw.strip() if user_answer_raw is not None else ''
             
             correct_answer_raw = question.get('correct_answer', '')
@@ -902,7 +1200,7 @@ def submit_quiz():
                     feedback = "Partially correct but accepted."
         
         elif question_type == 'fill_blank':
-            user_answer_raw = request.form.get(f'answer_{i}', '')
+            user_answer_raw = answers.get(f'answer_{i}', '')
             user_answer = user_answer_raw.strip() if user_answer_raw is not None else ''
             
             correct_answer_raw = question.get('correct_answer', '')
@@ -924,7 +1222,7 @@ def submit_quiz():
         elif question_type == 'matching':
             # Get all selected options for this matching question
             user_answers = {}
-            for key, value in request.form.items():
+            for key, value in answers.items():
                 if key.startswith(f'match_{i}_'):
                     item_index = key.split('_')[2]
                     user_answers[item_index] = value
@@ -937,20 +1235,20 @@ def submit_quiz():
             if not matching_pairs:  # If no matching pairs, can't be correct
                 is_correct = False
             else:
-            for item_index, selected_value in user_answers.items():
+                for item_index, selected_value in user_answers.items():
                     try:
                         item_idx = int(item_index)
                         if item_idx < len(matching_pairs):
                             correct_value = matching_pairs[item_idx].get('match')
-                if selected_value != correct_value:
+                            if selected_value != correct_value:
                                 is_correct = False
                                 break
                         else:
                             is_correct = False
                             break
                     except (ValueError, TypeError, IndexError):
-                    is_correct = False
-                    break
+                        is_correct = False
+                        break
         
         # Add to correct count if answer is correct
         if is_correct:
@@ -971,12 +1269,17 @@ def submit_quiz():
     total_score = total_questions
     score_percentage = (correct_count / total_questions) * 100 if total_questions > 0 else 0
     
-    # Store in file-based system
-    if isinstance(user, dict):
-        if 'quiz_history' not in user:
-            user['quiz_history'] = []
-        
-        user['quiz_history'].append({
+    # Id the results page uses to load this attempt back from storage
+    attempt_id = attempt_id or str(uuid.uuid4())
+    
+    attempt = {
+        'attempt_id': attempt_id,
+        'user_email': session['user_email'],
+        # Becomes the users.txt entry if the student only exists in the database
+        'user': {key: value for key, value in user.items() if key != 'quiz_history'},
+        'passed': score_percentage >= quiz.get('passing_score', 60),
+        'history': {
+            'attempt_id': attempt_id,
             'quiz_id': quiz_id,
             'quiz_title': quiz.get('title', ''),
             'timestamp': datetime.now(),
@@ -985,65 +1288,187 @@ def submit_quiz():
             'score_percentage': score_percentage,
             'question_results': question_results,
             'timeout': timeout
-        })
-        
-        # Save to file system
-    users = load_users()
-        users[session['user_email']] = user
-        save_users(users)
+        }
+    }
     
-    # Try to record the quiz attempt in the database
+    # With the spool, the attempt is on disk once append() returns and reaches the stores in the next batch
+    spooled = False
+    if submission_spool.SUBMISSION_SPOOL:
+        try:
+            submission_spool.append(attempt)
+            spooled = True
+        except OSError as e:
+            log.error("Error spooling quiz attempt %s: %s - recording it directly", attempt_id, e,
+                      extra={'quiz_id': quiz_id})
+    if not spooled:
+        save_attempts_to_file([attempt])
+        try:
+            insert_attempts_to_db([attempt])
+        except Exception as e:
+            log.error("Error recording quiz attempt in database: %s", e, extra={'quiz_id': quiz_id})
+    
+    # Only the attempt id goes into the session - the results page loads the rest from storage
+    session['last_attempt_id'] = attempt_id
+    session.pop('active_quiz_id', None)
+    session.pop('active_attempt_id', None)
+    checkpoint_log.discard(attempt_id)
+    
+    # Redirect to results page
+    return redirect(url_for('quiz_results', attempt_id=attempt_id, quiz_id=quiz_id, score=f"{raw_score}/{total_score}"))
+
+def save_attempts_to_file(attempts):
+    """Add graded attempts to their students' quiz_history in one users.txt rewrite; repeats are skipped"""
+    # Locked from the read to the write: concurrent inline submits used to overwrite each other's history
+    with user_store.locked(USERS_FILE):
+        users = load_users()
+        changed = False
+        for attempt in attempts:
+            file_user = users.get(attempt['user_email'])
+            if file_user is None:
+                file_user = users[attempt['user_email']] = dict(attempt['user'])
+            history = file_user.setdefault('quiz_history', [])
+            if not any(entry.get('attempt_id') == attempt['attempt_id'] for entry in history):
+                history.append(attempt['history'])
+                changed = True
+        if changed:
+            save_users(users)
+
+def insert_attempts_to_db(attempts):
+    """One multi-row INSERT for graded attempts; repeats are ignored through the unique attempt_uuid"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    # Answers reference their quiz version's question set instead of repeating the questions
+    encoded = [answer_codec.encode(attempt['history']['question_results']) for attempt in attempts]
+    new_sets = {}
+    for attempt, (answers, question_set) in zip(attempts, encoded):
+        if question_set and not answer_codec.is_known(attempt['history']['quiz_id'], question_set[0]):
+            new_sets[(attempt['history']['quiz_id'], question_set[0])] = question_set[1]
     try:
-        conn = get_db_connection()
-        if conn:
-            with conn.cursor() as cursor:
-                # Get student name and strand
-                student_name = user.get('fullname', user.get('username', 'Unknown'))
-                student_strand = user.get('strand', 'Unknown')
-                
-                # Insert quiz attempt with the actual quiz results
-                cursor.execute(
-                    """INSERT INTO quiz_attempts 
-                       (user_id, quiz_id, score, raw_score, total_questions, passed, answers, student_name, student_strand) 
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+        with conn.cursor() as cursor:
+            if new_sets:
+                cursor.executemany(
+                    "INSERT IGNORE INTO quiz_question_sets (quiz_id, version, questions) VALUES (%s, %s, %s)",
+                    [(quiz_id, version, json_codec.dumps(questions)) for (quiz_id, version), questions in new_sets.items()]
+                )
+            # pymysql turns executemany() of a single-row INSERT into multi-row INSERT statements
+            cursor.executemany(
+                """INSERT INTO quiz_attempts 
+                   (attempt_uuid, user_id, quiz_id, score, raw_score, total_questions, passed, answers, student_name, student_strand, end_time) 
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE attempt_uuid = attempt_uuid""",
+                [
                     (
-                        user.get('id', 0),
-                        quiz_id,
-                        score_percentage,
-                        raw_score,
-                        total_questions,
-                        score_percentage >= quiz.get('passing_score', 60),
-                        json.dumps(question_results, cls=DateTimeEncoder),
-                        student_name,
-                        student_strand
+                        attempt['attempt_id'],
+                        attempt['user'].get('id', 0),
+                        attempt['history']['quiz_id'],
+                        attempt['history']['score_percentage'],
+                        attempt['history']['raw_score'],
+                        attempt['history']['total_score'],
+                        attempt['passed'],
+                        json_codec.dumps(answers),
+                        attempt['user'].get('fullname', attempt['user'].get('username', 'Unknown')),
+                        attempt['user'].get('strand', 'Unknown'),
+                        attempt['history']['timestamp']
                     )
-                )
-                print(f"Successfully inserted quiz attempt with ID: {cursor.lastrowid}")
-            conn.commit()
-            conn.close()
-    except Exception as e:
-        print(f"Error recording quiz attempt in database: {e}")
-    
-    # Create quiz result record - use datetime directly since we have a custom encoder
-    result = {
-        'quiz_id': quiz_id,
-        'quiz_title': quiz.get('title', ''),
-        'timestamp': datetime.now(),
-        'raw_score': raw_score,
-        'total_score': total_score,
-        'score_percentage': score_percentage,
-        'question_results': question_results,
-        'timeout': timeout,
+                    for attempt, (answers, question_set) in zip(attempts, encoded)
+                ]
+            )
+        conn.commit()
+        for (quiz_id, version), questions in new_sets.items():
+            answer_codec.remember(quiz_id, version, questions)
+        log.info("Recorded %s quiz attempts", len(attempts))
+    finally:
+        conn.close()
+
+def record_attempts(attempts):
+    # Applies a batch drained from the submission spool; raising leaves the batch spooled for a retry
+    save_attempts_to_file(attempts)
+    insert_attempts_to_db(attempts)
+
+submission_spool.init_app(app, record_attempts)
+
+def attempt_from_history(attempt, user, quiz_titles):
+    return {
+        'quiz_id': attempt.get('quiz_id'),
+        'quiz_title': attempt.get('quiz_title', quiz_titles.get(attempt.get('quiz_id'), '')),
+        'timestamp': attempt.get('timestamp'),
+        'raw_score': attempt.get('raw_score', 0),
+        'total_score': attempt.get('total_score', 0),
+        'score_percentage': attempt.get('score_percentage', 0),
+        'question_results': attempt.get('question_results', []),
+        'timeout': attempt.get('timeout', False),
         'student_name': user.get('fullname', user.get('username', 'Unknown')),
-        'student_email': user.get('email', session.get('user_email', 'Unknown')),
+        'student_email': user.get('email', ''),
         'student_strand': user.get('strand', 'Unknown')
     }
+
+def load_question_set(cursor, quiz_id, version):
+    """A question set compact answers refer to (None if it isn't stored)"""
+    cursor.execute("SELECT questions FROM quiz_question_sets WHERE quiz_id = %s AND version = %s", (quiz_id, version))
+    row = cursor.fetchone()
+    if not row:
+        log.warning("Question set %s of quiz %s is missing", version, quiz_id, extra={'quiz_id': quiz_id})
+        return None
+    return json_codec.loads(row['questions']) if isinstance(row['questions'], (str, bytes)) else row['questions']
+
+def load_attempt_result(attempt_id, user):
+    """
+    Load a submitted attempt for the results page, from the database first
+    and then from the user's file-based quiz history.
+    """
+    quiz_titles = {q['id']: q.get('title', '') for q in load_quizzes()}
     
-    # Store the result in the session for display on the results page
-    session['last_quiz_results'] = result
+    # Just submitted and still waiting in the spool
+    if submission_spool.SUBMISSION_SPOOL:
+        pending = submission_spool.find(
+            lambda record: record['attempt_id'] == attempt_id and record['user_email'] == user.get('email')
+        )
+        if pending:
+            return attempt_from_history(pending['history'], user, quiz_titles)
     
-    # Redirect to results page
-    return redirect(url_for('quiz_results', quiz_id=quiz_id, score=f"{raw_score}/{total_score}"))
+    conn = get_db_connection()
+    if conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    # Archived attempts keep a summary row here; their answers come from the archive
+                    f"""SELECT qa.quiz_id, qa.score, qa.raw_score, qa.total_questions, qa.end_time,
+                              qa.student_name, qa.student_strand, {attempt_archive.ANSWERS_COLUMN}
+                       FROM quiz_attempts qa {attempt_archive.ARCHIVED_ANSWERS_JOIN}
+                       WHERE qa.attempt_uuid = %s AND qa.user_id = %s""",
+                    (attempt_id, user.get('id', 0))
+                )
+                row = cursor.fetchone()
+                if row:
+                    question_results = answer_codec.decode(
+                        row['answers'], row['quiz_id'], lambda quiz_id, version: load_question_set(cursor, quiz_id, version)
+                    )
+            if row:
+                return {
+                    'quiz_id': row['quiz_id'],
+                    'quiz_title': quiz_titles.get(row['quiz_id'], ''),
+                    'timestamp': row['end_time'],
+                    'raw_score': row['raw_score'],
+                    'total_score': row['total_questions'],
+                    'score_percentage': float(row['score']),
+                    'question_results': question_results,
+                    'timeout': False,
+                    'student_name': row['student_name'] or user.get('fullname', user.get('username', 'Unknown')),
+                    'student_email': user.get('email', ''),
+                    'student_strand': row['student_strand'] or user.get('strand', 'Unknown')
+                }
+        except Exception as e:
+            log.error("Error loading quiz attempt %s from database: %s", attempt_id, e)
+        finally:
+            conn.close()
+    
+    # Fallback to file-based quiz history
+    file_user = load_file_user(user.get('email', '')) or {}
+    for attempt in file_user.get('quiz_history', []):
+        if attempt.get('attempt_id') == attempt_id:
+            return attempt_from_history(attempt, user, quiz_titles)
+    return None
 
 @app.route('/quiz-results')
 def quiz_results():
@@ -1051,11 +1476,14 @@ def quiz_results():
         flash('Please log in to view quiz results', 'error')
         return redirect(url_for('index'))
     
-    if 'last_quiz_results' not in session:
+    attempt_id = request.args.get('attempt_id') or session.get('last_attempt_id')
+    user = get_user_by_email(session['user_email']) if attempt_id else None
+    results = load_attempt_result(attempt_id, user) if user else None
+    
+    if not results:
         flash('No quiz results found', 'error')
         return redirect(url_for('dashboard'))
     
-    results = session['last_quiz_results']
     return render_template('quiz_results.html', results=results)
 
 def check_ai_content(text):
@@ -1085,7 +1513,7 @@ def check_plagiarism(text):
         
         return plagiarism_score
     except Exception as e:
-        print(f"Error checking plagiarism: {e}")
+        log.error("Error checking plagiarism: %s", e)
         return 0  # Default to no plagiarism on error
 
 @app.route('/fail-quiz', methods=['GET', 'POST'])
@@ -1137,12 +1565,12 @@ def fail_quiz():
                             quiz_id,
                             0,  # score is 0 for failed quiz
                             False,  # not passed
-                            json.dumps([{
+                            json_codec.dumps([{
                                 'question': 'Quiz failed',
                                 'question_type': 'system',
                                 'reason': 'Timeout' if reason == 'timeout' else 'Eye tracking violation detected',
                                 'is_correct': False
-                            }], cls=DateTimeEncoder),
+                            }]),
                             student_name,
                             student_strand
                         )
@@ -1150,28 +1578,29 @@ def fail_quiz():
                 conn.commit()
                 conn.close()
         except Exception as e:
-            print(f"Error recording failed quiz in database: {e}")
+            log.error("Error recording failed quiz in database: %s", e, extra={'quiz_id': quiz_id})
     
     # Record failed quiz result in file-based system as fallback
-    users = load_users()
     user_email = session['user_email']
-    
-    if user_email in users:
-        if 'quiz_history' not in users[user_email]:
-            users[user_email]['quiz_history'] = []
-        
-        # Use datetime directly since we have a custom encoder
-        users[user_email]['quiz_history'].append({
-            'quiz_id': quiz_id,
-            'quiz_title': quiz.get('title'),
-            'score': 0,
-            'total_questions': len(quiz.get('questions', [])),
-            'percentage': 0,
-            'failed_reason': 'Timeout' if reason == 'timeout' else 'Eye tracking violation detected',
-            'timestamp': datetime.now()
-        })
+    with user_store.locked(USERS_FILE):
+        users = load_users()
         
-        save_users(users)
+        if user_email in users:
+            if 'quiz_history' not in users[user_email]:
+                users[user_email]['quiz_history'] = []
+            
+            # Use datetime directly since we have a custom encoder
+            users[user_email]['quiz_history'].append({
+                'quiz_id': quiz_id,
+                'quiz_title': quiz.get('title'),
+                'score': 0,
+                'total_questions': len(quiz.get('questions', [])),
+                'percentage': 0,
+                'failed_reason': 'Timeout' if reason == 'timeout' else 'Eye tracking violation detected',
+                'timestamp': datetime.now()
+            })
+            
+            save_users(users)
     
     if reason == 'timeout':
         flash('Quiz failed: Time limit exceeded.', 'error')
@@ -1180,6 +1609,55 @@ def fail_quiz():
     
     return redirect(url_for('dashboard'))
 
+def detect_eyes(image_bytes):
+    """
+    Run face and eye detection on an encoded webcam frame.
+    Returns the payload sent back by /api/check-eyes.
+    """
+    # Convert to OpenCV format
+    np_arr = np.frombuffer(image_bytes, np.uint8)
+    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    
+    # Convert to grayscale for face detection
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    # Load face detector
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+    
+    # Detect faces
+    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    
+    if len(faces) == 0:
+        return {
+            'eyesOpen': False, 
+            'reason': 'No face detected',
+            'warning': True,
+            'message': 'Face not visible - please stay in frame'
+        }
+    
+    # Check for eyes in the face
+    eyes_detected = False
+    for (x, y, w, h) in faces:
+        roi_gray = gray[y:y+h, x:x+w]
+        eyes = eye_cascade.detectMultiScale(roi_gray)
+        if len(eyes) >= 1:  # At least one eye detected
+            eyes_detected = True
+            break
+    
+    if not eyes_detected:
+        return {
+            'eyesOpen': False,
+            'reason': 'Eyes not detected',
+            'warning': True,
+            'message': 'Eyes not visible - please face the screen'
+        }
+    
+    return {
+        'eyesOpen': True,
+        'reason': 'Eyes detected'
+    }
+
 @app.route('/api/check-eyes', methods=['POST'])
 def check_eyes():
     if 'user_email' not in session:
@@ -1195,52 +1673,10 @@ def check_eyes():
         image_data = image_data.split(',')[1]
         image_bytes = base64.b64decode(image_data)
         
-        # Convert to OpenCV format
-        np_arr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-        
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Load face detector
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        
-        # Detect faces
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        if len(faces) == 0:
-            return jsonify({
-                'eyesOpen': False, 
-                'reason': 'No face detected',
-                'warning': True,
-                'message': 'Face not visible - please stay in frame'
-            })
-        
-        # Check for eyes in the face
-        eyes_detected = False
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y+h, x:x+w]
-            eyes = eye_cascade.detectMultiScale(roi_gray)
-            if len(eyes) >= 1:  # At least one eye detected
-                eyes_detected = True
-                break
-        
-        if not eyes_detected:
-            return jsonify({
-                'eyesOpen': False,
-                'reason': 'Eyes not detected',
-                'warning': True,
-                'message': 'Eyes not visible - please face the screen'
-            })
-        
-        return jsonify({
-            'eyesOpen': True,
-            'reason': 'Eyes detected'
-        })
+        return jsonify(detect_eyes(image_bytes))
     
     except Exception as e:
-        print(f"Error in eye detection: {str(e)}")
+        log.warning("Error in eye detection: %s", e)
         return jsonify({'error': str(e), 'eyesOpen': True}), 200  # Return 200 to avoid interrupting quiz
 
 @app.route('/logout')
@@ -1261,6 +1697,7 @@ def admin_login():
         
         # Admin login
         if username == 'admin' and password == 'admin123':
+            session_store.regenerate(session)
             session['admin_logged_in'] = True
             session['is_teacher'] = False
             flash('Admin login successful', 'success')
@@ -1270,7 +1707,13 @@ def admin_login():
         email = username  # Use username field for email
         user = get_user_by_email(email)
         
-        if user and user.get('role') == 'teacher' and check_password_hash(user['password'], password):
+        valid, new_hash = False, None
+        if user and user.get('role') == 'teacher':
+            valid, new_hash = password_hashing.verify_password(user['password'], password)
+        if valid:
+            if new_hash:
+                save_password_hash(email, new_hash)
+            session_store.regenerate(session)
             session['admin_logged_in'] = True
             session['is_teacher'] = True
             session['user_email'] = email
@@ -1279,10 +1722,15 @@ def admin_login():
             return redirect(url_for('admin_dashboard'))
         
         # If not found in database, check file-based storage
-        users = load_users()
-        file_user = users.get(email)
+        file_user = load_file_user(email)
         
-        if file_user and file_user.get('role') == 'teacher' and check_password_hash(file_user['password'], password):
+        # Without a database get_user_by_email already returned this user - don't check the same hash twice
+        if file_user and file_user.get('role') == 'teacher' and file_user['password'] != (user or {}).get('password'):
+            valid, new_hash = password_hashing.verify_password(file_user['password'], password)
+        if valid:
+            if new_hash:
+                save_password_hash(email, new_hash)
+            session_store.regenerate(session)
             session['admin_logged_in'] = True
             session['is_teacher'] = True
             session['user_email'] = email
@@ -1310,12 +1758,12 @@ def admin_dashboard():
     try:
         conn = get_db_connection()
         if conn:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM users ORDER BY created_at DESC")
                 db_users = cursor.fetchall()
             conn.close()
     except Exception as e:
-        print(f"Error fetching users from database: {e}")
+        log.error("Error fetching users from database: %s", e)
     
     # Merge database users with file-based users
     for email, user_data in users.items():
@@ -1346,10 +1794,11 @@ def admin_dashboard():
     try:
         conn = get_db_connection()
         if conn:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                # Get all quiz attempts with user information
+            with conn.cursor() as cursor:
+                # Get all quiz attempts with user information (not the answers - the page only lists scores)
                 cursor.execute("""
-                    SELECT qa.*, 
+                    SELECT qa.attempt_uuid, qa.user_id, qa.quiz_id, qa.start_time, qa.end_time, qa.score,
+                           qa.raw_score, qa.total_questions, qa.passed,
                            COALESCE(qa.student_name, u.fullname, u.username) AS student_name,
                            COALESCE(qa.student_strand, u.strand) AS student_strand,
                            u.email
@@ -1357,17 +1806,16 @@ def admin_dashboard():
                     LEFT JOIN users u ON qa.user_id = u.id
                     ORDER BY qa.start_time DESC
                 """)
-                attempts = cursor.fetchall()
                 
-                # Group attempts by quiz_id
-                for attempt in attempts:
-                    quiz_id = attempt['quiz_id']
-                    if quiz_id not in quiz_attempts:
-                        quiz_attempts[quiz_id] = []
-                    quiz_attempts[quiz_id].append(attempt)
+                # Group attempts by quiz_id, as slotted models rather than one dict per row
+                for row in cursor.fetchall():
+                    attempt = models.Attempt.from_row(row)
+                    if attempt.quiz_id not in quiz_attempts:
+                        quiz_attempts[attempt.quiz_id] = []
+                    quiz_attempts[attempt.quiz_id].append(attempt)
             conn.close()
     except Exception as e:
-        print(f"Error fetching quiz attempts: {e}")
+        log.error("Error fetching quiz attempts: %s", e)
     
     # Add attempts count to each quiz
     for quiz in quizzes:
@@ -1450,12 +1898,10 @@ def admin_post_quiz():
                     (quiz_id, db_quiz_id)
                 )
                 
-                print(f"Created new quiz in database with ID: {db_quiz_id}, UUID: {quiz_id}")
+                log.info("Created new quiz in database with ID: %s, UUID: %s", db_quiz_id, quiz_id)
             conn.commit()
         except Exception as e:
-            print(f"Error adding quiz to database: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error adding quiz to database: %s", e)
         finally:
             conn.close()
         
@@ -1470,36 +1916,34 @@ def get_quiz_questions(quiz_id):
     if 'admin_logged_in' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    quizzes = load_quizzes()
-    quiz = next((q for q in quizzes if q['id'] == quiz_id), None)
+    # The ETag follows the quizzes file, so an unchanged quiz is answered with a 304 without loading it
+    version, last_modified = http_cache.file_version(QUIZZES_FILE)
     
-    if not quiz:
-        return jsonify({'error': 'Quiz not found'}), 404
+    def build_payload():
+        quizzes = load_quizzes()
+        quiz = next((q for q in quizzes if q['id'] == quiz_id), None)
+        
+        if not quiz:
+            return {'error': 'Quiz not found'}, 404
 
-    # If questions don't exist, return empty list
-    return jsonify({
-        'questions': quiz.get('questions', [])
-    })
+        # If questions don't exist, return empty list
+        return {
+            'questions': quiz.get('questions', [])
+        }
+    
+    return http_cache.conditional_json(f'quiz-{quiz_id}-{version}', last_modified, build_payload)
 
 @app.route('/nimda/save_quiz_questions', methods=['POST'])
 def admin_save_quiz_questions():
     if 'admin_logged_in' not in session:
         return jsonify({"error": "Unauthorized"}), 401
 
-    # Debug logging
-    print("\n===== SAVE QUIZ QUESTIONS DEBUG =====")
-    
     quiz_id = request.form.get('quiz_id')
-    print(f"Quiz ID (UUID): {quiz_id}")
-    
     questions_text = request.form.getlist('questions[]')
-    print(f"Number of questions: {len(questions_text)}")
-    
     question_indices = request.form.getlist('question_index[]')
-    print(f"Question indices: {question_indices}")
-    
     question_types = request.form.getlist('question_types[]')
-    print(f"Question types: {question_types}")
+    log.debug("Saving %d questions for quiz %s: indices=%r, types=%r",
+              len(questions_text), quiz_id, question_indices, question_types, extra={'quiz_id': quiz_id})
     
     time_per_question = []
     total_time = 0
@@ -1513,12 +1957,11 @@ def admin_save_quiz_questions():
             break
     
     if not quiz:
-        print("ERROR: Quiz not found!")
+        log.warning("Quiz %s not found while saving questions", quiz_id)
         return jsonify({"error": "Quiz not found"}), 404
     
     # Initialize questions array
     quiz['questions'] = []
-    print(f"Reset quiz questions array to empty")
     
     # Store database quiz ID if it exists
     db_quiz_id = None
@@ -1531,11 +1974,11 @@ def admin_save_quiz_questions():
             
             if mapping:
                 db_quiz_id = mapping['db_id']
-                print(f"Found quiz in mapping table with DB ID: {db_quiz_id}")
+                log.debug("Found quiz in mapping table with DB ID: %s", db_quiz_id)
                 
                 # Delete existing questions for this quiz
                 cursor.execute("DELETE FROM quiz_questions WHERE quiz_id = %s", (db_quiz_id,))
-                print(f"Deleted existing questions for quiz ID: {db_quiz_id}")
+                log.debug("Deleted existing questions for quiz ID: %s", db_quiz_id)
             else:
                 # Check if quiz exists in database by ID
                 cursor.execute("SELECT id FROM quizzes WHERE id = %s", (quiz_id,))
@@ -1543,7 +1986,7 @@ def admin_save_quiz_questions():
                 
                 if result:
                     db_quiz_id = result['id']
-                    print(f"Found quiz directly in database with ID: {db_quiz_id}")
+                    log.debug("Found quiz directly in database with ID: %s", db_quiz_id)
                     
                     # Add to mapping for future lookups
                     cursor.execute(
@@ -1553,7 +1996,7 @@ def admin_save_quiz_questions():
                     
                     # Delete existing questions
                     cursor.execute("DELETE FROM quiz_questions WHERE quiz_id = %s", (db_quiz_id,))
-                    print(f"Deleted existing questions for quiz ID: {db_quiz_id}")
+                    log.debug("Deleted existing questions for quiz ID: %s", db_quiz_id)
                 else:
                     # Need to create the quiz in database
                     cursor.execute(
@@ -1569,7 +2012,7 @@ def admin_save_quiz_questions():
                         )
                     )
                     db_quiz_id = cursor.lastrowid
-                    print(f"Created new quiz in database with ID: {db_quiz_id}")
+                    log.info("Created new quiz in database with ID: %s", db_quiz_id)
                     
                     # Add to mapping
                     cursor.execute(
@@ -1579,9 +2022,7 @@ def admin_save_quiz_questions():
         
         conn.commit()
     except Exception as e:
-        print(f"Error accessing quiz in database: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error accessing quiz in database: %s", e)
     finally:
         conn.close()
     
@@ -1594,8 +2035,7 @@ def admin_save_quiz_questions():
         question_type = question_types[idx]
         time_limit = int(request.form.get(f'time_limit_{q_idx}', 30))
         
-        print(f"\nProcessing question {idx+1}: {question_text[:30]}...")
-        print(f"  Type: {question_type}, Time limit: {time_limit}")
+        log.debug("Processing question %d: %.30s... type=%s, time limit=%s", idx + 1, question_text, question_type, time_limit)
         
         # Common question attributes
         question_data = {
@@ -1620,30 +2060,25 @@ def admin_save_quiz_questions():
             question_data["options"] = options
             question_data["correct_answer"] = correct_answer
             
-            db_question["options"] = json.dumps(options, cls=DateTimeEncoder)
+            db_question["options"] = json_codec.dumps(options)
             db_question['correct_answer'] = str(correct_answer)
             
-            print(f"  Multiple choice: {len(options)} options, correct: {correct_answer}")
-            
         elif question_type == "true_false":
             correct_answer = request.form.get(f'tf_correct_answer_{q_idx}')
             question_data["correct_answer"] = correct_answer
             db_question['correct_answer'] = correct_answer
-            print(f"  True/False: correct: {correct_answer}")
             
         elif question_type == "short_answer":
             correct_answer = request.form.get(f'short_answer_{q_idx}')
             question_data["correct_answer"] = correct_answer
             db_question['correct_answer'] = correct_answer
             question_data["ai_detection"] = request.form.get(f'ai_detection_{q_idx}') == 'on'
-            print(f"  Short answer: correct: {correct_answer}, AI detection: {question_data['ai_detection']}")
             
         elif question_type == "fill_blank":
             blanks = request.form.getlist(f'fill_blank_answers_{q_idx}[]')
             question_data["blanks"] = blanks
             db_question['correct_answer'] = blanks[0] if blanks else ''
-            db_question['options'] = json.dumps(blanks, cls=DateTimeEncoder)
-            print(f"  Fill in blank: {len(blanks)} blanks")
+            db_question['options'] = json_codec.dumps(blanks)
             
         elif question_type == "matching":
             left_items = request.form.getlist(f'matching_left_{q_idx}[]')
@@ -1663,10 +2098,8 @@ def admin_save_quiz_questions():
                 'right_items': right_items,
                 'correct_matches': correct_matches
             }
-            db_question['options'] = json.dumps(matching_data, cls=DateTimeEncoder)
-            db_question['correct_answer'] = json.dumps(correct_matches, cls=DateTimeEncoder)
-            
-            print(f"  Matching: {len(left_items)} left items, {len(right_items)} right items")
+            db_question['options'] = json_codec.dumps(matching_data)
+            db_question['correct_answer'] = json_codec.dumps(correct_matches)
         
         # Add to questions list and track time
         quiz['questions'].append(question_data)
@@ -1676,7 +2109,6 @@ def admin_save_quiz_questions():
     
     # Update total time for the quiz
     quiz['total_time'] = total_time
-    print(f"\nTotal quiz time: {total_time} seconds")
     
     # Add author information if provided
     author_first_name = request.form.get('author_first_name', '')
@@ -1686,17 +2118,15 @@ def admin_save_quiz_questions():
             'first_name': author_first_name,
             'last_name': author_last_name
         }
-        print(f"Author: {author_first_name} {author_last_name}")
     
     # Add grade level if provided
     grade_level = request.form.get('grade_level', '')
     if grade_level:
         quiz['grade_level'] = grade_level
-        print(f"Grade level: {grade_level}")
     
     # Save updated quizzes to file
     save_quizzes(quizzes)
-    print(f"Saved quiz to file with {len(quiz['questions'])} questions")
+    log.info("Saved quiz %s to file with %d questions, total time %ss", quiz_id, len(quiz['questions']), total_time)
     
     # Save questions to database
     if db_quiz_id:
@@ -1717,30 +2147,29 @@ def admin_save_quiz_questions():
                         )
                     )
             conn.commit()
-            print(f"Saved {len(db_questions)} questions to database for quiz ID: {db_quiz_id}")
+            log.info("Saved %d questions to database for quiz ID: %s", len(db_questions), db_quiz_id)
         except Exception as e:
-            print(f"Error saving questions to database: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error saving questions to database: %s", e)
         finally:
             conn.close()
     
-    print("===== END SAVE QUIZ QUESTIONS DEBUG =====\n")
-    
-    # Verify the save worked by trying to load the file again
-    verification_quizzes = load_quizzes()
-    verification_quiz = next((q for q in verification_quizzes if q['id'] == quiz_id), None)
-    if verification_quiz and 'questions' in verification_quiz:
-        print(f"Verification: Quiz has {len(verification_quiz['questions'])} questions after saving")
-    else:
-        print("WARNING: Verification failed - quiz questions may not have been saved correctly")
+    # Verify the save worked by trying to load the file again (debug only - it re-reads the whole file)
+    if log.isEnabledFor(logging.DEBUG):
+        verification_quizzes = load_quizzes()
+        verification_quiz = next((q for q in verification_quizzes if q['id'] == quiz_id), None)
+        if verification_quiz and 'questions' in verification_quiz:
+            log.debug("Verification: quiz has %d questions after saving", len(verification_quiz['questions']))
+        else:
+            log.warning("Verification failed - quiz questions may not have been saved correctly")
     
     return jsonify({"success": True, "message": f"Saved {len(quiz['questions'])} questions"})
 
 @app.route('/get_categories/<strand>')
 def get_categories(strand):
     categories = get_strand_categories(strand)
-    return {'categories': categories}
+    etag = 'categories-' + hashlib.md5(json.dumps(categories).encode('utf-8')).hexdigest()[:16]
+    return http_cache.conditional_json(etag, None, lambda: {'categories': categories},
+                                       cache_control='public, max-age=300')
 
 @app.route('/account_settings')
 def account_settings():
@@ -1801,10 +2230,10 @@ def update_account():
     session['username'] = new_username
     
     if current_password and new_password:
-        if not check_password_hash(user['password'], current_password):
+        if not password_hashing.verify_password(user['password'], current_password)[0]:
             return jsonify({"success": False, "message": "Current password is incorrect"})
         
-        data['password'] = generate_password_hash(new_password, method='pbkdf2:sha256')
+        data['password'] = password_hashing.hash_password(new_password)
     
     if data:
         if update_user(email, data):
@@ -1822,8 +2251,8 @@ def delete_account():
     email = session['user_email']
 
     if delete_user(email):
-    session.clear()
-    flash('Your account has been deleted', 'success')
+        session.clear()
+        flash('Your account has been deleted', 'success')
     else:
         flash('Failed to delete account', 'error')
     
@@ -1863,15 +2292,16 @@ def create_teacher():
         flash('Email already registered', 'error')
         return redirect(url_for('admin_dashboard'))
     
-    # Create teacher account in database with original password
-    # create_user will hash it internally
+    # Hashed once for both the database and the file storage
+    hashed_password = password_hashing.hash_password(password)
     db_success = create_user(
         username,
         fullname,
         'TEACHER',  # Use TEACHER as LRN for teachers
         email,
-        password,   # Not hashing here as create_user will do it
-        subject     # Use subject as strand for teachers
+        password,
+        subject,    # Use subject as strand for teachers
+        hashed_password
     )
     
     # Update role in database if successful
@@ -1879,22 +2309,81 @@ def create_teacher():
         update_user(email, {'role': 'teacher'})
     
     # Always add to file storage as backup
-    # Hash password for storage in the file
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-    users[email] = {
-        'username': username,
-        'fullname': fullname,
-        'lrn': 'TEACHER',
-        'password': hashed_password,  # Already hashed
-        'strand': subject,
-        'role': 'teacher',
-        'created_at': datetime.now().isoformat()
-    }
-    save_users(users)
+    with user_store.locked(USERS_FILE):
+        users = load_users()
+        users[email] = {
+            'username': username,
+            'fullname': fullname,
+            'lrn': 'TEACHER',
+            'password': hashed_password,  # Already hashed
+            'strand': subject,
+            'role': 'teacher',
+            'created_at': datetime.now().isoformat()
+        }
+        save_users(users)
+    user_cache.invalidate(email)
     
     flash('Teacher account created successfully. Teacher can login through the admin panel using their email and password.', 'success')
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/nimda/import_roster', methods=['POST'])
+def import_roster():
+    if 'admin_logged_in' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    roster = request.files.get('roster')
+    if not roster or not roster.filename:
+        return jsonify({"error": "Choose a roster file to import"}), 400
+    if not roster.filename.lower().endswith(('.csv', '.json', '.jsonl')):
+        return jsonify({"error": "The roster must be a .csv, .json or .jsonl file"}), 400
+
+    job_id = roster_import.start(roster, roster.filename)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for('import_roster_status', job_id=job_id)
+    }), 202
+
+@app.route('/nimda/import_roster/<job_id>')
+def import_roster_status(job_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        status = roster_import.status(job_id)
+    except ValueError:
+        status = None
+    if status is None:
+        return jsonify({"error": "Import not found"}), 404
+    if status.get('generated_passwords') and status.get('state') == 'done':
+        status['credentials_url'] = url_for('import_roster_credentials', job_id=job_id)
+    return jsonify(status)
+
+@app.route('/nimda/import_roster/<job_id>/credentials')
+def import_roster_credentials(job_id):
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('admin_login'))
+    try:
+        path = roster_import.credentials_path(job_id)
+    except ValueError:
+        return "Import not found", 404
+    if not os.path.exists(path):
+        return "Import not found", 404
+    response = send_file(os.path.abspath(path), mimetype='text/csv', as_attachment=True,
+                         download_name=f'roster-credentials-{job_id[:8]}.csv')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/nimda/metrics')
+def admin_metrics():
+    # Admins can open this in the browser; scrapers can send the METRICS_TOKEN as a bearer token
+    token = os.getenv('METRICS_TOKEN')
+    authorized = 'admin_logged_in' in session or (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorized:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return metrics.registry.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/nimda/logout')
 def admin_logout():
     if 'admin_logged_in' in session:
@@ -0,0 +1,135 @@
+"""
+Structured, non-blocking logging for the quiz app.
+
+Request threads only put records on a bounded in-memory queue; a single
+listener thread formats them as JSON lines and writes them out. Each record
+carries the request's correlation id (X-Request-ID, generated when the
+client doesn't send one) and endpoint. Debug events are sampled per request
+so production can keep them switched on without paying for all of them.
+
+Settings (environment):
+  LOG_LEVEL              DEBUG, INFO, WARNING... (default INFO)
+  LOG_DEBUG_SAMPLE_RATE  share of requests whose debug events are kept (default 0.01)
+  LOG_QUEUE_SIZE         records buffered before new ones are dropped (default 10000)
+  LOG_FORMAT             json (default) or text
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+import metrics
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.01'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+
+# Attributes every LogRecord has - anything else was passed through extra={...}
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+def get_logger(name=None):
+    return logging.getLogger('quiz' if not name else f'quiz.{name}')
+
+def request_id():
+    """Correlation id of the current request, or None outside a request"""
+    if has_request_context():
+        return getattr(g, 'request_id', None)
+    return None
+
+class RequestContextFilter(logging.Filter):
+    """Attach the correlation id and endpoint, and apply debug sampling"""
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.endpoint = request.endpoint
+            sampled = getattr(g, 'log_debug_sampled', True)
+        else:
+            record.request_id = None
+            record.endpoint = None
+            sampled = random.random() < LOG_DEBUG_SAMPLE_RATE
+        if record.levelno <= logging.DEBUG and not sampled:
+            return False
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.registry.inc_counter('quiz_log_records_dropped_total', 'Log records dropped because the queue was full')
+
+    def prepare(self, record):
+        # Render the message and traceback here, leave the layout to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s')
+
+def setup_logging(app):
+    """Route the 'quiz' loggers through the queue and add per-request correlation ids"""
+    global _listener
+
+    logger = get_logger()
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+
+    if _listener is None:
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+        logger.addHandler(handler)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.log_debug_sampled = random.random() < LOG_DEBUG_SAMPLE_RATE
+
+    @app.after_request
+    def echo_request_id(response):
+        if getattr(g, 'request_id', None):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    return logger
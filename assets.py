@@ -0,0 +1,318 @@
+"""
+Static CSS/JS bundles for the page templates.
+
+Page styles and scripts live in static/src/css and static/src/js instead of
+inline <style>/<script> blocks, so browsers can cache them across page loads.
+build() minifies every source into a content-hashed bundle under
+static/dist/ and records it in static/dist/manifest.json. Templates refer to
+sources by name with asset_url('css/quiz.css'), which resolves to the bundle
+through the manifest, or to the unminified source in debug mode and when no
+build has been run - so development needs no build step.
+
+Minification uses rcssmin/rjsmin when they are installed and a conservative
+built-in minifier otherwise (comments and layout whitespace only, newlines
+kept in JS). Nothing here needs Node.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+from flask import current_app, url_for
+
+try:
+    import rcssmin
+except ImportError:  # Optional - built-in minifier without it
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:  # Optional - built-in minifier without it
+    rjsmin = None
+
+SRC_DIR = 'src'
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+_ASSET_URL_RE = re.compile(r"""asset_url\(\s*['"]([^'"]+)['"]\s*\)""")
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest_lock = threading.Lock()
+# Manifest path -> (mtime, parsed manifest)
+_manifests = {}
+
+# Characters a space next to them never matters for
+_CSS_TIGHT = set('{};,>')
+_JS_TIGHT = set('{}()[];,:=<>?!&|*%^~')
+# After these, a "/" starts a regex literal rather than a division
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'yield', 'await', 'instanceof'}
+
+def _scan_quoted(source, pos, out):
+    """Copy a quoted string starting at pos verbatim, return the position after it"""
+    quote = source[pos]
+    end = pos + 1
+    while end < len(source) and source[end] != quote:
+        end += 2 if source[end] == '\\' else 1
+    out.append(source[pos:end + 1])
+    return end + 1
+
+def _builtin_minify_css(source):
+    out = []
+    pending_space = False
+    pos, n = 0, len(source)
+    while pos < n:
+        c = source[pos]
+        if c.isspace():
+            pending_space = True
+            pos += 1
+            continue
+        if source.startswith('/*', pos):
+            end = source.find('*/', pos + 2)
+            pos = n if end == -1 else end + 2
+            pending_space = True
+            continue
+        prev = out[-1][-1] if out else ''
+        if pending_space and prev and prev not in _CSS_TIGHT and prev not in ':(' and c not in _CSS_TIGHT and c != ')':
+            out.append(' ')
+        pending_space = False
+        if c in '"\'':
+            pos = _scan_quoted(source, pos, out)
+            continue
+        if c == '}' and prev == ';':
+            out.pop()
+        out.append(c)
+        pos += 1
+    return ''.join(out)
+
+def _regex_allowed(out):
+    text = ''.join(out[-3:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _JS_REGEX_AFTER:
+        return True
+    match = re.search(r'[A-Za-z_$][\w$]*$', text)
+    return bool(match and match.group(0) in _JS_REGEX_KEYWORDS)
+
+def _scan_js(source, pos, out, in_template_expr=False):
+    """
+    Minify JS from pos, appending to out. Inside a template literal's ${...}
+    it stops at the matching closing brace and returns its position.
+    """
+    pending = None  # None, ' ' or '\n'
+    depth = 0
+    n = len(source)
+    while pos < n:
+        c = source[pos]
+        if c.isspace():
+            if c == '\n' or pending == '\n':
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            pos += 1
+            continue
+        if source.startswith('//', pos):
+            end = source.find('\n', pos)
+            pos = n if end == -1 else end
+            continue
+        if source.startswith('/*', pos):
+            end = source.find('*/', pos + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in source[pos:end] or pending == '\n':
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            pos = end
+            continue
+        if in_template_expr and c == '}' and depth == 0:
+            return pos
+
+        prev = out[-1][-1] if out else ''
+        if pending == '\n' and prev and prev not in '{;,' and c != '}':
+            out.append('\n')
+        elif pending and prev and prev not in _JS_TIGHT and c not in _JS_TIGHT and prev != '\n':
+            out.append(' ')
+        pending = None
+
+        if c in '"\'':
+            pos = _scan_quoted(source, pos, out)
+        elif c == '`':
+            # Template literal: copy verbatim, minifying only the ${...} expressions
+            out.append('`')
+            pos += 1
+            while pos < n and source[pos] != '`':
+                if source[pos] == '\\':
+                    out.append(source[pos:pos + 2])
+                    pos += 2
+                elif source.startswith('${', pos):
+                    out.append('${')
+                    pos = _scan_js(source, pos + 2, out, in_template_expr=True)
+                    out.append('}')
+                    pos += 1
+                else:
+                    out.append(source[pos])
+                    pos += 1
+            out.append('`')
+            pos += 1
+        elif c == '/' and _regex_allowed(out):
+            end = pos + 1
+            in_class = False
+            while end < n and (in_class or source[end] != '/'):
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            end += 1
+            while end < n and source[end].isalpha():
+                end += 1
+            out.append(source[pos:end])
+            pos = end
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            out.append(c)
+            pos += 1
+    return pos
+
+def _builtin_minify_js(source):
+    out = []
+    _scan_js(source, 0, out)
+    return ''.join(out)
+
+def minify_css(source):
+    return rcssmin.cssmin(source) if rcssmin else _builtin_minify_css(source)
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin else _builtin_minify_js(source)
+
+def rewrite_css_urls(css, source_dir, output_dir):
+    """Re-point relative url(...) references so they still resolve from output_dir"""
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(source_dir, url))
+        return f'url("{os.path.relpath(target, output_dir).replace(os.sep, "/")}")'
+    return _CSS_URL_RE.sub(replace, css)
+
+def iter_sources(static_folder):
+    src_root = os.path.join(static_folder, SRC_DIR)
+    for root, dirs, files in os.walk(src_root):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(('.css', '.js')):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, src_root).replace(os.sep, '/'), path
+
+def build(static_folder):
+    """Minify and fingerprint every source into static/dist; returns one report row per bundle"""
+    dist_root = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist_root, exist_ok=True)
+    manifest = {}
+    rows = []
+    for name, path in iter_sources(static_folder):
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if name.endswith('.css'):
+            minified = minify_css(rewrite_css_urls(source, os.path.dirname(path), dist_root))
+        else:
+            minified = minify_js(source)
+        data = minified.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(os.path.basename(name))
+        bundle = f'{stem}.{digest}.min{ext}'
+        with open(os.path.join(dist_root, bundle), 'wb') as f:
+            f.write(data)
+        manifest[name] = f'{DIST_DIR}/{bundle}'
+        rows.append({
+            'source': name,
+            'bundle': bundle,
+            'source_bytes': len(source.encode('utf-8')),
+            'min_bytes': len(data),
+            'min_gzip_bytes': len(gzip.compress(data, mtime=0))
+        })
+
+    # Write the manifest atomically, then drop bundles from earlier builds
+    tmp_path = os.path.join(dist_root, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(dist_root, MANIFEST_NAME))
+    current = {os.path.basename(bundle) for bundle in manifest.values()}
+    for filename in os.listdir(dist_root):
+        base = filename[:-3] if filename.endswith(('.br', '.gz')) else filename
+        if filename != MANIFEST_NAME and base not in current:
+            os.remove(os.path.join(dist_root, filename))
+    return rows
+
+def page_weight_report(templates_folder, static_folder):
+    """
+    Per template: bytes sent when its CSS/JS were inline vs now, on a first
+    visit (page + bundles) and on a repeat visit (bundles cached).
+    """
+    manifest = load_manifest(static_folder)
+    rows = []
+    for root, dirs, files in os.walk(templates_folder):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                page = f.read()
+            names = _ASSET_URL_RE.findall(page.decode('utf-8', 'replace'))
+            if not names:
+                continue
+            sources, bundles = b'', []
+            for name in names:
+                with open(os.path.join(static_folder, SRC_DIR, name), 'rb') as f:
+                    sources += f.read()
+                bundle_path = os.path.join(static_folder, manifest.get(name, os.path.join(SRC_DIR, name)))
+                with open(bundle_path, 'rb') as f:
+                    bundles.append(f.read())
+            inline = page + sources
+            first_visit = len(page) + sum(len(bundle) for bundle in bundles)
+            rows.append({
+                'template': os.path.relpath(path, templates_folder),
+                'inline_bytes': len(inline),
+                'first_visit_bytes': first_visit,
+                'repeat_visit_bytes': len(page),
+                'inline_gzip': len(gzip.compress(inline, mtime=0)),
+                'first_visit_gzip': len(gzip.compress(page, mtime=0)) + sum(
+                    len(gzip.compress(bundle, mtime=0)) for bundle in bundles),
+                'repeat_visit_gzip': len(gzip.compress(page, mtime=0))
+            })
+    return rows
+
+def read_manifest(path):
+    """A JSON build manifest, re-read whenever a new build replaces it ({} if there is none)"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        with _manifest_lock:
+            try:
+                with open(path) as f:
+                    cached = (mtime, json.load(f))
+            except (OSError, ValueError):
+                return {}
+            _manifests[path] = cached
+    return cached[1]
+
+def load_manifest(static_folder):
+    """The bundle manifest (source name -> bundle path)"""
+    return read_manifest(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME))
+
+def asset_url(name):
+    """URL of a page stylesheet/script by source name, e.g. asset_url('js/quiz.js')"""
+    app = current_app
+    bundle = None if app.debug else load_manifest(app.static_folder).get(name)
+    return url_for('static', filename=bundle or f'{SRC_DIR}/{name}')
+
+def init_app(app):
+    app.add_template_global(asset_url, 'asset_url')
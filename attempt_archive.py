@@ -0,0 +1,197 @@
+"""
+Hot/cold archival of quiz_attempts.
+
+quiz_attempts keeps every attempt of every school year, answers included,
+so the table and its share of the buffer pool only ever grow. Once a term
+is over, its attempts are only looked at again for the odd historical
+result page.
+
+archive() moves the attempts that ended before a term boundary to
+quiz_attempts_archive (compressed rows where the server allows it):
+
+  - the full row, answers included, is copied to the archive, labelled
+    with its school year (e.g. 2024-2025)
+  - the row in quiz_attempts stays as a summary: scores, student, quiz and
+    times are kept, answers is cleared and archived set to 1. Dashboards,
+    the one-attempt-per-quiz check and the admin attempt list keep working
+    from the hot table, but the rows no longer carry the answers JSON
+  - rows are moved in batches of ARCHIVE_BATCH_SIZE, one transaction each
+    (copy, then clear), so an interrupted run leaves nothing half-moved
+    and can simply be run again
+
+load_attempt_result() reads an archived attempt's answers from the
+archive in the same query (see ARCHIVED_ANSWERS_JOIN), so results pages of
+old attempts look the same. Resetting or deleting a quiz removes its
+archived attempts too.
+
+School years start on ARCHIVE_TERM_START (month-day). By default every
+school year before the current one is archived:
+
+    python attempt_archive.py --dry-run
+    python attempt_archive.py                      # everything before the current school year
+    python attempt_archive.py --before 2025-01-01  # any other boundary
+
+Settings (environment):
+  ARCHIVE_TERM_START  first day of the school year, MM-DD (default 06-01)
+  ARCHIVE_BATCH_SIZE  attempts moved per transaction (default 1000)
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime
+
+import app_logging
+import metrics
+
+ARCHIVE_TERM_START = os.getenv('ARCHIVE_TERM_START', '06-01')
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+
+# Columns copied to the archive, in quiz_attempts
+COLUMNS = ('id', 'attempt_uuid', 'user_id', 'quiz_id', 'start_time', 'end_time', 'score', 'raw_score',
+           'total_questions', 'passed', 'answers', 'student_name', 'student_strand')
+
+# Joined into quiz_attempts (as qa) reads that need answers: archived rows get theirs from the archive
+ARCHIVED_ANSWERS_JOIN = "LEFT JOIN quiz_attempts_archive qaa ON qa.archived = 1 AND qaa.id = qa.id"
+ANSWERS_COLUMN = "COALESCE(qa.answers, qaa.answers) AS answers"
+
+log = app_logging.get_logger('attempt_archive')
+
+def create_tables(cursor):
+    """The archive table and the archived flag of quiz_attempts (called from app.create_tables)"""
+    definition = """
+    CREATE TABLE IF NOT EXISTS quiz_attempts_archive (
+        id INT PRIMARY KEY,
+        attempt_uuid VARCHAR(36),
+        user_id INT NOT NULL,
+        quiz_id VARCHAR(255) NOT NULL,
+        start_time TIMESTAMP NULL,
+        end_time TIMESTAMP NULL,
+        score DECIMAL(5,2) DEFAULT 0,
+        raw_score INT DEFAULT 0,
+        total_questions INT DEFAULT 0,
+        passed BOOLEAN DEFAULT FALSE,
+        answers JSON,
+        student_name VARCHAR(255),
+        student_strand VARCHAR(50),
+        term VARCHAR(9) NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX (attempt_uuid),
+        INDEX (user_id),
+        INDEX (quiz_id),
+        INDEX (term)
+    )"""
+    try:
+        # Cold rows are rarely read - worth compressing where InnoDB supports it
+        cursor.execute(definition + " ROW_FORMAT=COMPRESSED")
+    except Exception as e:
+        log.info("Creating quiz_attempts_archive without compression: %s", e)
+        cursor.execute(definition)
+
+    cursor.execute("SHOW COLUMNS FROM quiz_attempts LIKE 'archived'")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN archived BOOLEAN NOT NULL DEFAULT FALSE")
+        log.info("Added archived column to quiz_attempts table")
+    cursor.execute("SHOW INDEX FROM quiz_attempts WHERE Key_name = 'end_time_archived'")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE quiz_attempts ADD INDEX end_time_archived (archived, end_time)")
+        log.info("Added (archived, end_time) index to quiz_attempts table")
+
+def _term_start(year, term_start=ARCHIVE_TERM_START):
+    month, day = (int(part) for part in term_start.split('-'))
+    return date(year, month, day)
+
+def term_of(when, term_start=ARCHIVE_TERM_START):
+    """School year label of a date, e.g. 2024-2025"""
+    when = when.date() if isinstance(when, datetime) else when
+    year = when.year if when >= _term_start(when.year, term_start) else when.year - 1
+    return f'{year}-{year + 1}'
+
+def current_term_start(today=None, term_start=ARCHIVE_TERM_START):
+    """First day of the school year today is in - the default archive boundary"""
+    today = today or date.today()
+    start = _term_start(today.year, term_start)
+    return start if today >= start else _term_start(today.year - 1, term_start)
+
+def archive(conn, before, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """Move the attempts that ended before `before` (a date) to the archive; returns counts per term"""
+    moved = {}
+    last_id = 0
+    while True:
+        with conn.cursor() as cursor:
+            # Attempts without an end time (old fail_quiz rows) go by their start time
+            cursor.execute(
+                """SELECT id, COALESCE(end_time, start_time) AS ended FROM quiz_attempts
+                   WHERE archived = 0 AND id > %s AND COALESCE(end_time, start_time) < %s
+                   ORDER BY id LIMIT %s""",
+                (last_id, before, batch_size)
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return moved
+        last_id = rows[-1]['id']
+
+        by_term = {}
+        for row in rows:
+            by_term.setdefault(term_of(row['ended']), []).append(row['id'])
+        for term, ids in by_term.items():
+            moved[term] = moved.get(term, 0) + len(ids)
+        if dry_run:
+            continue
+
+        started = time.perf_counter()
+        try:
+            with conn.cursor() as cursor:
+                for term, ids in by_term.items():
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    # IGNORE: a batch copied by a run that died before clearing the hot rows is copied again
+                    cursor.execute(
+                        f"""INSERT IGNORE INTO quiz_attempts_archive ({', '.join(COLUMNS)}, term)
+                            SELECT {', '.join(COLUMNS)}, %s FROM quiz_attempts WHERE id IN ({placeholders})""",
+                        [term] + ids
+                    )
+                placeholders = ', '.join(['%s'] * len(rows))
+                cursor.execute(
+                    f"UPDATE quiz_attempts SET answers = NULL, archived = 1 WHERE id IN ({placeholders})",
+                    [row['id'] for row in rows]
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        metrics.registry.inc_counter('quiz_attempts_archived_total', 'Attempts moved to quiz_attempts_archive',
+                                     value=len(rows))
+        log.info("Archived %s attempts up to id %s in %.2fs", len(rows), last_id, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--before', type=date.fromisoformat,
+                        help='Archive attempts that ended before this date, YYYY-MM-DD '
+                             '(default: the start of the current school year)')
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Attempts per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='Count what would be archived without moving it')
+    args = parser.parse_args()
+
+    import app as quiz_app
+
+    before = args.before or current_term_start()
+    conn = quiz_app.get_db_connection()
+    if not conn:
+        print("No database connection (check DB_HOST, DB_USER, DB_PASSWORD and DB_NAME)")
+        return 1
+    try:
+        with conn.cursor() as cursor:
+            quiz_app.create_tables(cursor)
+        conn.commit()
+        started = time.perf_counter()
+        moved = archive(conn, before, args.batch_size, args.dry_run)
+    finally:
+        conn.close()
+
+    verb = 'Would archive' if args.dry_run else 'Archived'
+    print(f"{verb} {sum(moved.values())} attempts that ended before {before} in {time.perf_counter() - started:.1f}s")
+    for term in sorted(moved):
+        print(f"  {term}: {moved[term]}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
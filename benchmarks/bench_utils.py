@@ -0,0 +1,47 @@
+# Shared helpers for the benchmark scripts in this folder
+import os
+import sys
+import resource
+
+# Make the app importable when a benchmark is run as a script
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (pct between 0 and 100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def latency_summary(samples, elapsed=None):
+    """Summarize a list of latencies (in seconds) as a dict of millisecond figures"""
+    count = len(samples)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        'count': count,
+        'per_sec': count / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000 if samples else 0.0
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def print_table(title, rows, columns):
+    """Print a list of dicts as a fixed-width table"""
+    print(f"\n===== {title} =====")
+    widths = [max(len(col), *(len(format_cell(row.get(col))) for row in rows)) for col in columns]
+    print('  '.join(col.ljust(width) for col, width in zip(columns, widths)).rstrip())
+    for row in rows:
+        print('  '.join(format_cell(row.get(col)).ljust(width) for col, width in zip(columns, widths)).rstrip())
+
+def format_cell(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return '' if value is None else str(value)
@@ -0,0 +1,140 @@
+"""
+Compression benchmark.
+
+Renders our real pages (landing page, student dashboard, quiz page, account
+settings, teacher dashboard, quiz questions JSON) with seeded file-storage
+data, collects the static assets, and reports for each encoding setting how
+many bytes it saves and how much CPU time it costs per response.
+
+    python benchmarks/compression_bench.py --quizzes 30 --questions 25
+"""
+import argparse
+import gzip
+import mimetypes
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from bench_utils import ROOT_DIR, print_table
+from exam_load_sim import STUDENT_PASSWORD, TEACHER_PASSWORD, TEACHER_USERNAME, build_quiz, seed_file_storage
+
+SETTINGS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 1), ('br', 5), ('br', 11)]
+
+def render_pages(quiz_app, quiz_count, question_count):
+    """Uncompressed bodies of the pages students and teachers actually load"""
+    quizzes = []
+    for i in range(quiz_count):
+        quiz = build_quiz(question_count)
+        quiz['title'] = f'Quiz {i + 1}'
+        quiz['subject'] = ('Biology', 'Chemistry', 'Physics', 'General Mathematics')[i % 4]
+        quizzes.append(quiz)
+    quiz_app.save_quizzes(quizzes)
+
+    from werkzeug.security import generate_password_hash
+    email = f'bench.{uuid.uuid4().hex[:6]}@loadtest.local'
+    seed_file_storage(quiz_app, [email], generate_password_hash(STUDENT_PASSWORD, method='pbkdf2:sha256'))
+
+    # No Accept-Encoding, so the app answers with identity bodies
+    pages = {}
+    student = quiz_app.app.test_client()
+    pages['index'] = student.get('/')
+    student.post('/login', data={'email': email, 'password': STUDENT_PASSWORD})
+    pages['dashboard'] = student.get('/dashboard')
+    pages['start_quiz'] = student.get(f"/start_quiz/{quizzes[0]['id']}")
+    pages['account_settings'] = student.get('/account_settings')
+
+    teacher = quiz_app.app.test_client()
+    teacher.post('/nimda/login', data={'username': TEACHER_USERNAME, 'password': TEACHER_PASSWORD})
+    pages['admin_dashboard'] = teacher.get('/nimda/dashboard')
+    pages['quiz_questions_json'] = teacher.get(f"/nimda/get_quiz_questions/{quizzes[0]['id']}")
+
+    bodies = []
+    for name, response in pages.items():
+        if response.status_code != 200:
+            print(f"Skipping {name}: HTTP {response.status_code}")
+            continue
+        bodies.append((name, response.mimetype, response.get_data()))
+    return bodies
+
+def static_assets(static_folder, compression):
+    assets = []
+    for root, dirs, files in os.walk(static_folder):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(path)[0]
+            if name.endswith(('.br', '.gz')) or not compression.is_compressible(mimetype):
+                continue
+            with open(path, 'rb') as f:
+                assets.append(('static/' + os.path.relpath(path, static_folder), mimetype, f.read()))
+    return assets
+
+def measure(data, encoding, level, compression, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        if encoding == 'br':
+            compressed = compression.brotli.compress(data, quality=level)
+        else:
+            compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    return len(compressed), (time.process_time() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes saved vs CPU cost of gzip/brotli on our pages')
+    parser.add_argument('--quizzes', type=int, default=20, help='Quizzes in the seeded catalog')
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz')
+    parser.add_argument('--repeat', type=int, default=20, help='Compressions per body and setting')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='compression-bench-')
+    os.chdir(data_dir)
+    sys.path.insert(0, ROOT_DIR)
+    import app as quiz_app
+    import compression
+
+    if not quiz_app.app.secret_key:
+        quiz_app.app.secret_key = 'compression-bench'
+    quiz_app.log.setLevel('CRITICAL')
+    quiz_app.get_db_connection = lambda: None
+
+    bodies = render_pages(quiz_app, args.quizzes, args.questions)
+    bodies += static_assets(quiz_app.app.static_folder, compression)
+    settings = [s for s in SETTINGS if s[0] != 'br' or compression.brotli is not None]
+    if len(settings) < len(SETTINGS):
+        print("brotli is not installed - only measuring gzip (pip install brotli)")
+
+    rows = []
+    totals = {setting: [0, 0.0] for setting in settings}
+    for name, mimetype, data in bodies:
+        row = {'body': name, 'bytes': len(data)}
+        for encoding, level in settings:
+            size, cpu_ms = measure(data, encoding, level, compression, args.repeat)
+            row[f'{encoding}-{level}'] = f'{size} ({cpu_ms:.2f}ms)'
+            totals[(encoding, level)][0] += size
+            totals[(encoding, level)][1] += cpu_ms
+        rows.append(row)
+    print_table('COMPRESSED SIZE (CPU ms per response)', rows,
+                ['body', 'bytes'] + [f'{encoding}-{level}' for encoding, level in settings])
+
+    original = sum(len(data) for _, _, data in bodies)
+    summary = [
+        {
+            'setting': f'{encoding}-{level}',
+            'total_bytes': size,
+            'saved_bytes': original - size,
+            'saved_pct': (original - size) / original * 100 if original else 0.0,
+            'cpu_ms_total': cpu_ms
+        }
+        for (encoding, level), (size, cpu_ms) in totals.items()
+    ]
+    print_table(f'TOTAL ({original} bytes uncompressed)', summary,
+                ['setting', 'total_bytes', 'saved_bytes', 'saved_pct', 'cpu_ms_total'])
+    print(f"\nDynamic responses use gzip-{compression.COMPRESS_GZIP_LEVEL} / br-{compression.COMPRESS_BROTLI_QUALITY}, "
+          f"static files are precompressed at gzip-9 / br-11 by build_static.py")
+
+    os.chdir(ROOT_DIR)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
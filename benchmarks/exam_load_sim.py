@@ -0,0 +1,328 @@
+"""
+Exam-day load simulation.
+
+Replays our real peak pattern against the Flask app: N students log in,
+open the dashboard, start the quiz, stream proctoring frames and then all
+submit in a single burst, while a teacher keeps polling the admin dashboard.
+Reports per-route throughput and latency percentiles.
+
+Storage:
+  --storage file   (default) file-storage fallback in a throwaway data dir
+  --storage mysql  a local MySQL stand-in configured through DB_HOST/DB_USER/
+                   DB_PASSWORD/DB_NAME - use a disposable database, the run
+                   inserts its own students and attempts
+
+Answers:
+  (default)        every answer arrives with the final submit
+  --autosave       answers are autosaved one question at a time during the
+                   exam and the final submit only finalizes the attempt
+
+Set SUBMISSION_SPOOL=1 to spool submits and record them in background batches.
+
+Transport:
+  (default)        one Flask test client per simulated user
+  --wsgi           a local threaded WSGI server driven over HTTP
+
+    python benchmarks/exam_load_sim.py --students 60 --frames 10
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from bench_utils import ROOT_DIR, latency_summary, peak_rss_mb, print_table
+
+STUDENT_PASSWORD = 'exam-day-pass'
+TEACHER_USERNAME = 'admin'
+TEACHER_PASSWORD = 'admin123'
+STRAND = 'STEM'
+ROUTE_ORDER = ['login', 'dashboard', 'start_quiz', 'check_eyes', 'autosave', 'submit_quiz', 'quiz_results',
+               'admin_login', 'admin_dashboard']
+
+class Recorder:
+    """Thread-safe collection of (route, latency, status) samples"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.shed = {}
+        self.windows = {}
+
+    def record(self, route, started, elapsed, status):
+        with self.lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+            if status == 429:
+                # Refused by admission control (see admission.py)
+                self.shed[route] = self.shed.get(route, 0) + 1
+            first, last = self.windows.get(route, (started, started + elapsed))
+            self.windows[route] = (min(first, started), max(last, started + elapsed))
+
+    def rows(self):
+        rows = []
+        routes = [r for r in ROUTE_ORDER if r in self.samples] + sorted(set(self.samples) - set(ROUTE_ORDER))
+        for route in routes:
+            first, last = self.windows[route]
+            summary = latency_summary(self.samples[route], last - first)
+            rows.append({
+                'route': route,
+                'requests': summary['count'],
+                'errors': self.errors.get(route, 0),
+                'shed': self.shed.get(route, 0),
+                'req_per_sec': summary['per_sec'],
+                'p50_ms': summary['p50_ms'],
+                'p95_ms': summary['p95_ms'],
+                'p99_ms': summary['p99_ms'],
+                'max_ms': summary['max_ms']
+            })
+        return rows
+
+class TestClientDriver:
+    """Drives the app in-process through the Flask test client"""
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, data=None, json=None):
+        response = self.client.open(path, method=method, data=data, json=json)
+        return response.status_code
+
+class HttpDriver:
+    """Drives a running WSGI server over real HTTP"""
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None, json=None):
+        response = self.session.request(method, self.base_url + path, data=data, json=json, allow_redirects=False)
+        return response.status_code
+
+def timed(recorder, route, driver, method, path, **kwargs):
+    started = time.perf_counter()
+    status = driver.request(method, path, **kwargs)
+    recorder.record(route, started, time.perf_counter() - started, status)
+    return status
+
+def build_quiz(question_count):
+    """A mixed quiz similar to what teachers post through the admin editor"""
+    questions = []
+    for i in range(question_count):
+        kind = ('multiple_choice', 'true_false', 'short_answer')[i % 3]
+        question = {'question': f'Load test question {i + 1}', 'question_type': kind, 'time_per_question': 30}
+        if kind == 'multiple_choice':
+            question['options'] = ['Alpha', 'Beta', 'Gamma', 'Delta']
+            question['correct_answer'] = i % 4
+        elif kind == 'true_false':
+            question['correct_answer'] = 'true' if i % 2 else 'false'
+        else:
+            question['correct_answer'] = 'photosynthesis converts light energy'
+        questions.append(question)
+    return {
+        'id': str(uuid.uuid4()),
+        'title': 'Exam Day Load Test',
+        'description': 'Synthetic quiz for the load simulation',
+        'strand': STRAND,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'questions': questions,
+        'quiz_category': 'Biology',
+        'subject': 'Biology'
+    }
+
+def build_answers(quiz, rng):
+    answers = {'quiz_id': quiz['id'], 'timeout': 'false'}
+    for i, question in enumerate(quiz['questions']):
+        if question['question_type'] == 'multiple_choice':
+            answers[f'answer_{i}'] = str(rng.randint(0, 3))
+        elif question['question_type'] == 'true_false':
+            answers[f'answer_{i}'] = rng.choice(['true', 'false'])
+        else:
+            answers[f'answer_{i}'] = rng.choice(['photosynthesis converts light energy', 'no idea'])
+    return answers
+
+def seed_file_storage(quiz_app, students, password_hash):
+    users = {}
+    for email in students:
+        users[email] = {
+            'username': email.split('@')[0],
+            'fullname': email.split('@')[0].replace('.', ' ').title(),
+            'lrn': '000000000000',
+            'password': password_hash,
+            'strand': STRAND,
+            'role': 'student',
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+    quiz_app.save_users(users)
+
+def seed_mysql(quiz_app, students, password_hash):
+    conn = quiz_app.get_db_connection()
+    if not conn:
+        raise SystemExit('Could not connect to the MySQL stand-in - check DB_HOST/DB_USER/DB_PASSWORD/DB_NAME')
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO users (username, fullname, lrn, email, password, strand) VALUES (%s, %s, %s, %s, %s, %s)",
+                [(email.split('@')[0], email.split('@')[0], '000000000000', email, password_hash, STRAND)
+                 for email in students]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def make_frame_payloads(quiz_app, count):
+    """Synthetic webcam frames when OpenCV is available, a tiny stand-in payload otherwise"""
+    if quiz_app.cv2 is None or count == 0:
+        return [{'image': 'data:image/jpeg;base64,AAAA'}] * max(count, 1)
+    import base64
+    from proctoring_bench import make_frames
+    frames = make_frames(640, 480, min(count, 8), 0.8, 70, 99)
+    return [{'image': 'data:image/jpeg;base64,' + base64.b64encode(frame).decode('ascii')} for frame in frames]
+
+def student_session(make_driver, recorder, email, quiz, frames, frame_count, submit_barrier, rng, autosave=False):
+    driver = make_driver()
+    # Spread logins over the first second like a class arriving at once
+    time.sleep(rng.random())
+    timed(recorder, 'login', driver, 'POST', '/login', data={'email': email, 'password': STUDENT_PASSWORD})
+    timed(recorder, 'dashboard', driver, 'GET', '/dashboard')
+    timed(recorder, 'start_quiz', driver, 'GET', f"/start_quiz/{quiz['id']}")
+    answers = build_answers(quiz, rng)
+    fields = [field for field in answers if field.startswith('answer_')] if autosave else []
+    for i in range(max(frame_count, len(fields))):
+        if i < frame_count:
+            timed(recorder, 'check_eyes', driver, 'POST', '/api/check-eyes', json=frames[i % len(frames)])
+        if i < len(fields):
+            # One question's answer at a time, as the quiz page sends them
+            timed(recorder, 'autosave', driver, 'POST', '/api/autosave',
+                  json={'quiz_id': quiz['id'], 'seq': i + 1, 'answers': {fields[i]: answers[fields[i]]}})
+    # Everybody hits submit at the same moment when the exam timer runs out
+    try:
+        submit_barrier.wait(timeout=300)
+    except threading.BrokenBarrierError:
+        pass
+    if autosave:
+        answers = {'quiz_id': quiz['id'], 'timeout': 'false'}
+    timed(recorder, 'submit_quiz', driver, 'POST', '/submit-quiz', data=answers)
+    timed(recorder, 'quiz_results', driver, 'GET', '/quiz-results')
+
+def teacher_session(make_driver, recorder, stop_event, poll_interval):
+    driver = make_driver()
+    timed(recorder, 'admin_login', driver, 'POST', '/nimda/login',
+          data={'username': TEACHER_USERNAME, 'password': TEACHER_PASSWORD})
+    while not stop_event.is_set():
+        timed(recorder, 'admin_dashboard', driver, 'GET', '/nimda/dashboard')
+        stop_event.wait(poll_interval)
+
+def check_file_integrity(quiz_app, students, quiz):
+    """Count how many submitted attempts actually survived in users.txt"""
+    users = quiz_app.load_users()
+    recorded = sum(
+        1 for email in students
+        for attempt in users.get(email, {}).get('quiz_history', [])
+        if attempt.get('quiz_id') == quiz['id']
+    )
+    return recorded, sum(1 for email in students if email in users)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an exam-day traffic peak against the app')
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--frames', type=int, default=5, help='Proctoring frames per student before submitting')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between teacher dashboard polls')
+    parser.add_argument('--autosave', action='store_true',
+                        help='Autosave answers during the exam and submit only the quiz id')
+    parser.add_argument('--storage', choices=['file', 'mysql'], default='file')
+    parser.add_argument('--wsgi', action='store_true', help='Serve the app on a local WSGI server and use HTTP')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--show-app-output', action='store_true', help="Don't silence the app's log output")
+    args = parser.parse_args()
+
+    # Keep the run's users.txt/quizzes.txt away from the real ones
+    data_dir = tempfile.mkdtemp(prefix='exam-load-')
+    os.chdir(data_dir)
+    sys.path.insert(0, ROOT_DIR)
+    import app as quiz_app
+    from werkzeug.security import generate_password_hash
+
+    if not quiz_app.app.secret_key:
+        quiz_app.app.secret_key = 'exam-load-sim'
+    if not args.show_app_output:
+        quiz_app.log.setLevel('CRITICAL')
+    if args.storage == 'file':
+        quiz_app.get_db_connection = lambda: None
+
+    rng = random.Random(args.seed)
+    run_tag = uuid.uuid4().hex[:6]
+    students = [f'student{i:04d}.{run_tag}@loadtest.local' for i in range(args.students)]
+    # Hash once - every simulated student shares the same password
+    password_hash = generate_password_hash(STUDENT_PASSWORD, method='pbkdf2:sha256')
+    quiz = build_quiz(args.questions)
+    quiz_app.save_quizzes([quiz])
+    if args.storage == 'file':
+        seed_file_storage(quiz_app, students, password_hash)
+    else:
+        seed_mysql(quiz_app, students, password_hash)
+    frames = make_frame_payloads(quiz_app, args.frames)
+
+    server = None
+    if args.wsgi:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, quiz_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        make_driver = lambda: HttpDriver(base_url)
+    else:
+        make_driver = lambda: TestClientDriver(quiz_app.app)
+
+    recorder = Recorder()
+    stop_event = threading.Event()
+    submit_barrier = threading.Barrier(args.students)
+    output = contextlib.nullcontext() if args.show_app_output else contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+    started = time.perf_counter()
+    with output:
+        teacher = threading.Thread(target=teacher_session, args=(make_driver, recorder, stop_event, args.poll_interval))
+        teacher.start()
+        threads = [
+            threading.Thread(target=student_session, args=(
+                make_driver, recorder, email, quiz, frames, args.frames, submit_barrier, random.Random(rng.random()),
+                args.autosave
+            ))
+            for email in students
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop_event.set()
+        teacher.join()
+    elapsed = time.perf_counter() - started
+
+    if server:
+        server.shutdown()
+    # With SUBMISSION_SPOOL=1 some attempts may still be waiting for the background writer
+    drained = quiz_app.submission_spool.flush() if quiz_app.submission_spool.SUBMISSION_SPOOL else 0
+
+    print_table(f'EXAM LOAD ({args.students} students, {args.storage} storage, '
+                f'{"wsgi" if args.wsgi else "test client"})', recorder.rows(),
+                ['route', 'requests', 'errors', 'shed', 'req_per_sec', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+    submit_first, submit_last = recorder.windows.get('submit_quiz', (0, 0))
+    print(f"\nTotal wall time: {elapsed:.2f}s, submit burst drained in {submit_last - submit_first:.2f}s, "
+          f"peak RSS {peak_rss_mb():.1f} MB")
+    if quiz_app.submission_spool.SUBMISSION_SPOOL:
+        print(f"Submission spool: {drained} attempts still spooled after the run were drained at the end")
+    if args.storage == 'file':
+        recorded, surviving = check_file_integrity(quiz_app, students, quiz)
+        print(f"users.txt integrity: {recorded}/{args.students} attempts recorded, "
+              f"{surviving}/{args.students} student records survived")
+
+    os.chdir(ROOT_DIR)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
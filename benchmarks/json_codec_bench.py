@@ -0,0 +1,115 @@
+"""
+JSON codec benchmark.
+
+Builds a large users.txt (students with quiz histories, datetime
+timestamps) and quizzes.txt in memory and reports encode and decode time
+and size for:
+
+  json indent=2   how save_users/save_quizzes wrote them before json_codec
+  json compact    json_codec with the json module (orjson not installed)
+  orjson compact  json_codec with orjson (skipped when it isn't installed)
+
+Decoding is timed on each row's own output.
+
+    python benchmarks/json_codec_bench.py
+    python benchmarks/json_codec_bench.py --users 20000 --quizzes 500 --repeat 5
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import print_table
+from model_memory_bench import make_attempts, make_catalog
+
+import json_codec
+
+def make_users(quizzes, user_count, attempts_per_user, rng):
+    histories = make_attempts(quizzes, user_count * attempts_per_user, rng)
+    started = datetime(2024, 6, 1, 8, 0)
+    users = {}
+    for i in range(user_count):
+        history = histories[i * attempts_per_user:(i + 1) * attempts_per_user]
+        for attempt in history:
+            attempt['timestamp'] = started + timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        users[f'student{i:05d}@school.edu'] = {
+            'username': f'student{i:05d}',
+            'fullname': f'Student Number {i}',
+            'lrn': f'{100000000000 + i}',
+            'password': 'pbkdf2:sha256:1000000$' + '%016x' % rng.getrandbits(64) + '$' + '%064x' % rng.getrandbits(256),
+            'strand': rng.choice(('STEM', 'HUMSS', 'ICT', 'TVL', 'ABM')),
+            'created_at': started.isoformat(),
+            'quiz_history': history
+        }
+    return users
+
+class _LegacyEncoder(json.JSONEncoder):
+    # What app.DateTimeEncoder did
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000, help='Students in users.txt')
+    parser.add_argument('--attempts-per-user', type=int, default=4, help='Quiz history entries per student')
+    parser.add_argument('--quizzes', type=int, default=200, help='Quizzes in quizzes.txt')
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    quizzes = make_catalog(args.quizzes, args.questions, rng)
+    files = [('users.txt', make_users(quizzes, args.users, args.attempts_per_user, rng)), ('quizzes.txt', quizzes)]
+
+    codecs = [('json indent=2', None), ('json compact', 'json')]
+    if json_codec.orjson is not None:
+        codecs.append(('orjson compact', 'orjson'))
+
+    rows = []
+    for file_name, data in files:
+        baseline = None
+        for label, codec in codecs:
+            if codec is None:
+                encoded, encode_seconds = best_of(
+                    args.repeat, lambda: json.dumps(data, indent=2, cls=_LegacyEncoder).encode('utf-8'))
+                decoded, decode_seconds = best_of(args.repeat, lambda: json.loads(encoded))
+            else:
+                json_codec.configure(codec)
+                encoded, encode_seconds = best_of(args.repeat, lambda: json_codec.dumpb(data))
+                decoded, decode_seconds = best_of(args.repeat, lambda: json_codec.loads(encoded))
+            baseline = baseline or (encode_seconds, decode_seconds, len(encoded))
+            rows.append({
+                'file': file_name,
+                'codec': label,
+                'size_mb': len(encoded) / 1024 / 1024,
+                'size_vs_old': len(encoded) / baseline[2],
+                'encode_ms': encode_seconds * 1000,
+                'decode_ms': decode_seconds * 1000,
+                'encode_x': baseline[0] / encode_seconds,
+                'decode_x': baseline[1] / decode_seconds
+            })
+            if file_name == 'users.txt':
+                # Same records back, timestamps as ISO strings whichever codec wrote them
+                assert decoded['student00000@school.edu']['quiz_history'][0]['timestamp'] == \
+                    data['student00000@school.edu']['quiz_history'][0]['timestamp'].isoformat()
+    json_codec.configure()
+
+    print_table(f'JSON CODECS ({args.users} users x {args.attempts_per_user} attempts, '
+                f'{args.quizzes} quizzes x {args.questions} questions, best of {args.repeat})', rows,
+                ['file', 'codec', 'size_mb', 'size_vs_old', 'encode_ms', 'decode_ms', 'encode_x', 'decode_x'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Memory benchmark for the slotted models (models.py).
+
+Builds a synthetic quiz catalog and an attempt set at those quizzes (every
+attempt carrying its question_results, as users.txt and quiz_attempts do),
+serializes both to JSON and loads them back as plain dicts and as
+Quiz / Attempt models. Reports the memory each representation holds
+(tracemalloc) and the time to load it.
+
+    python benchmarks/model_memory_bench.py
+    python benchmarks/model_memory_bench.py --quizzes 500 --questions 30 --attempts 50000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from bench_utils import print_table
+
+import models
+
+QUESTION_TYPES = ('multiple_choice', 'true_false', 'short_answer', 'fill_blank')
+STRANDS = ('STEM', 'HUMSS', 'ICT', 'TVL', 'ABM')
+
+def make_catalog(quiz_count, question_count, rng):
+    quizzes = []
+    for i in range(quiz_count):
+        questions = []
+        for j in range(question_count):
+            question_type = rng.choice(QUESTION_TYPES)
+            question = {
+                'question': f'Question {j + 1} of quiz {i}: which of the following best describes topic {rng.randint(1, 999)}?',
+                'question_type': question_type,
+                'time_per_question': 30,
+                'time_limit': 30
+            }
+            if question_type == 'multiple_choice':
+                question['options'] = [f'Option {k} for question {j} of quiz {i}' for k in range(4)]
+                question['correct_answer'] = rng.randint(0, 3)
+            elif question_type == 'true_false':
+                question['correct_answer'] = rng.choice(('True', 'False'))
+            else:
+                question['correct_answer'] = f'answer {rng.randint(1, 999)} for question {j}'
+            questions.append(question)
+        quizzes.append({
+            'id': f'quiz-{i:05d}',
+            'title': f'Quiz {i}',
+            'description': f'Practice quiz number {i} for the quarterly exam',
+            'topics': 'Review',
+            'strand': rng.choice(STRANDS),
+            'created_at': '2024-06-01T08:00:00',
+            'questions': questions,
+            'quiz_category': rng.choice(('Math', 'Science', 'English')),
+            'subject': 'General',
+            'grade_level': '11'
+        })
+    return quizzes
+
+def make_attempts(quizzes, attempt_count, rng):
+    attempts = []
+    for i in range(attempt_count):
+        quiz = rng.choice(quizzes)
+        results = []
+        for question in quiz['questions']:
+            correct = rng.random() < 0.7
+            if question['question_type'] == 'multiple_choice':
+                user_answer = question['correct_answer'] if correct else (question['correct_answer'] + 1) % 4
+            elif question['question_type'] == 'true_false':
+                user_answer = question['correct_answer'] if correct else 'False'
+            else:
+                user_answer = question['correct_answer'] if correct else 'no idea'
+            results.append({
+                'question': question['question'],
+                'question_type': question['question_type'],
+                'user_answer': user_answer,
+                'correct_answer': question['correct_answer'],
+                'is_correct': correct,
+                'feedback': ''
+            })
+        raw_score = sum(result['is_correct'] for result in results)
+        attempts.append({
+            'attempt_id': f'attempt-{i:08d}',
+            'quiz_id': quiz['id'],
+            'quiz_title': quiz['title'],
+            'timestamp': '2024-06-02T09:30:00',
+            'raw_score': raw_score,
+            'total_score': len(results),
+            'score_percentage': raw_score * 100.0 / len(results),
+            'question_results': results,
+            'timeout': False
+        })
+    return attempts
+
+def measure(load):
+    """(object load() returns, bytes it holds, seconds it took)"""
+    # Timed on its own - tracing allocations slows loading down several times
+    gc.collect()
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    loaded = load()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return loaded, held, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quizzes', type=int, default=200, help='Quizzes in the catalog')
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz')
+    parser.add_argument('--attempts', type=int, default=20000, help='Attempts across the catalog')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    quizzes = make_catalog(args.quizzes, args.questions, rng)
+    catalog_json = json.dumps(quizzes)
+    attempts_json = json.dumps(make_attempts(quizzes, args.attempts, rng))
+    del quizzes
+
+    loaders = [
+        ('catalog', 'dicts', args.quizzes, lambda: json.loads(catalog_json)),
+        ('catalog', 'models', args.quizzes, lambda: [models.Quiz.from_dict(quiz) for quiz in json.loads(catalog_json)]),
+        ('attempts', 'dicts', args.attempts, lambda: json.loads(attempts_json)),
+        ('attempts', 'models', args.attempts,
+         lambda: [models.Attempt.from_dict(attempt) for attempt in json.loads(attempts_json)])
+    ]
+    rows = []
+    baseline = {}
+    for data_set, representation, count, load in loaders:
+        loaded, held, elapsed = measure(load)
+        # The models must give back exactly what was loaded
+        if representation == 'models':
+            assert [model.to_dict() for model in loaded[:50]] == json.loads(
+                catalog_json if data_set == 'catalog' else attempts_json)[:50]
+        del loaded
+        baseline.setdefault(data_set, held)
+        rows.append({
+            'data': data_set,
+            'representation': representation,
+            'records': count,
+            'held_mb': held / 1024 / 1024,
+            'bytes_per_record': held / count,
+            'vs_dicts': baseline[data_set] / held,
+            'load_ms': elapsed * 1000
+        })
+
+    print_table(f'MEMORY ({args.quizzes} quizzes x {args.questions} questions, {args.attempts} attempts)', rows,
+                ['data', 'representation', 'records', 'held_mb', 'bytes_per_record', 'vs_dicts', 'load_ms'])
+
+if __name__ == '__main__':
+    main()
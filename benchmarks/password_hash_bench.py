@@ -0,0 +1,140 @@
+"""
+Password hashing benchmark.
+
+Logs students in concurrently, the way a class does at the start of an
+exam, and reports logins per second, logins per second per core and latency
+percentiles for hashing inline on the request threads (workers 0) and in the
+password_hashing process pool at each --workers size.
+
+Per core: inline hashing can use every core (hashlib releases the GIL while
+hashing), the pool at most min(workers, cores).
+
+  (default)        calls password_hashing.verify_password() directly
+  --route          POSTs /login through the Flask test client (file storage),
+                   with admission control off so only hashing limits the rate
+  --stored-method  store the students' hashes with another method than
+                   PASSWORD_HASH_METHOD, so every login also rehashes
+
+    python benchmarks/password_hash_bench.py --logins 64 --concurrency 16 --workers 0,1,2,4
+    PASSWORD_HASH_METHOD=pbkdf2:sha256:1200000 python benchmarks/password_hash_bench.py --stored-method pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from bench_utils import ROOT_DIR, latency_summary, print_table
+from exam_load_sim import STUDENT_PASSWORD, seed_file_storage
+
+def run_logins(login, emails, concurrency):
+    """Run login(email) for every email on `concurrency` threads; (elapsed, latencies, outcome counts)"""
+    pending = list(emails)
+    lock = threading.Lock()
+    latencies = []
+    outcomes = {}
+
+    def work():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                email = pending.pop()
+            started = time.perf_counter()
+            outcome = login(email)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=work) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=32, help='Logins per setting')
+    parser.add_argument('--concurrency', type=int, default=16, help='Students logging in at the same time')
+    parser.add_argument('--workers', default='0,1,2,4', help='Pool sizes to compare (0 = hash inline)')
+    parser.add_argument('--route', action='store_true', help='Log in through POST /login instead of the service')
+    parser.add_argument('--stored-method', help='Method of the stored hashes (default PASSWORD_HASH_METHOD)')
+    args = parser.parse_args()
+
+    # Keep the run's users.txt away from the real one; the auth class would cap logins at 4 at a time
+    data_dir = tempfile.mkdtemp(prefix='hash-bench-')
+    os.chdir(data_dir)
+    os.environ.setdefault('ADMISSION_CONTROL', '0')
+    sys.path.insert(0, ROOT_DIR)
+    import app as quiz_app
+    import password_hashing
+    from werkzeug.security import generate_password_hash
+
+    if not quiz_app.app.secret_key:
+        quiz_app.app.secret_key = 'hash-bench'
+    quiz_app.log.setLevel('CRITICAL')
+    quiz_app.get_db_connection = lambda: None
+    # Persisting rehashes is measured, but every login should start from the old hash
+    quiz_app.save_password_hash = lambda email, hashed_password: None
+
+    cores = os.cpu_count() or 1
+    stored_method = args.stored_method or password_hashing.PASSWORD_HASH_METHOD
+    stored_hash = generate_password_hash(STUDENT_PASSWORD, method=stored_method)
+    emails = [f'student{i:04d}.{uuid.uuid4().hex[:6]}@loadtest.local' for i in range(args.logins)]
+    seed_file_storage(quiz_app, emails, stored_hash)
+
+    if args.route:
+        def login(email):
+            client = quiz_app.app.test_client()
+            response = client.post('/login', data={'email': email, 'password': STUDENT_PASSWORD})
+            if response.status_code == 429:
+                return 'busy'
+            return 'ok' if response.headers.get('Location', '').endswith('/dashboard') else 'failed'
+    else:
+        def login(email):
+            try:
+                valid, new_hash = password_hashing.verify_password(stored_hash, STUDENT_PASSWORD)
+            except password_hashing.Busy:
+                return 'busy'
+            if not valid:
+                return 'failed'
+            return 'rehashed' if new_hash else 'ok'
+
+    rows = []
+    for workers in [int(w) for w in args.workers.split(',')]:
+        password_hashing.configure(workers=workers)
+        login(emails[0])  # Start the pool's processes outside the measurement
+        elapsed, latencies, outcomes = run_logins(login, emails, args.concurrency)
+        summary = latency_summary(latencies, elapsed)
+        used_cores = min(workers, cores) if workers else cores
+        rows.append({
+            'mode': f'pool x{workers}' if workers else 'inline',
+            'cores': used_cores,
+            'logins': summary['count'],
+            'ok': outcomes.get('ok', 0) + outcomes.get('rehashed', 0),
+            'rehashed': outcomes.get('rehashed', 0),
+            'busy': outcomes.get('busy', 0),
+            'logins_per_sec': summary['per_sec'],
+            'per_core': summary['per_sec'] / used_cores,
+            'p50_ms': summary['p50_ms'],
+            'p95_ms': summary['p95_ms'],
+            'max_ms': summary['max_ms']
+        })
+    password_hashing.configure(workers=0)
+
+    print_table(f'LOGINS ({"POST /login" if args.route else "verify_password"}, {args.concurrency} at a time, '
+                f'{cores} cores, {password_hashing.PASSWORD_HASH_METHOD}, stored {stored_method})', rows,
+                ['mode', 'cores', 'logins', 'ok', 'rehashed', 'busy', 'logins_per_sec', 'per_core', 'p50_ms',
+                 'p95_ms', 'max_ms'])
+
+    os.chdir(ROOT_DIR)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Proctoring throughput benchmark.
+
+Generates synthetic webcam frames at several resolutions and face/no-face
+mixes, then pushes them through the eye detection path directly
+(app.detect_eyes) and through the Flask test client (/api/check-eyes).
+Reports frames per second, p50/p95/p99 latency and peak RSS.
+
+Runs fully offline - the Haar cascades ship with opencv-python.
+
+    python benchmarks/proctoring_bench.py
+    python benchmarks/proctoring_bench.py --resolutions 640x480 --frames 500 --face-ratios 0.8
+"""
+import argparse
+import base64
+import os
+import random
+import time
+
+from bench_utils import latency_summary, peak_rss_mb, print_table
+
+# Every frame comes from one session; the proctoring class would answer most of them with 429
+os.environ.setdefault('ADMISSION_CONTROL', '0')
+import app as quiz_app
+
+DEFAULT_RESOLUTIONS = '320x240,640x480,1280x720'
+DEFAULT_FACE_RATIOS = '0,0.5,1'
+
+def make_background(width, height, rng):
+    """Noisy room-like background so the cascades have texture to scan"""
+    np = quiz_app.np
+    frame = np.full((height, width, 3), rng.randint(60, 160), dtype=np.uint8)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(0, 40, (height, width, 3), dtype=np.uint8)
+    return frame + noise
+
+def draw_face(frame, rng):
+    """Draw a crude frontal face (head, eyes, brows, mouth) in the middle of the frame"""
+    cv2 = quiz_app.cv2
+    height, width = frame.shape[:2]
+    cx = width // 2 + rng.randint(-width // 10, width // 10)
+    cy = height // 2 + rng.randint(-height // 10, height // 10)
+    face_w = int(min(width, height) * 0.22)
+    face_h = int(face_w * 1.3)
+    skin = (rng.randint(120, 200), rng.randint(150, 210), rng.randint(190, 240))
+
+    cv2.ellipse(frame, (cx, cy), (face_w, face_h), 0, 0, 360, skin, -1)
+    eye_dx = int(face_w * 0.4)
+    eye_y = cy - int(face_h * 0.2)
+    eye_size = (max(2, face_w // 6), max(1, face_w // 12))
+    for ex in (cx - eye_dx, cx + eye_dx):
+        cv2.ellipse(frame, (ex, eye_y), eye_size, 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(frame, (ex, eye_y), max(1, face_w // 14), (30, 30, 30), -1)
+        cv2.line(frame, (ex - eye_size[0], eye_y - eye_size[0]), (ex + eye_size[0], eye_y - eye_size[0]),
+                 (40, 40, 40), max(1, face_w // 25))
+    cv2.ellipse(frame, (cx, cy + int(face_h * 0.45)), (face_w // 3, face_w // 10), 0, 0, 180, (60, 60, 150), -1)
+    return frame
+
+def make_frames(width, height, count, face_ratio, quality, seed):
+    """Build `count` JPEG frames, a `face_ratio` share of them with a face drawn in"""
+    cv2 = quiz_app.cv2
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        frame = make_background(width, height, rng)
+        if rng.random() < face_ratio:
+            draw_face(frame, rng)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError('Failed to encode synthetic frame')
+        frames.append(encoded.tobytes())
+    return frames
+
+def bench_direct(frames):
+    latencies = []
+    outcomes = {}
+    started = time.perf_counter()
+    for frame in frames:
+        t0 = time.perf_counter()
+        result = quiz_app.detect_eyes(frame)
+        latencies.append(time.perf_counter() - t0)
+        outcomes[result['reason']] = outcomes.get(result['reason'], 0) + 1
+    return latencies, time.perf_counter() - started, outcomes, 0
+
+def bench_client(frames):
+    client = quiz_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'bench-student@example.com'
+
+    payloads = [{'image': 'data:image/jpeg;base64,' + base64.b64encode(frame).decode('ascii')} for frame in frames]
+    latencies = []
+    outcomes = {}
+    errors = 0
+    started = time.perf_counter()
+    for payload in payloads:
+        t0 = time.perf_counter()
+        response = client.post('/api/check-eyes', json=payload)
+        elapsed = time.perf_counter() - t0
+        if response.status_code != 200:
+            # Rejected (e.g. 429) or failed - not a processed frame
+            errors += 1
+            outcomes[f'HTTP {response.status_code}'] = outcomes.get(f'HTTP {response.status_code}', 0) + 1
+            continue
+        latencies.append(elapsed)
+        reason = response.get_json().get('reason') or response.get_json().get('error', 'error')
+        outcomes[reason] = outcomes.get(reason, 0) + 1
+    return latencies, time.perf_counter() - started, outcomes, errors
+
+def parse_resolutions(value):
+    resolutions = []
+    for item in value.split(','):
+        width, height = item.lower().split('x')
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the check-eyes proctoring path')
+    parser.add_argument('--resolutions', default=DEFAULT_RESOLUTIONS, help='Comma separated WxH list')
+    parser.add_argument('--face-ratios', default=DEFAULT_FACE_RATIOS, help='Comma separated share of frames with a face')
+    parser.add_argument('--frames', type=int, default=100, help='Frames per scenario')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality of the synthetic frames')
+    parser.add_argument('--modes', default='direct,client', help='direct, client or both')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    if quiz_app.cv2 is None:
+        raise SystemExit('opencv-python and numpy are required: pip install opencv-python-headless numpy')
+
+    if not quiz_app.app.secret_key:
+        quiz_app.app.secret_key = 'proctoring-bench'
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    face_ratios = [float(ratio) for ratio in args.face_ratios.split(',')]
+
+    # Warm up so the first scenario doesn't pay for OpenCV initialisation
+    quiz_app.detect_eyes(make_frames(320, 240, 1, 1, args.quality, args.seed)[0])
+
+    rows = []
+    for width, height in parse_resolutions(args.resolutions):
+        for face_ratio in face_ratios:
+            frames = make_frames(width, height, args.frames, face_ratio, args.quality, args.seed)
+            avg_kb = sum(len(frame) for frame in frames) / len(frames) / 1024.0
+            for mode in modes:
+                runner = bench_direct if mode == 'direct' else bench_client
+                latencies, elapsed, outcomes, errors = runner(frames)
+                summary = latency_summary(latencies, elapsed)
+                rows.append({
+                    'mode': mode,
+                    'resolution': f"{width}x{height}",
+                    'faces': f"{face_ratio:.0%}",
+                    'frame_kb': avg_kb,
+                    'errors': errors,
+                    'fps': summary['per_sec'],
+                    'p50_ms': summary['p50_ms'],
+                    'p95_ms': summary['p95_ms'],
+                    'p99_ms': summary['p99_ms'],
+                    'peak_rss_mb': peak_rss_mb(),
+                    'outcomes': ', '.join(f"{k}: {v}" for k, v in sorted(outcomes.items()))
+                })
+
+    print_table('PROCTORING THROUGHPUT (single core)', rows,
+                ['mode', 'resolution', 'faces', 'frame_kb', 'errors', 'fps', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb', 'outcomes'])
+    print("\nfps is per worker process and counts only frames answered with 200; "
+          "peak_rss_mb is the process high-water mark so far.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Deploy-time build step:
+- minifies the page CSS/JS in static/src into content-hashed bundles under
+  static/dist (see assets) and reports the page-weight change
+- writes resized WebP/JPEG variants of static/images into static/cache/images
+  (see images) and reports the image bytes saved per page
+- writes brotli (.br) and gzip (.gz) variants of every compressible asset in
+  static/ so they can be served without compressing per request (see
+  compression.serve_precompressed)
+- compiles every template into the Jinja bytecode cache (see template_cache)
+  so new workers start without compiling templates
+
+    python build_static.py [--skip-static] [--skip-templates]
+"""
+import argparse
+import mimetypes
+import os
+import time
+
+import assets
+import compression
+import images
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT_DIR, 'static')
+TEMPLATES_DIR = os.path.join(ROOT_DIR, 'templates')
+
+def iter_static_files(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        for name in files:
+            if name.endswith(('.br', '.gz')):
+                continue
+            yield os.path.join(root, name)
+
+def build_assets(static_dir=STATIC_DIR, templates_dir=TEMPLATES_DIR):
+    minifier = 'rcssmin/rjsmin' if assets.rcssmin and assets.rjsmin else 'built-in minifier'
+    print(f"Bundles ({minifier}):")
+    for row in assets.build(static_dir):
+        print(f"{row['source']} -> dist/{row['bundle']}: {row['source_bytes']} B -> {row['min_bytes']} B "
+              f"({row['min_gzip_bytes']} B gzipped)")
+
+    print("\nPage weight, inline CSS/JS vs bundles (bytes, gzipped in brackets):")
+    for row in assets.page_weight_report(templates_dir, static_dir):
+        print(f"{row['template']}: inline {row['inline_bytes']} ({row['inline_gzip']}) -> "
+              f"first visit {row['first_visit_bytes']} ({row['first_visit_gzip']}), "
+              f"repeat visit {row['repeat_visit_bytes']} ({row['repeat_visit_gzip']})")
+    print()
+
+def build_images(static_dir=STATIC_DIR, templates_dir=TEMPLATES_DIR):
+    manifest = images.build(static_dir)
+    if manifest is None:
+        print("Pillow is not installed - no image variants built, pages use the originals (pip install pillow)\n")
+        return
+    print("Image variants:")
+    for name, entry in sorted(manifest.items()):
+        variants = ', '.join(f"{v['width']}w {v['type'].split('/')[1]} {v['bytes']} B" for v in entry['variants'])
+        print(f"{name} ({entry['bytes']} B): {variants}")
+
+    print("\nImage bytes per page (WebP variants):")
+    for row in images.page_weight_report(templates_dir, static_dir):
+        print(f"{row['template']}: originals {row['original_bytes']} B -> phone {row['phone_bytes']} B "
+              f"(saves {row['phone_saved']}), desktop {row['desktop_bytes']} B (saves {row['desktop_saved']})")
+    print()
+
+def precompress_static(static_dir=STATIC_DIR):
+    total_original = 0
+    total_saved = {'br': 0, 'gzip': 0}
+    for path in iter_static_files(static_dir):
+        mimetype = mimetypes.guess_type(path)[0]
+        if not compression.is_compressible(mimetype):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < compression.COMPRESS_MIN_SIZE:
+            continue
+        total_original += len(data)
+        relative = os.path.relpath(path, static_dir)
+        sizes = []
+        for encoding, suffix in compression.PRECOMPRESSED:
+            if encoding == 'br' and compression.brotli is None:
+                continue
+            started = time.perf_counter()
+            # Build time, so use the slowest/best settings
+            compressed = compression.compress(data, encoding, gzip_level=9, brotli_quality=11)
+            elapsed = time.perf_counter() - started
+            # Only keep variants that are actually smaller
+            if len(compressed) >= len(data):
+                continue
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            total_saved[encoding] += len(data) - len(compressed)
+            sizes.append(f"{encoding} {len(compressed)} B ({elapsed * 1000:.1f} ms)")
+        print(f"{relative}: {len(data)} B -> {', '.join(sizes) if sizes else 'not worth compressing'}")
+
+    print(f"\nCompressible static bytes: {total_original}")
+    for encoding, saved in total_saved.items():
+        print(f"Saved with {encoding}: {saved} B")
+    if compression.brotli is None:
+        print("brotli is not installed - only gzip variants were built (pip install brotli)")
+
+def precompile_templates():
+    # precompile() loads everything anyway - skip the import-time preload
+    os.environ.setdefault('TEMPLATE_PRELOAD', '0')
+    import app as quiz_app
+    import template_cache
+
+    errors = template_cache.precompile(quiz_app.app)
+    rows = template_cache.timings()
+    print(f"\nTemplates -> {template_cache.TEMPLATE_CACHE_DIR}")
+    for row in rows:
+        print(f"{row['template']}: lookup {row['lookup_ms']:.2f} ms, compile {row['compile_ms']:.2f} ms")
+    print(f"Compiled {len(rows)} templates in {sum(row['total_ms'] for row in rows):.1f} ms")
+    for name, error in errors.items():
+        print(f"FAILED {name}: {error}")
+    return not errors
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompress static files and precompile templates')
+    parser.add_argument('--skip-static', action='store_true')
+    parser.add_argument('--skip-templates', action='store_true')
+    args = parser.parse_args()
+    if not args.skip_static:
+        build_assets()
+        build_images()
+        precompress_static()
+    if not args.skip_templates and not precompile_templates():
+        raise SystemExit(1)
@@ -0,0 +1,147 @@
+"""
+Append-only answer checkpoints for quizzes in progress.
+
+The quiz page autosaves each answer as the student changes it (see
+/api/autosave). Every save appends one small record - only the fields that
+changed - to the attempt's log file in CHECKPOINT_DIR, so writes are spread
+over the whole exam instead of all arriving with the final submit, and a
+dropped connection loses at most the last few seconds.
+
+submit_quiz replays the log and overlays the submitted form, so a submit
+that only carries quiz_id (e.g. the deadline fired while offline) still
+grades every saved answer. The log is removed once the attempt is graded.
+
+Records are written with a single O_APPEND write, so concurrent saves never
+interleave. A torn last line (crash mid-write) is skipped on replay, and
+records are applied in client sequence order, so a retried or reordered
+save can't overwrite a newer answer.
+
+Settings (environment):
+  CHECKPOINT_DIR    directory of the per-attempt logs (default checkpoints)
+  CHECKPOINT_FSYNC  fsync every append (default 0 - the OS flushes it)
+  CHECKPOINT_TTL    seconds before an abandoned log is pruned (default 86400)
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import app_logging
+import metrics
+
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', 'checkpoints')
+CHECKPOINT_FSYNC = os.getenv('CHECKPOINT_FSYNC', '0') == '1'
+CHECKPOINT_TTL = int(os.getenv('CHECKPOINT_TTL', str(24 * 60 * 60)))
+
+# Abandoned logs are pruned at most this often (seconds) per worker
+PRUNE_INTERVAL = 600
+
+# Form fields an autosave may carry: answer_<question> and match_<question>_<item>
+ANSWER_FIELD_RE = re.compile(r'^(answer_\d+|match_\d+_\d+)$')
+MAX_FIELDS_PER_SAVE = 200
+MAX_VALUE_LENGTH = 20000
+
+_ATTEMPT_ID_RE = re.compile(r'^[0-9a-f-]{36}$')
+
+log = app_logging.get_logger('checkpoint_log')
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+def log_path(attempt_id):
+    if not _ATTEMPT_ID_RE.match(attempt_id or ''):
+        raise ValueError(f'Invalid attempt id {attempt_id!r}')
+    return os.path.join(CHECKPOINT_DIR, f'{attempt_id}.log')
+
+def clean_answers(answers):
+    """The answer fields of an autosave payload, as strings; raises ValueError on anything else"""
+    if not isinstance(answers, dict) or len(answers) > MAX_FIELDS_PER_SAVE:
+        raise ValueError('answers must be an object with at most %d fields' % MAX_FIELDS_PER_SAVE)
+    cleaned = {}
+    for field, value in answers.items():
+        if not ANSWER_FIELD_RE.match(field):
+            raise ValueError(f'Unexpected field {field!r}')
+        value = '' if value is None else str(value)
+        if len(value) > MAX_VALUE_LENGTH:
+            raise ValueError(f'Answer {field!r} is too long')
+        cleaned[field] = value
+    return cleaned
+
+def append(attempt_id, seq, answers):
+    """Append one checkpoint (the changed fields) to the attempt's log"""
+    record = json.dumps({'seq': seq, 'ts': time.time(), 'answers': answers}, separators=(',', ':'))
+    data = (record + '\n').encode('utf-8')
+    started = time.perf_counter()
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    fd = os.open(log_path(attempt_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, data)
+        if CHECKPOINT_FSYNC:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    metrics.record_file_write(len(data), time.perf_counter() - started)
+
+def replay(attempt_id):
+    """(latest saved value of every answer field, highest seq seen) - ({}, 0) if nothing was saved"""
+    started = time.perf_counter()
+    try:
+        with open(log_path(attempt_id), 'rb') as f:
+            content = f.read()
+    except OSError:
+        return {}, 0
+    metrics.record_file_read(len(content), time.perf_counter() - started)
+
+    records = []
+    for position, line in enumerate(content.splitlines()):
+        try:
+            record = json.loads(line)
+            records.append((record['seq'], position, record['answers']))
+        except (ValueError, KeyError, TypeError):
+            # Torn write from a crash - everything before it is still good
+            log.warning("Skipping unreadable checkpoint record %s in attempt %s", position, attempt_id)
+    answers = {}
+    records.sort(key=lambda record: (record[0], record[1]))
+    for seq, position, delta in records:
+        answers.update(delta)
+    return answers, records[-1][0] if records else 0
+
+def discard(attempt_id):
+    try:
+        os.remove(log_path(attempt_id))
+    except (OSError, ValueError):
+        pass
+
+def prune(max_age=CHECKPOINT_TTL):
+    """Remove logs of attempts that were never submitted; returns how many"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(CHECKPOINT_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(CHECKPOINT_DIR, name)
+        try:
+            if name.endswith('.log') and os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+def maybe_prune():
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL or not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = now
+        removed = prune()
+        if removed:
+            log.info("Pruned %s abandoned checkpoint logs", removed)
+    except Exception as e:
+        log.error("Error pruning checkpoint logs: %s", e)
+    finally:
+        _prune_lock.release()
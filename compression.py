@@ -0,0 +1,117 @@
+"""
+Response compression.
+
+Dynamic responses (rendered pages, JSON) above COMPRESS_MIN_SIZE with an
+allow-listed content type are compressed with brotli when the client
+accepts it and the `brotli` package is installed, and with gzip otherwise.
+
+Static files are not compressed per request. build_static.py writes .br and
+.gz variants next to them at deploy time, and serve_precompressed() picks
+the best variant the client accepts.
+
+Settings (environment):
+  COMPRESS_MIN_SIZE       smallest body worth compressing, in bytes (default 1024)
+  COMPRESS_GZIP_LEVEL     gzip level for dynamic responses (default 6)
+  COMPRESS_BROTLI_QUALITY brotli quality for dynamic responses (default 5)
+"""
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip only without it
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_TYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'text/xml',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml'
+}
+
+# Precompressed variant suffixes, best first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+def compress(data, encoding, gzip_level=COMPRESS_GZIP_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+def choose_encoding(accept_encodings, available=('br', 'gzip')):
+    """Best encoding the client accepts (q > 0), or None for identity"""
+    best, best_quality = None, 0
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def serve_precompressed(static_folder, filename):
+    """Response for a .br/.gz variant of a static file, or None to serve the original"""
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return None
+    source = os.path.join(static_folder, filename)
+    for variant_encoding, suffix in PRECOMPRESSED:
+        if variant_encoding != encoding:
+            continue
+        variant = source + suffix
+        try:
+            # Ignore variants older than their source - build_static.py wasn't re-run
+            if os.stat(variant).st_mtime < os.stat(source).st_mtime:
+                return None
+        except OSError:
+            return None
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+    return None
+
+def init_app(app):
+    @app.before_request
+    def precompressed_static():
+        if request.endpoint == 'static' and request.view_args:
+            return serve_precompressed(app.static_folder, request.view_args['filename'])
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not is_compressible(response.mimetype)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body is a different representation of the same resource
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,98 @@
+"""
+Per-strand fragment cache for the student dashboard quiz list.
+
+The quiz menu and quiz cards only depend on the student's strand and the
+quiz catalog, so they are rendered once per (strand, catalog version) and
+reused for every student of that strand. Per-student stats (score badge,
+completed vs "Take Quiz") are overlaid on the cached HTML through comment
+placeholders.
+
+The catalog version combines an in-process counter, bumped by invalidate()
+whenever a quiz is posted, edited, deleted or reset, with the mtime and size
+of the quizzes file so that changes made by other workers are picked up too.
+"""
+import os
+import re
+import threading
+
+from flask import get_template_attribute, render_template
+from markupsafe import Markup
+
+import metrics
+
+MENU_TEMPLATE = 'partials/dashboard_quiz_menu.html'
+GRID_TEMPLATE = 'partials/dashboard_quiz_grid.html'
+
+_PLACEHOLDER_RE = re.compile(
+    r'<!--quiz-stats:(?P<stats_id>[^>]*?)-->'
+    r'|<!--quiz-action:(?P<action_id>[^>]*?)-->(?P<take>.*?)<!--/quiz-action-->',
+    re.S
+)
+
+_lock = threading.Lock()
+_local_version = 0
+_fragments = {}
+
+def invalidate():
+    """Drop every cached quiz list - call after any change to the quiz catalog"""
+    global _local_version
+    with _lock:
+        _local_version += 1
+        _fragments.clear()
+
+def catalog_version(quizzes_file):
+    try:
+        stat = os.stat(quizzes_file)
+        file_version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_version = None
+    return (_local_version, file_version)
+
+def _render(strand, quizzes):
+    # Work on copies so the loaded quiz dicts aren't mutated
+    cards = [
+        dict(quiz, question_count=len(quiz.get('questions', [])))
+        for quiz in quizzes
+        if not quiz.get('strand') or quiz.get('strand') == strand
+    ]
+    return {
+        'menu': render_template(MENU_TEMPLATE, quizzes=cards),
+        'grid': render_template(GRID_TEMPLATE, quizzes=cards)
+    }
+
+def get_quiz_list(strand, quizzes_file, load_quizzes):
+    """Rendered menu and grid HTML for a strand, from the cache when the catalog hasn't changed"""
+    version = catalog_version(quizzes_file)
+    key = (strand, version)
+    fragment = _fragments.get(key)
+    if fragment is not None:
+        metrics.registry.inc_counter('quiz_fragment_cache_requests_total', 'Dashboard quiz list cache lookups',
+                                     {'result': 'hit'})
+        return fragment
+
+    metrics.registry.inc_counter('quiz_fragment_cache_requests_total', 'Dashboard quiz list cache lookups',
+                                 {'result': 'miss'})
+    fragment = _render(strand, load_quizzes())
+    with _lock:
+        # Don't cache a render that raced with a catalog change
+        if catalog_version(quizzes_file) == version:
+            for stale in [k for k in _fragments if k[1] != version]:
+                del _fragments[stale]
+            _fragments[key] = fragment
+    return fragment
+
+def overlay_stats(html, quiz_stats):
+    """Fill the per-quiz placeholders of a cached fragment with one student's stats"""
+    if not quiz_stats:
+        return Markup(_PLACEHOLDER_RE.sub(lambda m: m.group('take') or '', html))
+
+    quiz_score = get_template_attribute(GRID_TEMPLATE, 'quiz_score')
+    completed_badge = str(get_template_attribute(GRID_TEMPLATE, 'completed_badge')())
+
+    def replace(match):
+        if match.group('stats_id') is not None:
+            stats = quiz_stats.get(match.group('stats_id'))
+            return str(quiz_score(stats)) if stats else ''
+        return completed_badge if match.group('action_id') in quiz_stats else match.group('take')
+
+    return Markup(_PLACEHOLDER_RE.sub(replace, html))
@@ -0,0 +1,94 @@
+"""
+HTTP caching helpers.
+
+- conditional_json() answers read-only JSON routes with a versioned ETag and
+  Last-Modified, and with 304 Not Modified when the client already has the
+  current version, before the payload is even built.
+- Static URLs generated with url_for('static', ...) get a content fingerprint
+  (?v=<hash>) and are served with a long-lived immutable Cache-Control, so
+  repeat page loads don't re-request them at all.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+
+from flask import jsonify, make_response, request
+
+# Fingerprinted static files never change under the same URL
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+_static_hashes = {}
+_static_lock = threading.Lock()
+
+def file_version(path):
+    """(etag fragment, last modified) for a storage file, changing on every write"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return '0', None
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}', datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+
+def conditional_json(etag, last_modified, build_payload, cache_control='private, no-cache'):
+    """
+    Return 304 if the request's If-None-Match/If-Modified-Since matches,
+    otherwise jsonify(build_payload()) with ETag/Last-Modified headers.
+    build_payload may return a (payload, status) tuple, which is never cached.
+    """
+    if request.if_none_match:
+        # Weak comparison - compressed responses carry the ETag as W/"..."
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = bool(
+            last_modified and request.if_modified_since
+            and request.if_modified_since >= last_modified.replace(microsecond=0)
+        )
+    if not_modified:
+        response = make_response('', 304)
+    else:
+        payload = build_payload()
+        if isinstance(payload, tuple):
+            return jsonify(payload[0]), payload[1]
+        response = jsonify(payload)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def static_fingerprint(static_folder, filename):
+    """Short content hash of a static file, recomputed when the file changes"""
+    path = os.path.join(static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _static_hashes.get(key)
+    if digest is None:
+        hasher = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:12]
+        with _static_lock:
+            _static_hashes[key] = digest
+    return digest
+
+def init_app(app):
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            fingerprint = static_fingerprint(app.static_folder, values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    @app.after_request
+    def static_cache_headers(response):
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            if request.args.get('v'):
+                response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+            else:
+                # Unversioned URL - let the browser revalidate with the ETag Flask already sends
+                response.headers['Cache-Control'] = 'public, no-cache'
+        return response
@@ -0,0 +1,229 @@
+"""
+Responsive variants of the images in static/images.
+
+build() writes resized, recompressed copies of every image (WebP plus the
+original format, at each of IMAGE_WIDTHS up to the image's own width) into
+static/cache/images/ and records them in a manifest. Templates then ask for
+the variant that fits the client instead of the full-size original:
+
+  image_srcset('images/logo.jpg')              srcset for an <img>/<source>
+  responsive_background('.logo', 'images/logo.jpg', display_width=110)
+                                               CSS rules for a background image
+
+Without a build (or without Pillow, which is optional) both helpers fall back
+to the original file.
+
+Settings (environment):
+  IMAGE_WIDTHS   comma separated variant widths in pixels (default 240,480,768,1080)
+  IMAGE_QUALITY  WebP/JPEG quality of the variants (default 80)
+"""
+import hashlib
+import io
+import json
+import os
+import re
+
+from flask import current_app, url_for
+from markupsafe import Markup
+
+import assets
+
+try:
+    from PIL import Image
+except ImportError:  # Optional - no variants are built without it
+    Image = None
+
+IMAGE_WIDTHS = sorted(int(width) for width in os.getenv('IMAGE_WIDTHS', '240,480,768,1080').split(','))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+
+SOURCE_DIR = 'images'
+CACHE_DIR = 'cache/images'
+MANIFEST_NAME = 'manifest.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Fixed-size images are served at twice their CSS size for high-density screens
+DISPLAY_DENSITY = 2
+
+# Viewports used for the bytes-saved report
+REPORT_VIEWPORTS = {'phone': 400, 'desktop': 1440}
+
+_HELPER_RE = re.compile(
+    r"""(?:responsive_background\(\s*['"][^'"]*['"]\s*,|image_srcset\()\s*['"]([^'"]+)['"]"""
+    r"""(?:\s*,\s*display_width\s*=\s*(\d+))?"""
+)
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=IMAGE_QUALITY, method=6)
+    elif fmt == 'JPEG':
+        image.save(buffer, 'JPEG', quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+def _build_variants(static_folder, name, path, data):
+    """Write every variant of one source image, returns its manifest entry"""
+    cache_root = os.path.join(static_folder, CACHE_DIR)
+    stem, ext = os.path.splitext(os.path.basename(name))
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        original_format = 'PNG' if ext.lower() == '.png' else 'JPEG'
+        if original_format == 'JPEG' and source.mode != 'RGB':
+            source = source.convert('RGB')
+        widths = [w for w in IMAGE_WIDTHS if w < source.width] + [source.width]
+        variants = []
+        for width in widths:
+            height = round(source.height * width / source.width)
+            resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+            for fmt, mimetype in (('WEBP', 'image/webp'), (original_format, f'image/{original_format.lower()}')):
+                encoded = _encode(resized, fmt)
+                if fmt == original_format and width == source.width and len(encoded) >= len(data):
+                    # Recompressing didn't help - keep serving the original
+                    variants.append({'path': f'{SOURCE_DIR}/{name}', 'width': width, 'type': mimetype,
+                                     'bytes': len(data)})
+                    continue
+                digest = hashlib.sha256(encoded).hexdigest()[:10]
+                filename = f'{stem}-{width}w.{digest}.{fmt.lower()}'
+                with open(os.path.join(cache_root, filename), 'wb') as f:
+                    f.write(encoded)
+                variants.append({'path': f'{CACHE_DIR}/{filename}', 'width': width, 'type': mimetype,
+                                 'bytes': len(encoded)})
+    return {
+        'source_hash': hashlib.sha256(data).hexdigest(),
+        'width': source.width,
+        'bytes': len(data),
+        'variants': variants
+    }
+
+def build(static_folder):
+    """Generate variants for every image in static/images; returns the new manifest (None without Pillow)"""
+    if Image is None:
+        return None
+    cache_root = os.path.join(static_folder, CACHE_DIR)
+    os.makedirs(cache_root, exist_ok=True)
+    manifest_path = os.path.join(cache_root, MANIFEST_NAME)
+    previous = assets.read_manifest(manifest_path)
+    source_root = os.path.join(static_folder, SOURCE_DIR)
+
+    manifest = {}
+    for root, dirs, files in os.walk(source_root):
+        for filename in sorted(files):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source_root).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = previous.get(f'{SOURCE_DIR}/{name}')
+            # Unchanged since the last build (same source and settings) - reuse its variants
+            if not (entry and entry.get('source_hash') == hashlib.sha256(data).hexdigest()
+                    and entry.get('settings') == [IMAGE_WIDTHS, IMAGE_QUALITY]
+                    and all(os.path.exists(os.path.join(static_folder, v['path'])) for v in entry['variants'])):
+                entry = _build_variants(static_folder, name, path, data)
+                entry['settings'] = [IMAGE_WIDTHS, IMAGE_QUALITY]
+            manifest[f'{SOURCE_DIR}/{name}'] = entry
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    current = {os.path.basename(v['path']) for entry in manifest.values() for v in entry['variants']}
+    for filename in os.listdir(cache_root):
+        base = filename[:-3] if filename.endswith(('.br', '.gz')) else filename
+        if filename != MANIFEST_NAME and base not in current:
+            os.remove(os.path.join(cache_root, filename))
+    return manifest
+
+def load_manifest(static_folder):
+    return assets.read_manifest(os.path.join(static_folder, CACHE_DIR, MANIFEST_NAME))
+
+def pick_variant(entry, needed_width, mimetype):
+    """Smallest variant of the given type at least needed_width wide (the largest if none is)"""
+    candidates = [v for v in entry['variants'] if v['type'] == mimetype]
+    if not candidates:
+        return None
+    wide_enough = [v for v in candidates if v['width'] >= needed_width]
+    if wide_enough:
+        return min(wide_enough, key=lambda v: v['width'])
+    return max(candidates, key=lambda v: v['width'])
+
+def _entry(path):
+    return load_manifest(current_app.static_folder).get(path)
+
+def _fallback_type(entry):
+    return next(v['type'] for v in entry['variants'] if v['type'] != 'image/webp')
+
+def image_srcset(path, mimetype=None):
+    """srcset with every width of an image, e.g. for <source type="image/webp" srcset=...>"""
+    entry = _entry(path)
+    if not entry:
+        return url_for('static', filename=path)
+    mimetype = mimetype or _fallback_type(entry)
+    return ', '.join(
+        f"{url_for('static', filename=v['path'])} {v['width']}w"
+        for v in sorted(entry['variants'], key=lambda v: v['width'])
+        if v['type'] == mimetype
+    )
+
+def _background_declarations(entry, needed_width):
+    webp = pick_variant(entry, needed_width, 'image/webp')
+    fallback = pick_variant(entry, needed_width, _fallback_type(entry))
+    fallback_url = url_for('static', filename=fallback['path'])
+    # Browsers without image-set()/type() keep the first declaration
+    return (
+        f'background-image: url("{fallback_url}"); '
+        f'background-image: image-set(url("{url_for("static", filename=webp["path"])}") type("image/webp"), '
+        f'url("{fallback_url}") type("{fallback["type"]}");'
+    )
+
+def responsive_background(selector, path, display_width=None):
+    """
+    CSS rules giving `selector` the best-fitting variant of an image as its
+    background: fixed-size elements (display_width in CSS pixels) get one
+    variant for high-density screens, full-width backgrounds get one per
+    viewport width.
+    """
+    entry = _entry(path)
+    if not entry:
+        return Markup(f'{selector} {{ background-image: url("{url_for("static", filename=path)}"); }}')
+    if display_width:
+        return Markup(f'{selector} {{ {_background_declarations(entry, display_width * DISPLAY_DENSITY)} }}')
+
+    widths = sorted({v['width'] for v in entry['variants']}, reverse=True)
+    rules = [f'{selector} {{ {_background_declarations(entry, widths[0])} }}']
+    # Narrowest last, so it wins on the smallest screens
+    for width in widths[1:]:
+        rules.append(f'@media (max-width: {width}px) {{ {selector} {{ {_background_declarations(entry, width)} }} }}')
+    return Markup('\n'.join(rules))
+
+def page_weight_report(templates_folder, static_folder):
+    """Per template: image bytes of the originals vs the variants a phone and a desktop get"""
+    manifest = load_manifest(static_folder)
+    rows = []
+    for root, dirs, files in os.walk(templates_folder):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            with open(path, encoding='utf-8') as f:
+                uses = _HELPER_RE.findall(f.read())
+            if not uses:
+                continue
+            row = {'template': os.path.relpath(path, templates_folder), 'original_bytes': 0}
+            for viewport in REPORT_VIEWPORTS:
+                row[f'{viewport}_bytes'] = 0
+            for image_path, display_width in uses:
+                entry = manifest.get(image_path)
+                if not entry:
+                    continue
+                row['original_bytes'] += entry['bytes']
+                for viewport, viewport_width in REPORT_VIEWPORTS.items():
+                    needed = int(display_width) * DISPLAY_DENSITY if display_width else viewport_width
+                    row[f'{viewport}_bytes'] += pick_variant(entry, needed, 'image/webp')['bytes']
+            for viewport in REPORT_VIEWPORTS:
+                row[f'{viewport}_saved'] = row['original_bytes'] - row[f'{viewport}_bytes']
+            rows.append(row)
+    return rows
+
+def init_app(app):
+    app.add_template_global(image_srcset, 'image_srcset')
+    app.add_template_global(responsive_background, 'responsive_background')
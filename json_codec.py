@@ -0,0 +1,139 @@
+"""
+JSON encoding for the storage files, the answers column and JSON responses.
+
+Everything used to go through the standard json module: users.txt,
+quizzes.txt and database.txt (indented), the answers JSON of quiz_attempts,
+the submission spool and every jsonify() response. dumps()/dumpb()/loads()
+here use orjson when it is installed - several times faster on both ends -
+and the json module otherwise:
+
+  - datetimes and dates are written as ISO 8601 strings (what
+    DateTimeEncoder did), Decimals as strings, UUIDs as strings, Markup as
+    its text, str enums as their value
+  - output is compact: storage files are only read by the app, so no
+    indentation or spaces after separators (JSON_PRETTY_FILES=1 brings the
+    indentation back for files you edit by hand)
+  - anything orjson refuses to write (integers past 64 bits) or read
+    (NaN, Infinity) goes through the json module instead, so both codecs
+    accept the same data
+
+init_app() makes jsonify() and the session serializer use the same codec,
+keeping Flask's app.json.sort_keys and ensure_ascii: keys are sorted, and
+output with non-ASCII text goes through the json module to be escaped.
+
+Settings (environment):
+  JSON_CODEC         auto (default) - orjson when installed, else json;
+                     orjson or json to pick one
+  JSON_PRETTY_FILES  1 to indent quizzes.txt and database.txt (default 0)
+"""
+import dataclasses
+import decimal
+import enum
+import json
+import os
+import uuid
+from datetime import date, datetime, time
+
+try:
+    import orjson
+except ImportError:  # Optional - the json module does the same, slower
+    orjson = None
+
+import app_logging
+
+JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+JSON_PRETTY_FILES = os.getenv('JSON_PRETTY_FILES', '0') == '1'
+
+log = app_logging.get_logger('json_codec')
+
+def default(obj):
+    """The JSON form of the types the encoders don't know"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f'{type(obj).__name__} is not JSON serializable')
+
+class JSONEncoder(json.JSONEncoder):
+    """json.JSONEncoder with default(), for code that passes cls="""
+    def default(self, obj):
+        return default(obj)
+
+_use_orjson = False
+
+def configure(codec=JSON_CODEC):
+    """Pick the codec: auto, orjson or json (benchmarks switch at runtime)"""
+    global _use_orjson
+    if codec == 'orjson' and orjson is None:
+        log.warning("JSON_CODEC=orjson but orjson isn't installed, using json")
+    _use_orjson = orjson is not None and codec in ('auto', 'orjson')
+    return name()
+
+def name():
+    return 'orjson' if _use_orjson else 'json'
+
+configure()
+
+def _stdlib_dumps(obj, pretty, sort_keys):
+    if pretty:
+        return json.dumps(obj, default=default, indent=2, ensure_ascii=False, sort_keys=sort_keys)
+    return json.dumps(obj, default=default, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys)
+
+def dumpb(obj, pretty=False, sort_keys=False):
+    """UTF-8 encoded JSON of obj"""
+    if _use_orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass  # e.g. an integer past 64 bits - the json module handles those
+    return _stdlib_dumps(obj, pretty, sort_keys).encode('utf-8')
+
+def dumps(obj, pretty=False, sort_keys=False):
+    """JSON of obj as a str"""
+    if _use_orjson:
+        return dumpb(obj, pretty, sort_keys).decode('utf-8')
+    return _stdlib_dumps(obj, pretty, sort_keys)
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if _use_orjson:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass  # NaN/Infinity are only accepted by the json module; real errors are raised from there
+    return json.loads(data)
+
+def init_app(app):
+    try:
+        from flask.json.provider import DefaultJSONProvider
+    except ImportError:
+        # Flask < 2.2 serializes responses with app.json_encoder
+        app.json_encoder = JSONEncoder
+        return
+
+    class JSONProvider(DefaultJSONProvider):
+        # For the json module calls below, with options only it understands
+        default = staticmethod(default)
+
+        def dumps(self, obj, **kwargs):
+            if set(kwargs) - {'indent', 'separators'}:
+                return super().dumps(obj, **kwargs)
+            data = dumps(obj, pretty=bool(kwargs.get('indent')), sort_keys=self.sort_keys)
+            if self.ensure_ascii and not data.isascii():
+                # orjson can't escape non-ASCII text the way DefaultJSONProvider does
+                return super().dumps(obj, **kwargs)
+            return data
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return loads(s)
+
+    app.json = JSONProvider(app)
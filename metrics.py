@@ -0,0 +1,217 @@
+"""
+Per-route request metrics for the quiz app.
+
+Every request gets a small set of counters in flask.g (DB connections,
+queries, file storage I/O). When the request finishes they are folded into
+a process-wide registry under the route's endpoint name. The registry is
+shared by all threads of the worker and rendered as Prometheus text by
+/nimda/metrics.
+"""
+import threading
+import time
+
+import pymysql
+from flask import g, has_request_context, request
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request counters folded into the registry when the request ends
+REQUEST_COUNTERS = (
+    'db_connections',
+    'db_queries',
+    'db_query_seconds',
+    'file_read_bytes',
+    'file_read_seconds',
+    'file_write_bytes',
+    'file_write_seconds'
+)
+
+# name -> (prometheus metric, type, help text)
+ENDPOINT_METRICS = {
+    'db_connections': ('quiz_db_connections_total', 'counter', 'get_db_connection() calls'),
+    'db_queries': ('quiz_db_queries_total', 'counter', 'SQL statements executed'),
+    'db_query_seconds': ('quiz_db_query_seconds_total', 'counter', 'Time spent executing SQL statements'),
+    'file_read_bytes': ('quiz_file_read_bytes_total', 'counter', 'Bytes read from the file storage'),
+    'file_read_seconds': ('quiz_file_read_seconds_total', 'counter', 'Time spent reading the file storage'),
+    'file_write_bytes': ('quiz_file_write_bytes_total', 'counter', 'Bytes written to the file storage'),
+    'file_write_seconds': ('quiz_file_write_seconds_total', 'counter', 'Time spent writing the file storage'),
+    'response_bytes': ('quiz_http_response_bytes_total', 'counter', 'Response body bytes sent')
+}
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.statuses = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def _endpoint(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = {
+                'count': 0,
+                'latency_sum': 0.0,
+                'latency_buckets': [0] * len(LATENCY_BUCKETS),
+                'response_bytes': 0
+            }
+            for name in REQUEST_COUNTERS:
+                stats[name] = 0
+            self.endpoints[endpoint] = stats
+        return stats
+
+    def observe_request(self, endpoint, status, latency, response_bytes, counters):
+        with self.lock:
+            stats = self._endpoint(endpoint)
+            stats['count'] += 1
+            stats['latency_sum'] += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats['latency_buckets'][i] += 1
+            stats['response_bytes'] += response_bytes
+            for name, value in counters.items():
+                stats[name] += value
+            key = (endpoint, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def inc_counter(self, name, help_text, labels=None, value=1):
+        """Increment a free-form counter, e.g. shed requests or cache hits"""
+        label_key = tuple(sorted((labels or {}).items()))
+        with self.lock:
+            metric = self.counters.setdefault(name, {'help': help_text, 'values': {}})
+            metric['values'][label_key] = metric['values'].get(label_key, 0) + value
+
+    def set_gauge(self, name, help_text, value, labels=None):
+        label_key = tuple(sorted((labels or {}).items()))
+        with self.lock:
+            metric = self.gauges.setdefault(name, {'help': help_text, 'values': {}})
+            metric['values'][label_key] = value
+
+    def snapshot(self):
+        """Copy of the per-endpoint stats, for reports and tests"""
+        with self.lock:
+            return {endpoint: dict(stats, latency_buckets=list(stats['latency_buckets']))
+                    for endpoint, stats in self.endpoints.items()}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+            self.statuses.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def render_prometheus(self):
+        with self.lock:
+            lines = []
+
+            lines.append('# HELP quiz_http_request_duration_seconds Request latency per endpoint')
+            lines.append('# TYPE quiz_http_request_duration_seconds histogram')
+            for endpoint, stats in sorted(self.endpoints.items()):
+                label = f'endpoint="{escape_label(endpoint)}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats['latency_buckets']):
+                    lines.append(f'quiz_http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'quiz_http_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+                lines.append(f'quiz_http_request_duration_seconds_sum{{{label}}} {stats["latency_sum"]:.6f}')
+                lines.append(f'quiz_http_request_duration_seconds_count{{{label}}} {stats["count"]}')
+
+            lines.append('# HELP quiz_http_requests_total Requests per endpoint and status code')
+            lines.append('# TYPE quiz_http_requests_total counter')
+            for (endpoint, status), count in sorted(self.statuses.items()):
+                lines.append(f'quiz_http_requests_total{{endpoint="{escape_label(endpoint)}",status="{status}"}} {count}')
+
+            for name, (metric, metric_type, help_text) in ENDPOINT_METRICS.items():
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} {metric_type}')
+                for endpoint, stats in sorted(self.endpoints.items()):
+                    lines.append(f'{metric}{{endpoint="{escape_label(endpoint)}"}} {format_value(stats[name])}')
+
+            for metric_type, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, metric in sorted(metrics.items()):
+                    lines.append(f'# HELP {name} {metric["help"]}')
+                    lines.append(f'# TYPE {name} {metric_type}')
+                    for label_key, value in sorted(metric['values'].items()):
+                        labels = ','.join(f'{k}="{escape_label(str(v))}"' for k, v in label_key)
+                        lines.append(f'{name}{{{labels}}} {format_value(value)}' if labels else f'{name} {format_value(value)}')
+
+            return '\n'.join(lines) + '\n'
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_value(value):
+    return f'{value:.6f}' if isinstance(value, float) else str(value)
+
+# One registry per worker process, shared by all its threads
+registry = MetricsRegistry()
+
+def _request_counters():
+    if not has_request_context():
+        return None
+    counters = getattr(g, '_metrics_counters', None)
+    if counters is None:
+        counters = dict.fromkeys(REQUEST_COUNTERS, 0)
+        g._metrics_counters = counters
+    return counters
+
+def record_db_connection():
+    counters = _request_counters()
+    if counters is not None:
+        counters['db_connections'] += 1
+
+def record_query(seconds):
+    counters = _request_counters()
+    if counters is not None:
+        counters['db_queries'] += 1
+        counters['db_query_seconds'] += seconds
+
+def record_file_read(nbytes, seconds):
+    counters = _request_counters()
+    if counters is not None:
+        counters['file_read_bytes'] += nbytes
+        counters['file_read_seconds'] += seconds
+
+def record_file_write(nbytes, seconds):
+    counters = _request_counters()
+    if counters is not None:
+        counters['file_write_bytes'] += nbytes
+        counters['file_write_seconds'] += seconds
+
+class InstrumentedCursor(pymysql.cursors.DictCursor):
+    """
+    DictCursor that reports each statement's duration to the request metrics.
+    pymysql's executemany() goes through execute(), so every round trip is
+    counted once.
+    """
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(time.perf_counter() - started)
+
+def init_app(app):
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+        _request_counters()
+
+    @app.after_request
+    def record_response_size(response):
+        if not response.is_streamed:
+            g._metrics_response_bytes = response.calculate_content_length() or 0
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = getattr(g, '_metrics_started', None)
+        if started is None:
+            return
+        registry.observe_request(
+            request.endpoint or 'unmatched',
+            getattr(g, '_metrics_status', 500),
+            time.perf_counter() - started,
+            getattr(g, '_metrics_response_bytes', 0),
+            getattr(g, '_metrics_counters', None) or {}
+        )
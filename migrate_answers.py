@@ -0,0 +1,139 @@
+"""
+Convert the answers of existing quiz_attempts rows to the compact encoding
+(answer_codec.py).
+
+Walks quiz_attempts by id in batches. For each batch, the question sets
+of the rows are stored in quiz_question_sets and the rows rewritten, in
+one transaction. A row is only rewritten when decoding its new answers
+gives back its old results. Rows already compact, without answers, or with
+results that don't fit the encoding (fail_quiz's "Quiz failed" rows) are
+left alone, so the script can be stopped and run again at any time.
+
+InnoDB keeps the freed pages; --optimize rebuilds the table afterwards
+(OPTIMIZE TABLE) so the file and the buffer pool footprint shrink too.
+
+    python migrate_answers.py --dry-run
+    python migrate_answers.py --batch-size 1000 --optimize
+"""
+import argparse
+import time
+
+import answer_codec
+import json_codec
+
+import app as quiz_app
+
+def _normalized(results):
+    return [
+        {key: (result.get(key) or '') if key == 'feedback' else result.get(key) for key in answer_codec.RESULT_KEYS}
+        for result in results
+    ]
+
+def convert(row):
+    """(new answers JSON, (version, question set)) for a row, or None to leave it alone"""
+    answers = row['answers']
+    if answers is None:
+        return None
+    if isinstance(answers, (str, bytes)):
+        answers = json_codec.loads(answers)
+    if not isinstance(answers, list) or answer_codec.is_compact(answers):
+        return None
+    encoded, question_set = answer_codec.encode(answers)
+    if question_set is None:
+        return None
+    decoded = answer_codec.decode(encoded, row['quiz_id'], lambda quiz_id, version: question_set[1])
+    if _normalized(decoded) != _normalized(answers):
+        return None
+    return json_codec.dumps(encoded), question_set
+
+def _size(value):
+    if value is None:
+        return 0
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+def migrate(conn, batch_size, dry_run):
+    stats = {'rows': 0, 'converted': 0, 'left_alone': 0, 'bytes_before': 0, 'bytes_after': 0, 'question_sets': 0}
+    stored_sets = set()
+    last_id = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, quiz_id, answers FROM quiz_attempts WHERE id > %s ORDER BY id LIMIT %s",
+                           (last_id, batch_size))
+            rows = cursor.fetchall()
+        if not rows:
+            return stats
+        last_id = rows[-1]['id']
+
+        updates = []
+        new_sets = {}
+        for row in rows:
+            stats['rows'] += 1
+            converted = convert(row)
+            if converted is None:
+                stats['left_alone'] += 1
+                continue
+            answers, (version, questions) = converted
+            stats['converted'] += 1
+            stats['bytes_before'] += _size(row['answers'])
+            stats['bytes_after'] += _size(answers)
+            updates.append((answers, row['id']))
+            if (row['quiz_id'], version) not in stored_sets:
+                new_sets[(row['quiz_id'], version)] = questions
+
+        stats['question_sets'] += len(new_sets)
+        stats['bytes_after'] += sum(_size(json_codec.dumps(questions)) for questions in new_sets.values())
+        if updates and not dry_run:
+            try:
+                with conn.cursor() as cursor:
+                    if new_sets:
+                        cursor.executemany(
+                            "INSERT IGNORE INTO quiz_question_sets (quiz_id, version, questions) VALUES (%s, %s, %s)",
+                            [(quiz_id, version, json_codec.dumps(questions))
+                             for (quiz_id, version), questions in new_sets.items()]
+                        )
+                    cursor.executemany("UPDATE quiz_attempts SET answers = %s WHERE id = %s", updates)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        stored_sets.update(new_sets)
+        print(f"  up to id {last_id}: {stats['converted']} of {stats['rows']} rows converted")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    parser.add_argument('--optimize', action='store_true', help='Rebuild quiz_attempts afterwards to free the space')
+    args = parser.parse_args()
+
+    conn = quiz_app.get_db_connection()
+    if not conn:
+        print("No database connection (check DB_HOST, DB_USER, DB_PASSWORD and DB_NAME)")
+        return 1
+    try:
+        with conn.cursor() as cursor:
+            quiz_app.create_tables(cursor)  # quiz_question_sets
+        conn.commit()
+
+        started = time.perf_counter()
+        stats = migrate(conn, args.batch_size, args.dry_run)
+        elapsed = time.perf_counter() - started
+
+        before, after = stats['bytes_before'], stats['bytes_after']
+        print(f"{'Would convert' if args.dry_run else 'Converted'} {stats['converted']} of {stats['rows']} rows "
+              f"in {elapsed:.1f}s ({stats['left_alone']} left alone, {stats['question_sets']} question sets)")
+        if before:
+            print(f"answers: {before / 1024 / 1024:.2f} MB -> {after / 1024 / 1024:.2f} MB with the question sets "
+                  f"({before / max(after, 1):.1f}x smaller)")
+
+        if args.optimize and not args.dry_run:
+            print("Rebuilding quiz_attempts (OPTIMIZE TABLE)...")
+            with conn.cursor() as cursor:
+                cursor.execute("OPTIMIZE TABLE quiz_attempts")
+                cursor.fetchall()
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
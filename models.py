@@ -0,0 +1,300 @@
+"""
+Compact in-memory models for quizzes, questions and attempts.
+
+Loaded from JSON, every quiz, question and attempt is a dict: a hash table
+per object, a fresh copy of every string value (json doesn't share values)
+and whatever keys the code added along the way. A catalog of a few hundred
+quizzes and the attempt set of a school year hold the same question texts,
+correct answers, strands and question types thousands of times over.
+
+The classes here keep the same data in __slots__ instead:
+  - no per-object dict, lists become tuples
+  - question_type and strand are QuestionType / Strand members (one shared
+    object each, and still equal to their plain string), unknown values are
+    kept as interned strings
+  - strings that repeat from record to record are interned: the question
+    texts and correct answers in attempts (2,000 attempts at one quiz share
+    one copy of its questions), quiz ids and titles, categories
+  - keys without a slot (type-specific question data like blanks or
+    left_items, columns added later) are kept in `extra`, so converting a
+    record and back gives the same record
+
+Conversion: from_dict()/to_dict() for the users.txt and quizzes.txt
+records, from_row() for the MySQL rows (quizzes, quiz_questions,
+quiz_attempts), and row_values() for the quiz_attempts INSERT (answers in
+answer_codec's compact form). A null value in a record is treated like a
+missing key.
+
+Models also answer get() and [] like the dicts they replace, so read-only
+code and templates can take either.
+"""
+import enum
+import sys
+
+import answer_codec
+import json_codec
+
+class QuestionType(str, enum.Enum):
+    MULTIPLE_CHOICE = 'multiple_choice'
+    TRUE_FALSE = 'true_false'
+    SHORT_ANSWER = 'short_answer'
+    FILL_BLANK = 'fill_blank'
+    MATCHING = 'matching'
+    ESSAY = 'essay'
+
+    __str__ = str.__str__
+
+class Strand(str, enum.Enum):
+    STEM = 'STEM'
+    HUMSS = 'HUMSS'
+    ICT = 'ICT'
+    TVL = 'TVL'
+    ABM = 'ABM'
+
+    __str__ = str.__str__
+
+def _enum(enum_class, value):
+    """The enum member for value, or value itself (interned) when it isn't one"""
+    if value is None or isinstance(value, enum_class):
+        return value
+    member = enum_class._value2member_map_.get(value)
+    if member is not None:
+        return member
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _plain(value):
+    # Back to what json.loads would have produced
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, tuple):
+        return [_plain(item) for item in value]
+    return value
+
+def _compact(value, intern=False):
+    if intern and isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_compact(item, intern) for item in value)
+    return value
+
+class _Model:
+    __slots__ = ('extra',)
+    # record key -> slot, for the slots whose key differs from the slot name
+    _KEYS = {}
+    # Slots whose strings repeat across records and are interned - interning
+    # strings that don't repeat would only grow the interpreter's intern table
+    _INTERNED = frozenset()
+
+    def __init__(self, **fields):
+        for slot in self._slot_names():
+            value = fields.pop(slot, None)
+            setattr(self, slot, value if value is None or slot == 'extra' else self._convert(slot, value))
+        if fields:
+            raise TypeError(f'{type(self).__name__} has no field {next(iter(fields))!r}')
+
+    @classmethod
+    def _slot_names(cls):
+        return [slot for klass in reversed(cls.__mro__) for slot in getattr(klass, '__slots__', ())]
+
+    @classmethod
+    def from_dict(cls, record):
+        model = cls.__new__(cls)
+        for slot in cls._slot_names():
+            object.__setattr__(model, slot, None)
+        extra = {}
+        for key, value in record.items():
+            slot = cls._KEYS.get(key, key)
+            if slot in cls._FIELDS:
+                setattr(model, slot, None if value is None else model._convert(slot, value))
+            elif value is not None:
+                extra[sys.intern(key)] = value
+        model.extra = extra or None
+        return model
+
+    def _convert(self, slot, value):
+        return _compact(value, slot in self._INTERNED)
+
+    def to_dict(self):
+        keys = {slot: key for key, slot in self._KEYS.items()}
+        record = {}
+        for slot in type(self).__slots__:
+            value = getattr(self, slot)
+            if value is not None:
+                record[keys.get(slot, slot)] = self._export(slot, value)
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def _export(self, slot, value):
+        return _plain(value)
+
+    # Read like the dicts they replace
+
+    def get(self, key, default=None):
+        slot = self._KEYS.get(key, key)
+        if slot in self._FIELDS:
+            value = getattr(self, slot)
+        else:
+            value = (self.extra or {}).get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.to_dict() == self.to_dict()
+
+    __hash__ = None
+
+class Question(_Model):
+    __slots__ = ('id', 'question', 'question_type', 'options', 'correct_answer', 'points', 'time_per_question',
+                 'time_limit')
+    _FIELDS = frozenset(__slots__)
+
+    def _convert(self, slot, value):
+        if slot == 'question_type':
+            return _enum(QuestionType, value)
+        return _compact(value)
+
+    @classmethod
+    def from_row(cls, row):
+        """A quiz_questions row, with options and correct_answer decoded the way admin_save_quiz_questions stores them"""
+        question_type = _enum(QuestionType, row.get('question_type'))
+        options = row.get('options')
+        if isinstance(options, str):
+            options = json_codec.loads(options)
+        correct_answer = row.get('correct_answer')
+        record = {'id': row.get('id'), 'question': row.get('question'), 'question_type': question_type,
+                  'points': row.get('points')}
+        if question_type is QuestionType.MULTIPLE_CHOICE:
+            record['options'] = options
+            try:
+                record['correct_answer'] = int(correct_answer)
+            except (TypeError, ValueError):
+                record['correct_answer'] = correct_answer
+        elif question_type is QuestionType.FILL_BLANK:
+            record['blanks'] = options
+        elif question_type is QuestionType.MATCHING:
+            record.update(options or {})
+        else:
+            record['options'] = options
+            record['correct_answer'] = correct_answer
+        return cls.from_dict(record)
+
+class Quiz(_Model):
+    __slots__ = ('id', 'title', 'description', 'topics', 'strand', 'category', 'subject', 'grade_level',
+                 'author_first_name', 'author_last_name', 'created_at', 'time_limit', 'total_time', 'passing_score',
+                 'questions')
+    _FIELDS = frozenset(__slots__)
+    _KEYS = {'quiz_category': 'category'}
+    _INTERNED = frozenset(('topics', 'category', 'subject', 'grade_level', 'author_first_name', 'author_last_name'))
+
+    def _convert(self, slot, value):
+        if slot == 'strand':
+            return _enum(Strand, value)
+        if slot == 'questions':
+            return tuple(question if isinstance(question, Question) else Question.from_dict(question)
+                         for question in value)
+        return _compact(value, slot in self._INTERNED)
+
+    def _export(self, slot, value):
+        if slot == 'questions':
+            return [question.to_dict() for question in value]
+        return _plain(value)
+
+    @classmethod
+    def from_row(cls, row, questions=()):
+        """A quizzes row and its quiz_questions rows"""
+        record = dict(row)
+        record['questions'] = [Question.from_row(question) for question in questions]
+        return cls.from_dict(record)
+
+    @property
+    def question_count(self):
+        return len(self.questions or ())
+
+class QuestionResult(_Model):
+    __slots__ = ('question', 'question_type', 'user_answer', 'correct_answer', 'is_correct', 'feedback')
+    _FIELDS = frozenset(__slots__)
+    # Every attempt at a quiz repeats its questions and correct answers; true/false and
+    # multiple choice answers repeat too, free-text answers mostly don't but are short
+    _INTERNED = frozenset(('question', 'correct_answer', 'user_answer', 'feedback'))
+
+    def _convert(self, slot, value):
+        if slot == 'question_type':
+            return _enum(QuestionType, value)
+        if slot == 'user_answer' and isinstance(value, dict):
+            return value
+        return _compact(value, slot in self._INTERNED)
+
+class Attempt(_Model):
+    """
+    One graded attempt: a quiz_history entry in users.txt, or a quiz_attempts
+    row. Both name the same data differently (timestamp / end_time,
+    score_percentage / score, total_score / total_questions); the slots
+    follow the table.
+    """
+    __slots__ = ('attempt_id', 'quiz_id', 'quiz_title', 'user_id', 'student_name', 'student_email', 'student_strand',
+                 'start_time', 'end_time', 'score', 'raw_score', 'total_questions', 'passed', 'timeout', 'results')
+    _FIELDS = frozenset(__slots__)
+    # quiz_history keys
+    _KEYS = {'timestamp': 'end_time', 'score_percentage': 'score', 'total_score': 'total_questions',
+             'question_results': 'results'}
+    _INTERNED = frozenset(('quiz_id', 'quiz_title', 'student_name'))
+
+    def _convert(self, slot, value):
+        if slot == 'student_strand':
+            return _enum(Strand, value)
+        if slot == 'results':
+            return tuple(result if isinstance(result, QuestionResult) else QuestionResult.from_dict(result)
+                         for result in value)
+        return _compact(value, slot in self._INTERNED)
+
+    def _export(self, slot, value):
+        if slot == 'results':
+            return [result.to_dict() for result in value]
+        return _plain(value)
+
+    @classmethod
+    def from_row(cls, row, load_question_set=None):
+        """
+        A quiz_attempts row. Selected answers are decoded into results;
+        compact answers need load_question_set(quiz_id, version) for that
+        (see answer_codec), without it results stay None.
+        """
+        record = {('attempt_id' if key == 'attempt_uuid' else 'results' if key == 'answers' else key): value
+                  for key, value in row.items()}
+        if record.get('results') is not None:
+            answers = record['results']
+            if isinstance(answers, (str, bytes)):
+                answers = json_codec.loads(answers)
+            if answer_codec.is_compact(answers) and load_question_set is None:
+                record['results'] = None
+            else:
+                record['results'] = answer_codec.decode(answers, record.get('quiz_id'), load_question_set)
+        if record.get('score') is not None:
+            record['score'] = float(record['score'])
+        if 'email' in record and not record.get('student_email'):
+            record['student_email'] = record.pop('email')
+        return cls.from_dict(record)
+
+    def row_values(self):
+        """
+        (values for the quiz_attempts INSERT of insert_attempts_to_db in its
+        column order, (version, question set) to store alongside or None)
+        """
+        answers, question_set = answer_codec.encode([result.to_dict() for result in self.results or ()])
+        return (
+            self.attempt_id, self.user_id or 0, self.quiz_id, self.score, self.raw_score, self.total_questions,
+            bool(self.passed), json_codec.dumps(answers), self.student_name, _plain(self.student_strand),
+            self.end_time
+        ), question_set
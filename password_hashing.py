@@ -0,0 +1,252 @@
+"""
+Password hashing off the request threads.
+
+Every login, signup and password change runs a deliberately slow hash
+(pbkdf2:sha256 at werkzeug's default 1,000,000 iterations). When a whole
+class logs in at the start of an exam, those hashes queue up behind each
+other and the CPU is oversubscribed by every worker thread at once.
+
+hash_password() and verify_password() run the hash in a per-worker pool of
+PASSWORD_HASH_WORKERS processes instead:
+  - at most PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE hashes are running or
+    waiting; beyond that Busy is raised straight away (429 + Retry-After
+    through the errorhandler in init_app)
+  - a caller waits at most PASSWORD_HASH_TIMEOUT seconds for its result, then
+    Busy is raised as well
+  - without a usable pool (PASSWORD_HASH_WORKERS=0, or no multiprocessing
+    support, e.g. on serverless hosts) the hash runs on the calling thread
+
+init_app() starts the pool while the process has no other threads yet
+(app.py calls it before logging starts its listener), so its processes are
+forked cleanly. A pool started later - in a forked web worker, after the
+pool broke, after configure() - uses forkserver with this module preloaded:
+forking a process that already runs request, logging and spool threads can
+deadlock the child on a lock one of those threads held.
+
+Rehashing: verify_password() returns (ok, new_hash). new_hash is set when the
+password was right but the stored hash was made with another method or work
+factor than PASSWORD_HASH_METHOD - the caller stores it, so raising the
+iterations upgrades every account on its next login. The rehash runs in the
+same pool job as the check.
+
+Settings (environment):
+  PASSWORD_HASH_METHOD   werkzeug method for new hashes (default pbkdf2:sha256,
+                         e.g. pbkdf2:sha256:1200000 or scrypt)
+  PASSWORD_HASH_WORKERS  hashing processes per worker (default: CPU count, 0 = hash inline)
+  PASSWORD_HASH_QUEUE    hashes allowed to wait for a free process (default 32)
+  PASSWORD_HASH_TIMEOUT  seconds a request waits for its hash (default 10)
+"""
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+import admission
+import app_logging
+import metrics
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+# Serverless functions get one request per instance and no shared memory for a pool
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0' if os.getenv('VERCEL') else str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+# Bulk hashing (hash_many) hands each process this many passwords per job and
+# waits for every process's job before the next round, so logins queued meanwhile
+# wait for one round instead of the whole import
+BULK_JOB_SIZE = 16
+
+# werkzeug's defaults for the parameters a method string may leave out
+SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+log = app_logging.get_logger('password_hashing')
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_pool_failed = False  # Creating a pool failed once - hash inline from then on
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE) if PASSWORD_HASH_WORKERS else None
+
+class Busy(Exception):
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+def normalize_method(method):
+    """The method prefix werkzeug stores in a hash made with `method`, defaults filled in"""
+    name, *params = method.split(':')
+    if name == 'pbkdf2':
+        params += ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(params):]
+    elif name == 'scrypt':
+        params += list(SCRYPT_DEFAULTS[len(params):])
+    return ':'.join([name] + params)
+
+def needs_rehash(stored_hash, method=PASSWORD_HASH_METHOD):
+    """True if stored_hash was not made with `method` and its current work factor"""
+    return stored_hash.split('$', 1)[0] != normalize_method(method)
+
+# Run inside the pool processes - module level so they can be pickled
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _verify(stored_hash, password, method):
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+def _context():
+    """fork while this process has no other threads, forkserver once it does"""
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    if 'forkserver' in methods:
+        context = multiprocessing.get_context('forkserver')
+        # The hashing processes only need this module (and werkzeug)
+        context.set_forkserver_preload(['password_hashing'])
+        return context
+    return multiprocessing.get_context()
+
+def _get_pool():
+    """This process's pool, None to hash inline"""
+    global _pool, _pool_pid, _pool_failed
+    # A hashing process never starts a pool of its own
+    if not PASSWORD_HASH_WORKERS or _pool_failed or multiprocessing.parent_process() is not None:
+        return None
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        # A forked web worker can't use its parent's pool
+        if _pool is None or _pool_pid != os.getpid():
+            try:
+                _pool = concurrent.futures.ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=_context())
+                _pool_pid = os.getpid()
+            except (OSError, NotImplementedError, ValueError) as e:
+                log.warning("No process pool for password hashing, hashing inline: %s", e)
+                _pool_failed = True
+                return None
+    return _pool
+
+def start_pool():
+    """Start the pool's processes now rather than on the first hash"""
+    pool = _get_pool()
+    if pool is None:
+        return
+    try:
+        # With fork, every process is started on the first job, before the pool's own threads
+        pool.submit(os.getpid).result(timeout=PASSWORD_HASH_TIMEOUT)
+    except Exception as e:
+        log.warning("Password hashing pool didn't start, it is retried on the first hash: %s", e)
+        _discard_pool(pool)
+
+def configure(workers=None, queue=None):
+    """Change the pool size at runtime (benchmarks) and start the new pool"""
+    global PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, _pool, _pool_failed, _slots
+    with _pool_lock:
+        if workers is not None:
+            PASSWORD_HASH_WORKERS = workers
+        if queue is not None:
+            PASSWORD_HASH_QUEUE = queue
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_failed = False
+        _slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE) if PASSWORD_HASH_WORKERS else None
+    start_pool()
+
+def _discard_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def _run(op, fn, *args):
+    started = time.perf_counter()
+    pool = _get_pool()
+    if pool is None:
+        result = fn(*args)
+    else:
+        slots = _slots
+        if not slots.acquire(blocking=False):
+            metrics.registry.inc_counter('quiz_password_hash_rejected_total', 'Hashes refused because the pool was busy',
+                                         {'reason': 'queue_full'})
+            raise Busy('queue_full')
+        try:
+            future = pool.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):
+            slots.release()
+            _discard_pool(pool)
+            result = fn(*args)
+        else:
+            # The slot is held until the job finishes, even if its caller gave up waiting
+            future.add_done_callback(lambda f: slots.release())
+            try:
+                result = future.result(timeout=PASSWORD_HASH_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                metrics.registry.inc_counter('quiz_password_hash_rejected_total',
+                                             'Hashes refused because the pool was busy', {'reason': 'timeout'})
+                log.warning("Password %s took longer than %.1fs", op, PASSWORD_HASH_TIMEOUT)
+                raise Busy('timeout')
+            except BrokenProcessPool:
+                # A hashing process died (e.g. OOM killed) - start a fresh pool next time
+                log.error("Password hashing pool broke, hashing inline")
+                _discard_pool(pool)
+                result = fn(*args)
+    labels = {'op': op}
+    metrics.registry.inc_counter('quiz_password_hashes_total', 'Password hashes computed', labels)
+    metrics.registry.inc_counter('quiz_password_hash_seconds_total', 'Time requests waited for password hashes',
+                                 labels, value=time.perf_counter() - started)
+    return result
+
+def hash_password(password):
+    """A new hash of password with PASSWORD_HASH_METHOD; raises Busy"""
+    return _run('hash', _hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(stored_hash, password):
+    """(password matches, new hash to store or None); raises Busy"""
+    ok, new_hash = _run('verify', _verify, stored_hash, password, PASSWORD_HASH_METHOD)
+    if new_hash:
+        metrics.registry.inc_counter('quiz_password_rehashed_total', 'Passwords rehashed with the current method')
+    return ok, new_hash
+
+def hash_many(passwords, method=None):
+    """Hashes of a list of passwords in order, spread over the pool's processes (roster imports)"""
+    method = method or PASSWORD_HASH_METHOD
+    started = time.perf_counter()
+    hashes = []
+    pool = _get_pool()
+    step = BULK_JOB_SIZE * max(PASSWORD_HASH_WORKERS, 1)
+    for start in range(0, len(passwords), step):
+        batch = passwords[start:start + step]
+        if pool is not None:
+            try:
+                hashes.extend(pool.map(_hash, batch, itertools.repeat(method), chunksize=BULK_JOB_SIZE))
+                continue
+            except (BrokenProcessPool, RuntimeError):
+                log.error("Password hashing pool broke, hashing inline")
+                _discard_pool(pool)
+                pool = None
+        hashes.extend(_hash(password, method) for password in batch)
+    labels = {'op': 'bulk'}
+    metrics.registry.inc_counter('quiz_password_hashes_total', 'Password hashes computed', labels, value=len(passwords))
+    metrics.registry.inc_counter('quiz_password_hash_seconds_total', 'Time requests waited for password hashes',
+                                 labels, value=time.perf_counter() - started)
+    return hashes
+
+def init_app(app):
+    """Start the pool (call before anything starts a thread) and answer Busy with a 429"""
+    start_pool()
+
+    @app.errorhandler(Busy)
+    def hashing_busy(e):
+        return admission.too_many_requests(e.retry_after)
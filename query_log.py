@@ -0,0 +1,210 @@
+"""
+Slow-query log and N+1 detection for the pymysql layer.
+
+get_db_connection() hands out ProfilingCursor cursors. Every statement is
+fingerprinted (literals and placeholders replaced by ?), timed and its row
+count recorded. Statements slower than SLOW_QUERY_MS are appended to the
+slow query log as JSON lines, with an optional EXPLAIN plan
+(SLOW_QUERY_EXPLAIN=1). At the end of each request, any fingerprint executed
+more than N_PLUS_ONE_THRESHOLD times is logged as an N+1 suspect.
+
+Summarize the top offenders with:
+
+    python query_log.py
+    python query_log.py --log slow_queries.log --top 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import pymysql
+from flask import g, has_request_context, request
+
+import app_logging
+import metrics
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '0') == '1'
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'slow_queries.log')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '10'))
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s')
+_NUMBER_RE = re.compile(r'\b-?\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_TUPLES_RE = re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_log_lock = threading.Lock()
+log = app_logging.get_logger('query_log')
+
+def fingerprint(sql):
+    """Normalize a statement so that calls differing only in values group together"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    normalized = _STRING_RE.sub('?', sql)
+    normalized = _PLACEHOLDER_RE.sub('?', normalized)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _LIST_RE.sub('(?+)', normalized)
+    normalized = _TUPLES_RE.sub('(?+)...', normalized)
+    return _WHITESPACE_RE.sub(' ', normalized).strip().lower()
+
+def fingerprint_id(normalized):
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+def write_event(event):
+    event['logged_at'] = datetime.now().isoformat()
+    line = json.dumps(event, default=str)
+    with _log_lock:
+        try:
+            with open(SLOW_QUERY_LOG, 'a') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            log.error("Could not write slow query log: %s", e)
+
+def _request_queries():
+    if not has_request_context():
+        return None
+    queries = getattr(g, '_query_fingerprints', None)
+    if queries is None:
+        queries = {}
+        g._query_fingerprints = queries
+    return queries
+
+class ProfilingCursor(metrics.InstrumentedCursor):
+    """
+    Cursor that fingerprints, times and counts rows for every statement,
+    on top of the per-route metrics of InstrumentedCursor.
+    """
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self._profile(query, args, time.perf_counter() - started)
+
+    def _profile(self, query, args, duration):
+        normalized = fingerprint(query)
+        queries = _request_queries()
+        if queries is not None:
+            count, total = queries.get(normalized, (0, 0.0))
+            queries[normalized] = (count + 1, total + duration)
+
+        if duration * 1000 < SLOW_QUERY_MS:
+            return
+
+        event = {
+            'type': 'slow_query',
+            'fingerprint': normalized,
+            'fingerprint_id': fingerprint_id(normalized),
+            'duration_ms': round(duration * 1000, 3),
+            'rows': self.rowcount,
+            'endpoint': request.endpoint if has_request_context() else None
+        }
+        if SLOW_QUERY_EXPLAIN and normalized.startswith('select'):
+            event['explain'] = self._explain(query, args)
+        write_event(event)
+
+    def _explain(self, query, args):
+        # Plain cursor so the EXPLAIN itself isn't profiled
+        try:
+            with self.connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute('EXPLAIN ' + self.mogrify(query, args))
+                return cursor.fetchall()
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+
+def init_app(app):
+    @app.teardown_request
+    def flag_repeated_queries(exc):
+        queries = getattr(g, '_query_fingerprints', None)
+        if not queries:
+            return
+        for normalized, (count, total) in queries.items():
+            if count > N_PLUS_ONE_THRESHOLD:
+                write_event({
+                    'type': 'n_plus_one',
+                    'fingerprint': normalized,
+                    'fingerprint_id': fingerprint_id(normalized),
+                    'count': count,
+                    'duration_ms': round(total * 1000, 3),
+                    'endpoint': request.endpoint
+                })
+
+def load_events(path):
+    events = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return events
+
+def summarize(events, top):
+    """Group log events by fingerprint and return the worst offenders by total time"""
+    slow = {}
+    repeated = {}
+    for event in events:
+        if event.get('type') == 'slow_query':
+            stats = slow.setdefault(event['fingerprint'], {
+                'fingerprint': event['fingerprint'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'rows': 0, 'endpoints': set()
+            })
+            stats['count'] += 1
+            stats['total_ms'] += event.get('duration_ms', 0)
+            stats['max_ms'] = max(stats['max_ms'], event.get('duration_ms', 0))
+            stats['rows'] = max(stats['rows'], event.get('rows') or 0)
+        elif event.get('type') == 'n_plus_one':
+            stats = repeated.setdefault(event['fingerprint'], {
+                'fingerprint': event['fingerprint'], 'requests': 0, 'max_per_request': 0, 'total_ms': 0.0,
+                'endpoints': set()
+            })
+            stats['requests'] += 1
+            stats['max_per_request'] = max(stats['max_per_request'], event.get('count', 0))
+            stats['total_ms'] += event.get('duration_ms', 0)
+        else:
+            continue
+        if event.get('endpoint'):
+            stats['endpoints'].add(event['endpoint'])
+
+    by_total = lambda stats: stats['total_ms']
+    return (sorted(slow.values(), key=by_total, reverse=True)[:top],
+            sorted(repeated.values(), key=by_total, reverse=True)[:top])
+
+def print_report(path, top):
+    slow, repeated = summarize(load_events(path), top)
+
+    print(f"\n===== SLOW QUERIES ({path}) =====")
+    if not slow:
+        print("No slow queries logged")
+    for stats in slow:
+        print(f"{stats['total_ms']:10.1f} ms total  {stats['count']:6d}x  max {stats['max_ms']:.1f} ms  "
+              f"rows<={stats['rows']}  [{', '.join(sorted(stats['endpoints']))}]")
+        print(f"    {stats['fingerprint'][:200]}")
+
+    print("\n===== REPEATED STATEMENTS (N+1 suspects) =====")
+    if not repeated:
+        print("No N+1 suspects logged")
+    for stats in repeated:
+        print(f"{stats['total_ms']:10.1f} ms total  {stats['requests']:6d} requests  "
+              f"up to {stats['max_per_request']}x per request  [{', '.join(sorted(stats['endpoints']))}]")
+        print(f"    {stats['fingerprint'][:200]}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize the slow query log')
+    parser.add_argument('--log', default=SLOW_QUERY_LOG, help='Path to the slow query log')
+    parser.add_argument('--top', type=int, default=10, help='Number of offenders to show')
+    args = parser.parse_args()
+    print_report(args.log, args.top)
@@ -0,0 +1,300 @@
+"""
+Bulk student roster import for the admin panel.
+
+Teachers upload a whole section at once as CSV (header row), JSON (an array
+of objects) or JSON Lines, with the columns
+
+  email, username, fullname, lrn, strand    required
+  password                                  optional - generated when missing
+
+start() saves the upload and imports it on a background thread, so the
+admin page polls status() for progress instead of holding a request open:
+
+  - rows are parsed one at a time, never the whole file in memory
+  - every row is validated; bad rows, emails repeated in the file and
+    emails that are already registered are reported with their row number
+    and skipped, the rest are imported
+  - valid rows are imported in chunks of ROSTER_CHUNK_SIZE: one lookup of
+    the chunk's emails, one hash_many() over the password hashing pool and
+    one multi-row INSERT (or users.txt update)
+
+Initial passwords are hashed with PASSWORD_HASH_METHOD, the same work factor
+as logins: many students never log in, so a cheaper hash waiting to be
+upgraded on first login would stay weak for good. hash_many() hands the
+pool BULK_JOB_SIZE passwords per process at a time, so logins during an
+import wait for one round, not the whole roster. Generated passwords go to
+a credentials CSV the admin downloads once the import is done.
+
+Job files (ROSTER_IMPORT_DIR, removed after ROSTER_IMPORT_TTL):
+  <job>.upload            the uploaded roster, removed when the import ends
+  <job>.json              status: counts, per-row errors, done/failed
+  <job>-credentials.csv   email,password for every generated password
+
+Settings (environment):
+  ROSTER_IMPORT_DIR    directory of the job files (default imports)
+  ROSTER_CHUNK_SIZE    rows per INSERT / users.txt update (default 100)
+  ROSTER_IMPORT_TTL    seconds job files are kept (default 86400)
+"""
+import csv
+import json
+import os
+import re
+import secrets
+import string
+import threading
+import time
+import uuid
+
+import app_logging
+import metrics
+import password_hashing
+
+ROSTER_IMPORT_DIR = os.getenv('ROSTER_IMPORT_DIR', 'imports')
+ROSTER_CHUNK_SIZE = int(os.getenv('ROSTER_CHUNK_SIZE', '100'))
+ROSTER_IMPORT_TTL = int(os.getenv('ROSTER_IMPORT_TTL', str(24 * 60 * 60)))
+
+REQUIRED_FIELDS = ('email', 'username', 'fullname', 'lrn', 'strand')
+# Longest value per column (the users table's column sizes)
+MAX_LENGTHS = {'email': 255, 'username': 100, 'fullname': 255, 'lrn': 50, 'strand': 50, 'password': 200}
+STRANDS = ('STEM', 'HUMSS', 'ICT', 'TVL', 'ABM')
+MIN_PASSWORD_LENGTH = 6
+GENERATED_PASSWORD_LENGTH = 12
+# Errors listed in the status file; the count keeps going past it
+MAX_REPORTED_ERRORS = 500
+# Bytes read at a time from JSON uploads
+READ_SIZE = 64 * 1024
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+log = app_logging.get_logger('roster_import')
+
+# Set by init_app: existing_emails(emails) -> set of those already registered,
+# insert_users(users) -> number inserted
+_existing_emails = None
+_insert_users = None
+
+def _path(job_id, suffix):
+    if not _JOB_ID_RE.match(job_id or ''):
+        raise ValueError(f'Invalid job id {job_id!r}')
+    return os.path.join(ROSTER_IMPORT_DIR, job_id + suffix)
+
+def credentials_path(job_id):
+    return _path(job_id, '-credentials.csv')
+
+def _iter_json_array(f):
+    """Objects of a top-level JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('expected a JSON array')
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+            pos += 1
+        if buffer.startswith(']', pos):
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            # Most likely the item continues past what was read so far
+            if eof:
+                raise ValueError('truncated or invalid JSON array')
+            more = f.read(READ_SIZE)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield item
+
+def iter_rows(path, filename):
+    """(row number, raw row) for every row of a CSV, JSON array or JSON Lines roster"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if filename.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames or []]
+            # Row 1 is the header
+            for number, row in enumerate(reader, start=2):
+                yield number, row
+            return
+        is_array = f.read(READ_SIZE).lstrip().startswith('[')
+        f.seek(0)
+        if is_array:
+            for number, item in enumerate(_iter_json_array(f), start=1):
+                yield number, item
+        else:
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError:
+                        yield number, None
+
+def clean_row(row):
+    """A user dict from one roster row; raises ValueError with what is wrong with it"""
+    if not isinstance(row, dict):
+        raise ValueError('not a JSON object')
+    user = {}
+    for field in REQUIRED_FIELDS + ('password',):
+        value = row.get(field)
+        value = '' if value is None else str(value).strip()
+        if not value and field in REQUIRED_FIELDS:
+            raise ValueError(f'missing {field}')
+        if len(value) > MAX_LENGTHS[field]:
+            raise ValueError(f'{field} is longer than {MAX_LENGTHS[field]} characters')
+        user[field] = value
+    user['email'] = user['email'].lower()
+    if not EMAIL_RE.match(user['email']):
+        raise ValueError('invalid email')
+    user['strand'] = user['strand'].upper()
+    if user['strand'] not in STRANDS:
+        raise ValueError(f"unknown strand {user['strand']!r} (expected one of {', '.join(STRANDS)})")
+    if user['password'] and len(user['password']) < MIN_PASSWORD_LENGTH:
+        raise ValueError(f'password is shorter than {MIN_PASSWORD_LENGTH} characters')
+    return user
+
+def generate_password():
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(alphabet) for _ in range(GENERATED_PASSWORD_LENGTH))
+
+def _write_status(job_id, status):
+    tmp_path = _path(job_id, '.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, _path(job_id, '.json'))
+
+def status(job_id):
+    """The job's status dict, or None for an unknown job"""
+    try:
+        with open(_path(job_id, '.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class _Job:
+    def __init__(self, job_id, filename):
+        self.job_id = job_id
+        self.status = {
+            'job_id': job_id, 'filename': filename, 'state': 'running', 'started_at': time.time(),
+            'elapsed': 0.0, 'rows': 0, 'imported': 0, 'error_count': 0, 'errors': [], 'generated_passwords': 0
+        }
+        self.seen = set()
+        self.chunk = []
+
+    def error(self, number, email, message):
+        self.status['error_count'] += 1
+        if len(self.status['errors']) < MAX_REPORTED_ERRORS:
+            self.status['errors'].append({'row': number, 'email': email, 'error': message})
+
+    def save(self):
+        self.status['elapsed'] = round(time.time() - self.status['started_at'], 2)
+        _write_status(self.job_id, self.status)
+
+    def add(self, number, row):
+        self.status['rows'] += 1
+        try:
+            user = clean_row(row)
+        except ValueError as e:
+            self.error(number, row.get('email') if isinstance(row, dict) else None, str(e))
+            return
+        if user['email'] in self.seen:
+            self.error(number, user['email'], 'email appears earlier in the file')
+            return
+        self.seen.add(user['email'])
+        self.chunk.append((number, user))
+        if len(self.chunk) >= ROSTER_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        chunk, self.chunk = self.chunk, []
+        if not chunk:
+            return
+        existing = _existing_emails([user['email'] for number, user in chunk])
+        users = []
+        for number, user in chunk:
+            if user['email'] in existing:
+                self.error(number, user['email'], 'email already registered')
+            else:
+                users.append(user)
+        generated = []
+        for user in users:
+            if not user['password']:
+                user['password'] = generate_password()
+                generated.append(user)
+        hashes = password_hashing.hash_many([user['password'] for user in users])
+        if generated:
+            # Written before the insert, so no account is created without its password on record
+            path = credentials_path(self.job_id)
+            new_file = not os.path.exists(path)
+            with os.fdopen(os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'a', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(('email', 'password'))
+                writer.writerows((user['email'], user['password']) for user in generated)
+        for user, hashed_password in zip(users, hashes):
+            user['password'] = hashed_password
+        inserted = _insert_users(users)
+        self.status['imported'] += inserted
+        self.status['generated_passwords'] += len(generated)
+        metrics.registry.inc_counter('quiz_roster_imported_total', 'Students created by roster imports', value=inserted)
+        self.save()
+
+def run(job_id, filename):
+    """Import an uploaded roster; progress and the outcome go to the job's status file"""
+    job = _Job(job_id, filename)
+    job.save()
+    upload = _path(job_id, '.upload')
+    try:
+        for number, row in iter_rows(upload, filename):
+            job.add(number, row)
+            if job.status['rows'] % ROSTER_CHUNK_SIZE == 0:
+                job.save()
+        job.flush()
+        job.status['state'] = 'done'
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        job.status['state'] = 'failed'
+        job.status['failure'] = f"Couldn't read the roster after row {job.status['rows']}: {e}"
+    except Exception as e:
+        log.error("Roster import %s failed: %s", job_id, e)
+        job.status['state'] = 'failed'
+        job.status['failure'] = f"Import stopped after row {job.status['rows']}: {e}"
+    finally:
+        job.save()
+        try:
+            os.remove(upload)
+        except OSError:
+            pass
+    log.info("Roster import %s %s: %s of %s rows imported in %.1fs", job_id, job.status['state'],
+             job.status['imported'], job.status['rows'], job.status['elapsed'])
+    return job.status
+
+def prune(max_age=ROSTER_IMPORT_TTL):
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(ROSTER_IMPORT_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(ROSTER_IMPORT_DIR, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def start(upload, filename):
+    """Save an uploaded roster (a werkzeug FileStorage) and import it in the background; returns the job id"""
+    prune()
+    os.makedirs(ROSTER_IMPORT_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    upload.save(_path(job_id, '.upload'))
+    _write_status(job_id, {'job_id': job_id, 'filename': filename, 'state': 'queued', 'rows': 0, 'imported': 0,
+                           'error_count': 0, 'errors': []})
+    threading.Thread(target=run, args=(job_id, filename), name=f'roster-import-{job_id[:8]}', daemon=True).start()
+    return job_id
+
+def init_app(app, existing_emails, insert_users):
+    global _existing_emails, _insert_users
+    _existing_emails = existing_emails
+    _insert_users = insert_users
@@ -0,0 +1,242 @@
+"""
+Server-side session storage.
+
+Flask's default session keeps the whole session in a signed cookie, which
+the browser then uploads with every request - including every proctoring
+frame. With this interface the cookie only carries a signed, random session
+id and the data lives in SQLite (default) or MySQL, with a TTL.
+
+The id outlives a login unless it is replaced: call regenerate() wherever
+a session becomes authenticated, so an id planted before the login (session
+fixation) doesn't end up logged in.
+
+Settings (environment):
+  SESSION_BACKEND       sqlite (default), mysql, or cookie for Flask's default
+  SESSION_SQLITE_PATH   SQLite file for the sqlite backend (default sessions.db)
+  SESSION_TTL           seconds a session lives without being used (default 86400)
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+import app_logging
+
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+SESSION_SQLITE_PATH = os.getenv('SESSION_SQLITE_PATH', 'sessions.db')
+SESSION_TTL = int(os.getenv('SESSION_TTL', str(24 * 60 * 60)))
+
+# Expired sessions are purged at most this often (seconds) per worker
+EVICT_INTERVAL = 300
+
+log = app_logging.get_logger('session_store')
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None, new=False):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+
+def regenerate(session):
+    """Move the session to a new id and delete the old id's record (call on login)"""
+    if not isinstance(session, ServerSideSession):
+        return  # Cookie sessions carry no id to fix
+    if not session.new:
+        try:
+            current_app.session_interface.store.delete(session.sid)
+        except Exception as e:
+            log.error("Error deleting replaced session: %s", e)
+    session.sid = secrets.token_urlsafe(32)
+    session.new = True
+    session.modified = True
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file, one connection per thread"""
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute(
+            "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save(self, sid, data, expires_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (sid, data, expires_at)
+            )
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    def evict_expired(self):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+class MySQLSessionStore:
+    """
+    Sessions in the MySQL `sessions` table (see create_tables). Falls back to
+    a local SQLite store while the database is unreachable.
+    """
+    def __init__(self, get_connection, fallback):
+        self.get_connection = get_connection
+        self.fallback = fallback
+
+    def _run(self, operation, fallback_operation):
+        conn = self.get_connection()
+        if not conn:
+            return fallback_operation()
+        try:
+            with conn.cursor() as cursor:
+                result = operation(cursor)
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def load(self, sid):
+        def operation(cursor):
+            cursor.execute(
+                "SELECT data, expires_at FROM sessions WHERE id = %s AND expires_at > %s", (sid, time.time())
+            )
+            row = cursor.fetchone()
+            return (row['data'], row['expires_at']) if row else None
+        return self._run(operation, lambda: self.fallback.load(sid))
+
+    def save(self, sid, data, expires_at):
+        def operation(cursor):
+            cursor.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE data = VALUES(data), expires_at = VALUES(expires_at)",
+                (sid, data, expires_at)
+            )
+        return self._run(operation, lambda: self.fallback.save(sid, data, expires_at))
+
+    def delete(self, sid):
+        def operation(cursor):
+            cursor.execute("DELETE FROM sessions WHERE id = %s", (sid,))
+        return self._run(operation, lambda: self.fallback.delete(sid))
+
+    def evict_expired(self):
+        def operation(cursor):
+            return cursor.execute("DELETE FROM sessions WHERE expires_at <= %s", (time.time(),))
+        return self._run(operation, self.fallback.evict_expired)
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+    salt = 'quiz-server-session'
+
+    def __init__(self, store, ttl=SESSION_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.last_eviction = 0.0
+        self.eviction_lock = threading.Lock()
+
+    def _signer(self, app):
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        signer = self._signer(app)
+        if signer is None:
+            return None
+        signed_sid = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        if signed_sid:
+            try:
+                sid = signer.unsign(signed_sid).decode('ascii')
+                stored = self.store.load(sid)
+                if stored:
+                    data, expires_at = stored
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+            except BadSignature:
+                pass
+            except Exception as e:
+                log.error("Error loading session: %s", e)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        self._maybe_evict()
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        cookie_name = app.config['SESSION_COOKIE_NAME']
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        # Only write when the data changed or the TTL is half used up, so that
+        # read-only requests (proctoring frames, polling) cost no session write
+        now = time.time()
+        refresh = session.expires_at is None or session.expires_at - now < self.ttl / 2
+        if not (session.modified or refresh):
+            return
+
+        session.expires_at = now + self.ttl
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), session.expires_at)
+        if session.new or session.modified or self.get_expiration_time(app, session):
+            response.set_cookie(
+                cookie_name,
+                self._signer(app).sign(session.sid.encode('ascii')).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+    def _maybe_evict(self):
+        now = time.time()
+        if now - self.last_eviction < EVICT_INTERVAL or not self.eviction_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_eviction = now
+            evicted = self.store.evict_expired()
+            if evicted:
+                log.info("Evicted %s expired sessions", evicted)
+        except Exception as e:
+            log.error("Error evicting expired sessions: %s", e)
+        finally:
+            self.eviction_lock.release()
+
+def init_app(app, get_db_connection):
+    """Install the configured session backend (SESSION_BACKEND) on the app"""
+    if SESSION_BACKEND == 'cookie':
+        return
+    store = SQLiteSessionStore(SESSION_SQLITE_PATH)
+    if SESSION_BACKEND == 'mysql':
+        store = MySQLSessionStore(get_db_connection, fallback=store)
+    app.session_interface = ServerSideSessionInterface(store)
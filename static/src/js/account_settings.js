@@ -0,0 +1,136 @@
+// Tab switching functionality
+document.querySelectorAll('.settings-nav-item').forEach(item => {
+    item.addEventListener('click', function() {
+        // Remove active class from all nav items and sections
+        document.querySelectorAll('.settings-nav-item').forEach(i => i.classList.remove('active'));
+        document.querySelectorAll('.settings-section').forEach(s => s.classList.remove('active'));
+
+        // Add active class to clicked item
+        this.classList.add('active');
+
+        // Show corresponding section
+        const targetId = this.getAttribute('data-target');
+        document.getElementById(targetId).classList.add('active');
+    });
+});
+
+// Notification functions
+function showNotification(message = "Account updated successfully.") {
+    const notification = document.getElementById('notification');
+    const messageElement = notification.querySelector('.notification-message');
+
+    // Set the message
+    messageElement.textContent = message;
+
+    // Show the notification with animation
+    notification.classList.add('show');
+
+    // Auto-dismiss after 5 seconds
+    setTimeout(hideNotification, 5000);
+}
+
+function hideNotification() {
+    const notification = document.getElementById('notification');
+    notification.classList.remove('show');
+}
+
+// Account form submission with in-page notification
+document.getElementById('account-form').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    // Create form data object
+    const formData = new FormData(this);
+
+    // Submit form using fetch API
+    fetch(this.action, {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Show success notification
+            showNotification(data.message);
+
+            // Update any displayed username on the page
+            const usernameElements = document.querySelectorAll('.profile-value:first-child, .profile-info h3');
+            const newUsername = document.getElementById('username').value;
+            usernameElements.forEach(el => {
+                el.textContent = newUsername;
+            });
+
+            // Update navbar username
+            const navbarUsername = document.querySelector('.user-info span:first-of-type');
+            if (navbarUsername) {
+                navbarUsername.textContent = newUsername;
+            }
+        } else {
+            // Show error notification
+            showNotification(data.message || 'An error occurred. Please try again.');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // If there's an error with fetch, submit the form normally
+        this.submit();
+    });
+});
+
+// Password validation
+document.querySelector('#password form').addEventListener('submit', function(e) {
+    const newPassword = document.getElementById('new-password').value;
+    const confirmPassword = document.getElementById('confirm-password').value;
+
+    if (newPassword !== confirmPassword) {
+        e.preventDefault();
+        alert('Passwords do not match. Please try again.');
+    }
+
+    if (newPassword.length < 6) {
+        e.preventDefault();
+        alert('Password must be at least 6 characters long.');
+    }
+});
+
+// Account deletion confirmation
+function confirmAccountDeletion(button) {
+    const confirmed = confirm('Are you sure you want to delete your account? This action cannot be undone.');
+
+    if (confirmed) {
+        window.location.href = button.dataset.href;
+    }
+}
+
+// Auto-dismiss flash messages after 5 seconds with slide-out animation
+document.addEventListener('DOMContentLoaded', function() {
+    const flashMessages = document.querySelectorAll('.flash-message');
+    if (flashMessages.length > 0) {
+        // Add transition properties
+        flashMessages.forEach(message => {
+            message.style.transition = 'opacity 0.5s ease, transform 0.5s ease';
+            message.style.transform = 'translateX(0)';
+        });
+
+        // Set timeout to remove messages
+        setTimeout(function() {
+            flashMessages.forEach(message => {
+                message.style.opacity = '0';
+                message.style.transform = 'translateX(100%)';
+                setTimeout(() => {
+                    message.remove();
+                }, 500);
+            });
+        }, 5000);
+    }
+
+    // Check if we were redirected back from a successful update
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.has('update') && urlParams.get('update') === 'success') {
+        // Clean up the URL without refreshing the page
+        const newUrl = window.location.pathname;
+        window.history.replaceState({}, document.title, newUrl);
+    }
+});
@@ -0,0 +1,882 @@
+// Strand and Category Selection
+const strandSelect = document.getElementById('strand');
+const categorySelect = document.getElementById('quiz_category');
+
+strandSelect.addEventListener('change', async function() {
+    categorySelect.innerHTML = '<option value="">Select a category</option>';
+
+    if (this.value) {
+        const response = await fetch(`/get_categories/${this.value}`);
+        const data = await response.json();
+
+        data.categories.forEach(category => {
+            const option = document.createElement('option');
+            option.value = category;
+            option.textContent = category;
+            categorySelect.appendChild(option);
+        });
+    }
+});
+
+// Popup Functions
+function showPopup(popupId) {
+    document.getElementById(popupId).classList.add('show');
+}
+
+function closePopup(popupId) {
+    document.getElementById(popupId).classList.remove('show');
+}
+
+// Add Question Dynamically
+document.getElementById('addQuestionBtn').addEventListener('click', function() {
+    addNewQuestion();
+});
+
+function addNewQuestion() {
+    const container = document.getElementById('questionsContainer');
+    const questionIndex = container.children.length;
+    const newQuestionBlock = document.createElement('div');
+    newQuestionBlock.className = 'question-block';
+    newQuestionBlock.dataset.questionIndex = questionIndex;
+
+    newQuestionBlock.innerHTML = `
+        <span class="remove-question-btn" onclick="removeQuestion(this)">
+            <i class="fas fa-trash"></i>
+        </span>
+        <label>Question ${questionIndex + 1}:</label>
+        <textarea name="questions[]" required class="question-input" rows="3"></textarea>
+        <input type="hidden" name="question_index[]" value="${questionIndex}">
+
+        <div class="question-type-selector">
+            <label>Question Type:</label>
+            <select id="question_type_${questionIndex}" name="question_types[]" onchange="showQuestionFields(${questionIndex})">
+                <option value="multiple_choice">Multiple Choice</option>
+                <option value="true_false">True/False</option>
+                <option value="short_answer">Short Answer</option>
+                <option value="fill_blank">Fill in the Blank</option>
+                <option value="matching">Matching</option>
+            </select>
+        </div>
+
+        <div class="time-limit-container">
+            <label>Time Limit for this Question (seconds):</label>
+            <input type="number" name="time_limit_${questionIndex}" value="30" min="10" max="300" required>
+        </div>
+
+        <div class="question-fields" id="fields_container_${questionIndex}">
+            <!-- Question type specific fields will be inserted here -->
+        </div>
+    `;
+
+    container.appendChild(newQuestionBlock);
+
+    // Initialize with multiple choice fields
+    showQuestionFields(questionIndex);
+}
+
+function showQuestionFields(questionIndex) {
+    const questionType = document.getElementById(`question_type_${questionIndex}`) || 
+                         document.getElementById(`edit_question_type_${questionIndex}`);
+
+    if (!questionType) {
+        console.error(`Question type element not found for index ${questionIndex}`);
+        return;
+    }
+
+    const fieldsContainer = document.getElementById(`fields_container_${questionIndex}`);
+    if (!fieldsContainer) {
+        console.error(`Fields container not found for index ${questionIndex}`);
+        return;
+    }
+
+    // Clear previous fields
+    fieldsContainer.innerHTML = '';
+
+    let fieldsHTML = '';
+
+    // Set fields based on question type
+    switch (questionType.value) {
+        case 'multiple_choice':
+            fieldsHTML = `
+                <div class="options-container">
+                    <div class="time-limit-container">
+                        <label>Time Limit (seconds):</label>
+                        <input type="number" name="time_limit_${questionIndex}" value="30" min="10" max="300">
+                    </div>
+                    <div class="options">
+                        <label>Options:</label>
+                        <div class="option-item">
+                            <input type="text" name="options_${questionIndex}[]" placeholder="Option 1" required>
+                            <input type="radio" name="correct_answer_${questionIndex}" value="0" checked>
+                        </div>
+                        <div class="option-item">
+                            <input type="text" name="options_${questionIndex}[]" placeholder="Option 2" required>
+                            <input type="radio" name="correct_answer_${questionIndex}" value="1">
+                        </div>
+                        <div class="option-item">
+                            <input type="text" name="options_${questionIndex}[]" placeholder="Option 3" required>
+                            <input type="radio" name="correct_answer_${questionIndex}" value="2">
+                        </div>
+                        <div class="option-item">
+                            <input type="text" name="options_${questionIndex}[]" placeholder="Option 4" required>
+                            <input type="radio" name="correct_answer_${questionIndex}" value="3">
+                        </div>
+                    </div>
+                </div>
+            `;
+            break;
+
+        case 'true_false':
+            fieldsHTML = `
+                <div class="tf-container">
+                    <div class="time-limit-container">
+                        <label>Time Limit (seconds):</label>
+                        <input type="number" name="time_limit_${questionIndex}" value="20" min="5" max="120">
+                    </div>
+                    <div class="tf-options">
+                        <label>Correct Answer:</label>
+                        <div class="tf-option">
+                            <input type="radio" name="tf_correct_answer_${questionIndex}" value="true" checked>
+                            <label>True</label>
+                        </div>
+                        <div class="tf-option">
+                            <input type="radio" name="tf_correct_answer_${questionIndex}" value="false">
+                            <label>False</label>
+                        </div>
+                    </div>
+                </div>
+            `;
+            break;
+
+        case 'short_answer':
+            fieldsHTML = `
+                <div class="short-answer-container">
+                    <div class="time-limit-container">
+                        <label>Time Limit (seconds):</label>
+                        <input type="number" name="time_limit_${questionIndex}" value="60" min="20" max="300">
+                    </div>
+                    <div class="short-answer">
+                        <label>Correct Answer:</label>
+                        <input type="text" name="short_answer_${questionIndex}" placeholder="Enter the correct answer" required>
+                    </div>
+                </div>
+            `;
+            break;
+
+        case 'fill_blank':
+            fieldsHTML = `
+                <div class="fill-blank-container">
+                    <div class="time-limit-container">
+                        <label>Time Limit (seconds):</label>
+                        <input type="number" name="time_limit_${questionIndex}" value="45" min="15" max="180">
+                    </div>
+                    <div class="blank-answers">
+                        <label>Answers for Blanks:</label>
+                        <div class="blank-item" id="blank_items_${questionIndex}">
+                            <input type="text" name="fill_blank_answers_${questionIndex}[]" placeholder="Answer for blank 1" required>
+                            <button type="button" class="add-blank-btn" onclick="addBlankItem(${questionIndex})">Add Another Blank</button>
+                        </div>
+                    </div>
+                </div>
+            `;
+            break;
+
+        case 'matching':
+            fieldsHTML = `
+                <div class="matching-container">
+                    <div class="time-limit-container">
+                        <label>Time Limit (seconds):</label>
+                        <input type="number" name="time_limit_${questionIndex}" value="90" min="30" max="300">
+                    </div>
+                    <div class="matching-items" id="matching_items_${questionIndex}">
+                        <div class="matching-row">
+                            <div class="matching-left">
+                                <label>Left Item 1:</label>
+                                <input type="text" name="matching_left_${questionIndex}[]" placeholder="Left item" required>
+                            </div>
+                            <div class="matching-right">
+                                <label>Right Item 1:</label>
+                                <input type="text" name="matching_right_${questionIndex}[]" placeholder="Right item" required>
+                                <input type="hidden" name="matching_pairs_${questionIndex}[]" value="0">
+                            </div>
+                        </div>
+                        <button type="button" class="add-matching-btn" onclick="addMatchingItem(${questionIndex})">Add Matching Pair</button>
+                    </div>
+                </div>
+            `;
+            break;
+    }
+
+    // Insert the HTML
+    fieldsContainer.innerHTML = fieldsHTML;
+}
+
+function addBlankField(questionIndex) {
+    const container = document.getElementById(`blanks_container_${questionIndex}`);
+    const blankCount = container.querySelectorAll('.blank-input').length + 1;
+
+    const newBlank = document.createElement('div');
+    newBlank.className = 'blank-input';
+    newBlank.innerHTML = `
+        <input type="text" name="fill_blank_answers_${questionIndex}[]" placeholder="Answer ${blankCount}" required>
+        <button type="button" class="remove-blank-btn" onclick="this.parentNode.remove()">
+            <i class="fas fa-minus"></i>
+        </button>
+    `;
+
+    container.appendChild(newBlank);
+}
+
+function addMatchingItem(side, questionIndex) {
+    const container = document.getElementById(`matching_${side}_${questionIndex}`);
+    const itemCount = container.querySelectorAll('.matching-item').length;
+
+    const newItem = document.createElement('div');
+    newItem.className = 'matching-item';
+
+    if (side === 'left') {
+        newItem.innerHTML = `
+            <input type="text" name="matching_left_${questionIndex}[]" placeholder="Item ${itemCount + 1}" required>
+            <button type="button" class="remove-matching-btn" onclick="removeMatchingItem(this, 'left', ${questionIndex})">
+                <i class="fas fa-minus"></i>
+            </button>
+        `;
+    } else {
+        // Create options for the select element
+        let options = '';
+        const leftItems = document.querySelectorAll(`#matching_left_${questionIndex} .matching-item`);
+        leftItems.forEach((item, idx) => {
+            options += `<option value="${idx}">Item ${idx + 1}</option>`;
+        });
+
+        newItem.innerHTML = `
+            <input type="text" name="matching_right_${questionIndex}[]" placeholder="Match ${itemCount + 1}" required>
+            <select name="matching_pairs_${questionIndex}[]">
+                ${options}
+            </select>
+            <button type="button" class="remove-matching-btn" onclick="removeMatchingItem(this, 'right', ${questionIndex})">
+                <i class="fas fa-minus"></i>
+            </button>
+        `;
+    }
+
+    container.appendChild(newItem);
+
+    // If we added a left item, we need to update all right selects
+    if (side === 'left') {
+        updateMatchingSelects(questionIndex);
+    }
+}
+
+function removeMatchingItem(element, side, questionIndex) {
+    // Get the index of the item being removed
+    const container = document.getElementById(`matching_${side}_${questionIndex}`);
+    const items = container.querySelectorAll('.matching-item');
+    if (items.length <= 2) {
+        alert('You need at least 2 matching items');
+        return;
+    }
+
+    element.closest('.matching-item').remove();
+
+    // If we removed a left item, update all right selects
+    if (side === 'left') {
+        updateMatchingSelects(questionIndex);
+    }
+}
+
+function updateMatchingSelects(questionIndex) {
+    const leftItems = document.querySelectorAll(`#matching_left_${questionIndex} .matching-item`);
+    const rightSelects = document.querySelectorAll(`#matching_right_${questionIndex} select`);
+
+    rightSelects.forEach(select => {
+        const currentValue = select.value;
+        select.innerHTML = '';
+
+        leftItems.forEach((item, idx) => {
+            const option = document.createElement('option');
+            option.value = idx;
+            option.textContent = `Item ${idx + 1}`;
+            select.appendChild(option);
+        });
+
+        // Try to preserve the selected value if it still exists
+        if (currentValue < leftItems.length) {
+            select.value = currentValue;
+        }
+    });
+}
+
+// Updated fetchExistingQuestions function to handle new question types
+async function fetchExistingQuestions(quizId) {
+    try {
+        const response = await fetch(`/nimda/get_quiz_questions/${quizId}`);
+        const data = await response.json();
+
+        // Reset questions container
+        const container = document.getElementById('questionsContainer');
+        container.innerHTML = '';
+
+        // Set author and grade level if available
+        if (data.author) {
+            document.getElementById('edit_author_first_name').value = data.author.first_name || '';
+            document.getElementById('edit_author_last_name').value = data.author.last_name || '';
+        }
+
+        if (data.grade_level) {
+            document.getElementById('edit_grade_level').value = data.grade_level;
+        }
+
+        // Populate existing questions if any
+        if (data.questions && data.questions.length > 0) {
+            data.questions.forEach((question, index) => {
+                const newQuestionBlock = document.createElement('div');
+                newQuestionBlock.className = 'question-block';
+                newQuestionBlock.dataset.questionIndex = index;
+
+                // Create the basic structure
+                newQuestionBlock.innerHTML = `
+                    <span class="remove-question-btn" onclick="removeQuestion(this)">
+                        <i class="fas fa-trash"></i>
+                    </span>
+                    <label>Question ${index + 1}:</label>
+                    <textarea name="questions[]" required class="question-input" rows="3">${question.question}</textarea>
+                    <input type="hidden" name="question_index[]" value="${index}">
+
+                    <div class="question-type-selector">
+                        <label>Question Type:</label>
+                        <select id="edit_question_type_${index}" name="question_types[]" onchange="showQuestionFields(${index})">
+                            <option value="multiple_choice" ${question.question_type === 'multiple_choice' ? 'selected' : ''}>Multiple Choice</option>
+                            <option value="true_false" ${question.question_type === 'true_false' ? 'selected' : ''}>True/False</option>
+                            <option value="short_answer" ${question.question_type === 'short_answer' ? 'selected' : ''}>Short Answer</option>
+                            <option value="fill_blank" ${question.question_type === 'fill_blank' ? 'selected' : ''}>Fill in the Blank</option>
+                            <option value="matching" ${question.question_type === 'matching' ? 'selected' : ''}>Matching</option>
+                        </select>
+                    </div>
+
+                    <div class="time-limit-container">
+                        <label>Time Limit for this Question (seconds):</label>
+                        <input type="number" name="time_limit_${index}" value="${question.time_per_question || 30}" min="10" max="300" required>
+                    </div>
+
+                    <div class="question-fields" id="fields_container_${index}">
+                        <!-- Question type specific fields will be inserted here -->
+                    </div>
+                `;
+
+                container.appendChild(newQuestionBlock);
+
+                // Initialize fields based on question type
+                const selectElement = newQuestionBlock.querySelector('select[name="question_types[]"]');
+                showQuestionFields(index);
+
+                // Populate the type-specific fields with existing data
+                const fieldsContainer = document.getElementById(`fields_container_${index}`);
+
+                if (question.question_type === 'multiple_choice' && question.options) {
+                    const optionInputs = fieldsContainer.querySelectorAll(`input[name="options_${index}[]"]`);
+                    const radioInputs = fieldsContainer.querySelectorAll(`input[name="correct_answer_${index}"]`);
+
+                    question.options.forEach((option, optIdx) => {
+                        if (optionInputs[optIdx]) {
+                            optionInputs[optIdx].value = option;
+                        }
+                    });
+
+                    if (radioInputs[question.correct_answer]) {
+                        radioInputs[question.correct_answer].checked = true;
+                    }
+                }
+                else if (question.question_type === 'true_false') {
+                    const tfInputs = fieldsContainer.querySelectorAll(`input[name="tf_correct_answer_${index}"]`);
+                    tfInputs.forEach(input => {
+                        if (input.value === question.correct_answer) {
+                            input.checked = true;
+                        }
+                    });
+                }
+                else if (question.question_type === 'short_answer') {
+                    const answerInput = fieldsContainer.querySelector(`input[name="short_answer_${index}"]`);
+                    const aiDetectionInput = fieldsContainer.querySelector(`input[name="ai_detection_${index}"]`);
+
+                    if (answerInput) answerInput.value = question.correct_answer || '';
+                    if (aiDetectionInput) aiDetectionInput.checked = question.ai_detection || false;
+                }
+                else if (question.question_type === 'fill_blank' && question.blanks) {
+                    const blanksContainer = fieldsContainer.querySelector(`#blanks_container_${index}`);
+                    blanksContainer.innerHTML = '';
+
+                    question.blanks.forEach((blank, blankIdx) => {
+                        const blankDiv = document.createElement('div');
+                        blankDiv.className = 'blank-input';
+
+                        if (blankIdx === 0) {
+                            blankDiv.innerHTML = `
+                                <input type="text" name="fill_blank_answers_${index}[]" value="${blank}" placeholder="Answer 1" required>
+                                <button type="button" class="add-blank-btn" onclick="addBlankField(${index})">
+                                    <i class="fas fa-plus"></i>
+                                </button>
+                            `;
+        } else {
+                            blankDiv.innerHTML = `
+                                <input type="text" name="fill_blank_answers_${index}[]" value="${blank}" placeholder="Answer ${blankIdx + 1}" required>
+                                <button type="button" class="remove-blank-btn" onclick="this.parentNode.remove()">
+                                    <i class="fas fa-minus"></i>
+                                </button>
+                            `;
+                        }
+
+                        blanksContainer.appendChild(blankDiv);
+                    });
+                }
+                else if (question.question_type === 'matching' && question.left_items && question.right_items) {
+                    const leftContainer = fieldsContainer.querySelector(`#matching_left_${index}`);
+                    const rightContainer = fieldsContainer.querySelector(`#matching_right_${index}`);
+
+                    leftContainer.innerHTML = '';
+                    rightContainer.innerHTML = '';
+
+                    question.left_items.forEach((item, itemIdx) => {
+                        const itemDiv = document.createElement('div');
+                        itemDiv.className = 'matching-item';
+
+                        if (itemIdx < 2) {
+                            itemDiv.innerHTML = `
+                                <input type="text" name="matching_left_${index}[]" value="${item}" placeholder="Item ${itemIdx + 1}" required>
+                            `;
+                        } else {
+                            itemDiv.innerHTML = `
+                                <input type="text" name="matching_left_${index}[]" value="${item}" placeholder="Item ${itemIdx + 1}" required>
+                                <button type="button" class="remove-matching-btn" onclick="removeMatchingItem(this, 'left', ${index})">
+                                    <i class="fas fa-minus"></i>
+                                </button>
+                            `;
+                        }
+
+                        leftContainer.appendChild(itemDiv);
+                    });
+
+                    // Create right items with selects for matching
+                    question.right_items.forEach((item, itemIdx) => {
+                        const itemDiv = document.createElement('div');
+                        itemDiv.className = 'matching-item';
+
+                        let options = '';
+                        question.left_items.forEach((leftItem, leftIdx) => {
+                            const selected = question.correct_matches && question.correct_matches[itemIdx] === leftIdx ? 'selected' : '';
+                            options += `<option value="${leftIdx}" ${selected}>Item ${leftIdx + 1}</option>`;
+                        });
+
+                        if (itemIdx < 2) {
+                            itemDiv.innerHTML = `
+                                <input type="text" name="matching_right_${index}[]" value="${item}" placeholder="Match ${itemIdx + 1}" required>
+                                <select name="matching_pairs_${index}[]">
+                                    ${options}
+                                </select>
+                            `;
+                        } else {
+                            itemDiv.innerHTML = `
+                                <input type="text" name="matching_right_${index}[]" value="${item}" placeholder="Match ${itemIdx + 1}" required>
+                                <select name="matching_pairs_${index}[]">
+                                    ${options}
+                                </select>
+                                <button type="button" class="remove-matching-btn" onclick="removeMatchingItem(this, 'right', ${index})">
+                                    <i class="fas fa-minus"></i>
+                                </button>
+                            `;
+                        }
+
+                        rightContainer.appendChild(itemDiv);
+                    });
+                }
+            });
+        } else {
+            // If no questions, add a default question block
+            addNewQuestion();
+        }
+
+        // Show the popup
+        showPopup('quizQuestionPopup');
+    } catch (error) {
+        console.error('Error fetching quiz questions:', error);
+        alert('Failed to load quiz questions. Please try again.');
+    }
+}
+
+// Reset the old removeQuestion function to work with the new structure
+function removeQuestion(element) {
+    const container = document.getElementById('questionsContainer');
+    if (container.children.length > 1) {
+        element.closest('.question-block').remove();
+
+        // Update the question numbers and indices for remaining questions
+        Array.from(container.children).forEach((questionBlock, idx) => {
+            // Update the visible question number
+            const labelElement = questionBlock.querySelector('label');
+            labelElement.textContent = `Question ${idx + 1}:`;
+
+            // Update the question index hidden input
+            const indexInput = questionBlock.querySelector('input[name="question_index[]"]');
+            indexInput.value = idx;
+
+            // Update the data attribute
+            questionBlock.dataset.questionIndex = idx;
+
+            // Update input names that contain the index
+            const timeInput = questionBlock.querySelector(`input[name^="time_limit_"]`);
+            if (timeInput) timeInput.name = `time_limit_${idx}`;
+
+            // Update question fields container id
+            const fieldsContainer = questionBlock.querySelector('.question-fields');
+            if (fieldsContainer) fieldsContainer.id = `fields_container_${idx}`;
+
+            // Update the fields based on question type
+            const typeSelect = questionBlock.querySelector('select[name="question_types[]"]');
+            if (typeSelect) {
+                typeSelect.setAttribute('onchange', `showQuestionFields(${idx})`);
+                showQuestionFields(idx);
+            }
+        });
+    }
+}
+
+// Quiz Questions Form Submission
+document.getElementById('quizQuestionsForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    // Create a new FormData object
+    const formData = new FormData();
+
+    // Add quiz_id
+    const quizId = document.getElementById('quizQuestionQuizId').value;
+    formData.append('quiz_id', quizId);
+
+    // Get all question blocks
+    const questionBlocks = document.querySelectorAll('.question-block');
+
+    // Debug: Log total number of questions being processed
+    console.log(`Processing ${questionBlocks.length} question blocks`);
+
+    // Process each question block
+    questionBlocks.forEach((block, blockIndex) => {
+        // Get the question index from the hidden input
+        const questionIndex = block.querySelector('input[name="question_index[]"]').value;
+        formData.append('question_index[]', questionIndex);
+
+        // Get the question text and type
+        const questionText = block.querySelector('textarea[name="questions[]"]').value;
+        const questionType = block.querySelector('select[name="question_types[]"]').value;
+        formData.append('questions[]', questionText);
+        formData.append('question_types[]', questionType);
+
+        // Get time limit
+        const timeLimit = block.querySelector(`input[name="time_limit_${questionIndex}"]`).value;
+        formData.append(`time_limit_${questionIndex}`, timeLimit);
+
+        console.log(`Question ${blockIndex + 1}: Type=${questionType}, Text=${questionText.substring(0, 30)}...`);
+
+        // Process type-specific fields
+        if (questionType === 'multiple_choice') {
+            // Get all options
+            const optionInputs = block.querySelectorAll(`input[name="options_${questionIndex}[]"]`);
+            optionInputs.forEach((input) => {
+                formData.append(`options_${questionIndex}[]`, input.value);
+            });
+
+            // Get correct answer
+            const correctRadio = block.querySelector(`input[name="correct_answer_${questionIndex}"]:checked`);
+        if (correctRadio) {
+                formData.append(`correct_answer_${questionIndex}`, correctRadio.value);
+            }
+        } 
+        else if (questionType === 'true_false') {
+            // Get correct answer for true/false
+            const tfCorrectRadio = block.querySelector(`input[name="tf_correct_answer_${questionIndex}"]:checked`);
+            if (tfCorrectRadio) {
+                formData.append(`tf_correct_answer_${questionIndex}`, tfCorrectRadio.value);
+            }
+        }
+        else if (questionType === 'short_answer') {
+            // Get correct answer and AI detection setting
+            const shortAnswer = block.querySelector(`input[name="short_answer_${questionIndex}"]`);
+            const aiDetection = block.querySelector(`input[name="ai_detection_${questionIndex}"]`);
+
+            if (shortAnswer) {
+                formData.append(`short_answer_${questionIndex}`, shortAnswer.value);
+            }
+            if (aiDetection && aiDetection.checked) {
+                formData.append(`ai_detection_${questionIndex}`, 'on');
+            }
+        }
+        else if (questionType === 'fill_blank') {
+            // Get all blank answers
+            const blankAnswers = block.querySelectorAll(`input[name="fill_blank_answers_${questionIndex}[]"]`);
+            blankAnswers.forEach((input) => {
+                formData.append(`fill_blank_answers_${questionIndex}[]`, input.value);
+            });
+        }
+        else if (questionType === 'matching') {
+            // Get all matching pairs
+            const matchingPairs = block.querySelectorAll(`select[name="matching_pairs_${questionIndex}[]"]`);
+            matchingPairs.forEach((select) => {
+                const selectedValue = select.value;
+                formData.append(`matching_pairs_${questionIndex}[]`, selectedValue);
+            });
+        }
+    });
+
+    // Debug: Log FormData entries
+    console.log('FormData contents:');
+    for (let pair of formData.entries()) {
+        console.log(pair[0] + ': ' + pair[1]);
+    }
+
+    try {
+        console.log('Submitting quiz questions to server...');
+        const response = await fetch('/nimda/save_quiz_questions', {
+            method: 'POST',
+            body: formData
+        });
+
+        if (response.ok) {
+            const result = await response.json();
+            console.log('Server response:', result);
+
+            // Show success popup
+            showPopup('successPopup');
+
+            // Optionally reload the page after a delay
+            setTimeout(() => {
+                closePopup('quizQuestionPopup');
+                location.reload();
+            }, 2000);
+        } else {
+            throw new Error('Failed to save quiz questions');
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Failed to save quiz questions. Please try again.');
+    }
+});
+
+// Event listeners for edit buttons
+document.querySelectorAll('.edit-btn').forEach(button => {
+    button.addEventListener('click', function() {
+        const quizId = this.getAttribute('data-quiz-id');
+        const quizTitle = this.getAttribute('data-quiz-title');
+
+        // Set the quiz id in the hidden field
+        document.getElementById('quizQuestionQuizId').value = quizId;
+
+        // Set the popup title
+        document.getElementById('quizQuestionPopupTitle').textContent = `Edit Questions for ${quizTitle}`;
+
+        // Fetch and display existing questions
+        fetchExistingQuestions(quizId);
+    });
+});
+
+// Existing Delete Quiz Functionality
+let quizToDelete = null;
+document.querySelectorAll('.delete-btn').forEach(button => {
+    button.addEventListener('click', function() {
+        quizToDelete = this.getAttribute('data-quiz-id');
+        showPopup('deletePopup');
+    });
+});
+
+document.getElementById('confirmDelete').addEventListener('click', async function() {
+    if (!quizToDelete) return;
+
+    try {
+        const response = await fetch(`/nimda/delete_quiz/${quizToDelete}`, {
+            method: 'POST'
+        });
+
+        if (response.ok) {
+            document.querySelector(`[data-quiz-id="${quizToDelete}"]`).closest('li').remove();
+            closePopup('deletePopup');
+        } else {
+            throw new Error('Failed to delete quiz');
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Failed to delete quiz. Please try again.');
+    }
+
+    quizToDelete = null;
+});
+
+// Reset Quiz Functionality
+let quizToReset = null;
+let quizTitle = null;
+
+document.querySelectorAll('.reset-btn').forEach(button => {
+    button.addEventListener('click', function() {
+        quizToReset = this.getAttribute('data-quiz-id');
+        quizTitle = this.getAttribute('data-quiz-title');
+        showPopup('resetPopup');
+    });
+});
+
+document.getElementById('confirmReset').addEventListener('click', async function() {
+    if (!quizToReset) return;
+
+    try {
+        const response = await fetch(`/nimda/reset_quiz/${quizToReset}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                quiz_id: quizToReset,
+                quiz_title: quizTitle
+            })
+        });
+
+        if (response.ok) {
+            closePopup('resetPopup');
+            // Show success message
+            alert(`Quiz "${quizTitle}" has been reset. Students can now retake it.`);
+        } else {
+            throw new Error('Failed to reset quiz');
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Failed to reset quiz. Please try again.');
+    }
+
+    quizToReset = null;
+    quizTitle = null;
+});
+
+// Check if there are any flash messages and show them in the modal
+document.addEventListener('DOMContentLoaded', function() {
+    JSON.parse(document.getElementById('flash-messages').textContent).forEach(function(flash) {
+        showModal(flash[1]);
+    });
+
+    // Close modal when clicking the X
+    document.querySelector('.close').addEventListener('click', function() {
+        document.getElementById('successModal').style.display = 'none';
+    });
+
+    // Close modal when clicking outside of it
+    window.addEventListener('click', function(event) {
+        if (event.target == document.getElementById('successModal')) {
+            document.getElementById('successModal').style.display = 'none';
+        }
+    });
+});
+
+// Function to show the success modal
+function showModal(message) {
+    document.getElementById('successMessage').textContent = message;
+    document.getElementById('successModal').style.display = 'block';
+
+    // Auto hide after 3 seconds
+    setTimeout(function() {
+        document.getElementById('successModal').style.display = 'none';
+    }, 3000);
+}
+
+// Teacher modal functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const createTeacherBtn = document.getElementById('createTeacherBtn');
+    const createTeacherModal = document.getElementById('createTeacherModal');
+    const closeTeacherModal = document.getElementById('closeTeacherModal');
+
+    if (createTeacherBtn) {
+        createTeacherBtn.addEventListener('click', function() {
+            createTeacherModal.style.display = 'block';
+        });
+    }
+
+    if (closeTeacherModal) {
+        closeTeacherModal.addEventListener('click', function() {
+            createTeacherModal.style.display = 'none';
+        });
+    }
+
+    // Close modal when clicking outside of it
+    window.addEventListener('click', function(event) {
+        if (event.target == createTeacherModal) {
+            createTeacherModal.style.display = 'none';
+        }
+    });
+    // Roster import: upload, then poll the job until it is done
+    const rosterForm = document.getElementById('rosterForm');
+    if (rosterForm) {
+        const rosterSubmit = document.getElementById('rosterSubmit');
+        const rosterProgress = document.getElementById('rosterProgress');
+        const rosterBar = document.getElementById('rosterBar');
+        const rosterSummary = document.getElementById('rosterSummary');
+        const rosterErrors = document.getElementById('rosterErrors');
+        const rosterCredentials = document.getElementById('rosterCredentials');
+
+        function showRosterStatus(status) {
+            let summary = `${status.rows} rows read, ${status.imported} students imported, ${status.error_count} skipped`;
+            if (status.state === 'failed') {
+                summary += ` - ${status.failure}`;
+            } else if (status.state === 'done') {
+                summary = `Done in ${status.elapsed}s: ` + summary;
+            }
+            rosterSummary.textContent = summary;
+            rosterErrors.innerHTML = '';
+            (status.errors || []).forEach(function(error) {
+                const item = document.createElement('li');
+                item.textContent = `Row ${error.row}${error.email ? ' (' + error.email + ')' : ''}: ${error.error}`;
+                rosterErrors.appendChild(item);
+            });
+            if (status.error_count > (status.errors || []).length) {
+                const item = document.createElement('li');
+                item.textContent = `...and ${status.error_count - status.errors.length} more`;
+                rosterErrors.appendChild(item);
+            }
+            if (status.credentials_url) {
+                rosterCredentials.href = status.credentials_url;
+                rosterCredentials.hidden = false;
+            }
+        }
+
+        function pollRoster(statusUrl) {
+            fetch(statusUrl)
+                .then(response => response.json())
+                .then(function(status) {
+                    showRosterStatus(status);
+                    if (status.state === 'done' || status.state === 'failed') {
+                        rosterBar.max = 1;
+                        rosterBar.value = 1;
+                        rosterSubmit.disabled = false;
+                    } else {
+                        setTimeout(() => pollRoster(statusUrl), 1000);
+                    }
+                })
+                .catch(() => setTimeout(() => pollRoster(statusUrl), 3000));
+        }
+
+        rosterForm.addEventListener('submit', function(event) {
+            event.preventDefault();
+            rosterSubmit.disabled = true;
+            rosterProgress.hidden = false;
+            rosterBar.removeAttribute('value');
+            rosterCredentials.hidden = true;
+            rosterErrors.innerHTML = '';
+            rosterSummary.textContent = 'Uploading...';
+            fetch(rosterForm.action, { method: 'POST', body: new FormData(rosterForm) })
+                .then(response => response.json())
+                .then(function(data) {
+                    if (data.error) {
+                        rosterSummary.textContent = data.error;
+                        rosterSubmit.disabled = false;
+                        return;
+                    }
+                    pollRoster(data.status_url);
+                })
+                .catch(function() {
+                    rosterSummary.textContent = 'Upload failed, please try again.';
+                    rosterSubmit.disabled = false;
+                });
+        });
+    }
+});
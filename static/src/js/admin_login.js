@@ -0,0 +1,38 @@
+// Function to show the modal
+function showModal(message, isSuccess = true) {
+    const modal = document.getElementById('messageModal');
+    const modalTitle = modal.querySelector('.modal-title');
+    const modalIcon = modal.querySelector('.modal-icon');
+    const modalIconI = modalIcon.querySelector('i');
+
+    document.getElementById('modalMessage').textContent = message;
+
+    if (isSuccess) {
+        modalTitle.textContent = 'Success!';
+        modalIcon.className = 'modal-icon success';
+        modalIconI.className = 'fas fa-check-circle';
+    } else {
+        modalTitle.textContent = 'Error';
+        modalIcon.className = 'modal-icon error';
+        modalIconI.className = 'fas fa-exclamation-circle';
+    }
+
+    modal.style.display = 'block';
+}
+
+// Close modal when clicking the X
+document.querySelector('.close').addEventListener('click', function() {
+    document.getElementById('messageModal').style.display = 'none';
+});
+
+// Close modal when clicking outside of it
+window.addEventListener('click', function(event) {
+    if (event.target == document.getElementById('messageModal')) {
+        document.getElementById('messageModal').style.display = 'none';
+    }
+});
+
+// Check for flash messages
+JSON.parse(document.getElementById('flash-messages').textContent).forEach(function(flash) {
+    showModal(flash[1], flash[0] !== "error");
+});
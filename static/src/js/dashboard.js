@@ -0,0 +1,142 @@
+// Account dropdown functionality
+document.querySelector('.account-btn').addEventListener('click', function(e) {
+    e.preventDefault();
+    const dropdownMenu = document.querySelector('.dropdown-menu');
+    dropdownMenu.style.display = dropdownMenu.style.display === 'block' ? 'none' : 'block';
+});
+
+// Close dropdown when clicking outside
+document.addEventListener('click', function(e) {
+    const dropdown = document.querySelector('.account-dropdown');
+    const dropdownMenu = document.querySelector('.dropdown-menu');
+    const accountBtn = document.querySelector('.account-btn');
+
+    if (!dropdown.contains(e.target) && dropdownMenu.style.display === 'block') {
+        dropdownMenu.style.display = 'none';
+    }
+});
+
+// Filter quizzes based on the selected category
+document.querySelectorAll('.menu-item').forEach(item => {
+    item.addEventListener('click', function() {
+        // Remove active class from all menu items
+        document.querySelectorAll('.menu-item').forEach(i => {
+            i.classList.remove('active');
+        });
+
+        // Add active class to clicked item
+        this.classList.add('active');
+
+        // Hide all category sections
+        document.querySelectorAll('.quiz-category').forEach(section => {
+            section.style.display = 'none';
+        });
+
+        // Show the selected category section
+        const selectedCategory = this.getAttribute('data-category');
+        if (selectedCategory === 'all') {
+            document.getElementById('category-all').style.display = 'block';
+        } else {
+            const categoryID = `category-${selectedCategory.toLowerCase().replace(/ /g, '-')}`;
+            document.getElementById(categoryID).style.display = 'block';
+        }
+    });
+});
+
+// Notification functions
+function showNotification(message = "Account updated successfully.") {
+    const notification = document.getElementById('notification');
+    const messageElement = notification.querySelector('.notification-message');
+
+    // Set the message
+    messageElement.textContent = message;
+
+    // Show the notification with animation
+    notification.classList.add('show');
+
+    // Auto-dismiss after 5 seconds
+    setTimeout(hideNotification, 5000);
+}
+
+function hideNotification() {
+    const notification = document.getElementById('notification');
+    notification.classList.remove('show');
+}
+
+// Check URL parameters for success message
+document.addEventListener('DOMContentLoaded', function() {
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.has('account_updated') && urlParams.get('account_updated') === 'success') {
+        showNotification();
+
+        // Clean up the URL without refreshing the page
+        const newUrl = window.location.pathname;
+        window.history.replaceState({}, document.title, newUrl);
+    }
+});
+
+// Check if there are any flash messages and show them in the modal
+document.addEventListener('DOMContentLoaded', function() {
+    JSON.parse(document.getElementById('flash-messages').textContent).forEach(function(flash) {
+        showModal(flash[1]);
+    });
+
+    // Close modal when clicking the X
+    document.querySelector('.close').addEventListener('click', function() {
+        document.getElementById('successModal').style.display = 'none';
+    });
+
+    // Close modal when clicking outside of it
+    window.addEventListener('click', function(event) {
+        if (event.target == document.getElementById('successModal')) {
+            document.getElementById('successModal').style.display = 'none';
+        }
+    });
+});
+
+// Function to show the success modal
+function showModal(message) {
+    document.getElementById('successMessage').textContent = message;
+    document.getElementById('successModal').style.display = 'block';
+
+    // Auto hide after 3 seconds
+    setTimeout(function() {
+        document.getElementById('successModal').style.display = 'none';
+    }, 3000);
+}
+
+// Quiz confirmation modal functionality
+const quizConfirmModal = document.getElementById('quizConfirmModal');
+const confirmQuizBtn = document.getElementById('confirmQuizBtn');
+const cancelQuizBtn = document.getElementById('cancelQuizBtn');
+const closeBtn = quizConfirmModal.querySelector('.close');
+
+// Update all quiz buttons to use the confirmation modal
+document.querySelectorAll('.take-quiz-btn').forEach(btn => {
+    const originalHref = btn.getAttribute('data-href');
+    btn.setAttribute('data-href', originalHref);
+    btn.removeAttribute('href');
+
+    btn.addEventListener('click', function(e) {
+        e.preventDefault();
+        confirmQuizBtn.setAttribute('href', this.getAttribute('data-href'));
+        quizConfirmModal.style.display = 'block';
+    });
+});
+
+// Close modal when clicking the cancel button
+cancelQuizBtn.addEventListener('click', function() {
+    quizConfirmModal.style.display = 'none';
+});
+
+// Close modal when clicking the X
+closeBtn.addEventListener('click', function() {
+    quizConfirmModal.style.display = 'none';
+});
+
+// Close modal when clicking outside of it
+window.addEventListener('click', function(event) {
+    if (event.target == quizConfirmModal) {
+        quizConfirmModal.style.display = 'none';
+    }
+});
@@ -0,0 +1,157 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize form animations and interactions
+    initForms();
+
+    // Handle password visibility toggle
+    initPasswordToggles();
+
+    // Handle flash messages
+    initFlashMessages();
+
+    // Add input focus effects
+    initInputEffects();
+});
+
+function initForms() {
+    // Pre-fill email field if coming from signup
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.has('email')) {
+        const emailField = document.querySelector('input[name="email"]');
+        if (emailField) {
+            emailField.value = urlParams.get('email');
+        }
+    }
+
+    // Add button press effect
+    document.querySelectorAll('.btn-submit').forEach(button => {
+        button.addEventListener('mousedown', function() {
+            this.style.transform = 'scale(0.98)';
+        });
+
+        button.addEventListener('mouseup', function() {
+            this.style.transform = '';
+        });
+
+        button.addEventListener('mouseleave', function() {
+            this.style.transform = '';
+        });
+    });
+}
+
+function toggleForm(formType) {
+    const loginForm = document.getElementById('login-form');
+    const signupForm = document.getElementById('signup-form');
+    const authWrapper = document.querySelector('.auth-wrapper');
+
+    // Add transition effect to container
+    authWrapper.style.transform = 'scale(0.98)';
+    authWrapper.style.opacity = '0.8';
+
+    setTimeout(() => {
+        if (formType === 'signup') {
+            loginForm.classList.add('hidden');
+            signupForm.classList.remove('hidden');
+            document.title = 'Campus - Create Account';
+        } else {
+            signupForm.classList.add('hidden');
+            loginForm.classList.remove('hidden');
+            document.title = 'Campus - Login';
+        }
+
+        // Reset and focus first input in visible form
+        const visibleForm = formType === 'signup' ? signupForm : loginForm;
+        const firstInput = visibleForm.querySelector('input');
+        if (firstInput) firstInput.focus();
+
+        // Restore container
+        setTimeout(() => {
+            authWrapper.style.transform = '';
+            authWrapper.style.opacity = '';
+        }, 50);
+    }, 200);
+}
+
+function initPasswordToggles() {
+    document.querySelectorAll('.toggle-password').forEach(button => {
+        button.addEventListener('click', function() {
+            const input = this.previousElementSibling.previousElementSibling;
+            const type = input.type === 'password' ? 'text' : 'password';
+            input.type = type;
+
+            // Animate icon change
+            this.style.transform = 'scale(0.8)';
+            setTimeout(() => {
+                this.classList.toggle('fa-eye');
+                this.classList.toggle('fa-eye-slash');
+                this.style.transform = 'scale(1)';
+            }, 100);
+        });
+    });
+}
+
+function initFlashMessages() {
+    const alerts = document.querySelectorAll('.alert');
+    if (alerts.length > 0) {
+        // Add close button to alerts
+        alerts.forEach(alert => {
+            const closeBtn = document.createElement('span');
+            closeBtn.innerHTML = '&times;';
+            closeBtn.style.marginLeft = '10px';
+            closeBtn.style.cursor = 'pointer';
+            closeBtn.style.fontWeight = 'bold';
+            closeBtn.style.fontSize = '20px';
+            closeBtn.style.position = 'absolute';
+            closeBtn.style.right = '15px';
+            closeBtn.style.top = '50%';
+            closeBtn.style.transform = 'translateY(-50%)';
+
+            closeBtn.addEventListener('click', () => {
+                hideAlert(alert);
+            });
+
+            alert.style.position = 'relative';
+            alert.style.paddingRight = '40px';
+            alert.appendChild(closeBtn);
+        });
+
+        // Auto-hide flash messages after 5 seconds
+        setTimeout(() => {
+            alerts.forEach(alert => {
+                hideAlert(alert);
+            });
+        }, 5000);
+    }
+}
+
+function hideAlert(alert) {
+    alert.style.opacity = '0';
+    alert.style.transform = 'translateY(-20px) translateX(-50%)';
+    setTimeout(() => {
+        alert.style.display = 'none';
+    }, 300);
+}
+
+function initInputEffects() {
+    // Add focus effects to input fields
+    const inputFields = document.querySelectorAll('input, select');
+
+    inputFields.forEach(input => {
+        input.addEventListener('focus', function() {
+            const icon = this.nextElementSibling;
+            if (icon) {
+                icon.style.transform = 'translateY(-50%) scale(1.2)';
+                icon.style.color = 'var(--primary-color)';
+            }
+        });
+
+        input.addEventListener('blur', function() {
+            const icon = this.nextElementSibling;
+            if (icon) {
+                icon.style.transform = 'translateY(-50%)';
+                if (!this.value) {
+                    icon.style.color = '#999';
+                }
+            }
+        });
+    });
+}
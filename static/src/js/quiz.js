@@ -0,0 +1,563 @@
+// Quiz data rendered into the page (see quiz.html)
+const quizConfig = JSON.parse(document.getElementById('quiz-config').textContent);
+let currentQuestionIndex = 0;
+let totalQuestions = quizConfig.totalQuestions;
+let questionTimers = {};
+// Removing global timer variable
+let tabSwitchCount = 0;
+const MAX_TAB_SWITCHES = 3;
+let questionTimeStarted = {}; // Track if a question timer has already been started
+
+// Function to handle radio button selection
+function uncheckOthers(selectedRadio) {
+    // Get all radio buttons with the same name
+    const name = selectedRadio.name;
+    document.querySelectorAll(`input[name="${name}"]`).forEach(radio => {
+        // Uncheck all other radio buttons
+        if (radio !== selectedRadio) {
+            radio.checked = false;
+            const option = radio.closest('.quiz-option');
+            if (option) option.classList.remove('selected');
+        }
+    });
+
+    // Make sure the selected radio is checked
+    selectedRadio.checked = true;
+    const option = selectedRadio.closest('.quiz-option');
+    if (option) option.classList.add('selected');
+    queueAutosave(selectedRadio);
+}
+
+// Set up radio button behavior (for the whole page, or for one newly loaded question)
+function setupRadioGroups(root = document) {
+    // Get all radio buttons
+    const radioButtons = root.querySelectorAll('input[type="radio"]');
+
+    // Add click event listeners to each radio button
+    radioButtons.forEach(radio => {
+        radio.addEventListener('click', function() {
+            uncheckOthers(this);
+        });
+    });
+
+    // Make option divs trigger their radio buttons
+    root.querySelectorAll('.quiz-option').forEach(option => {
+        const radio = option.querySelector('input[type="radio"]');
+        if (!radio) return;
+
+        option.addEventListener('click', function(e) {
+            if (radio && !radio.disabled) {
+                radio.checked = true;
+                uncheckOthers(radio);
+                this.classList.add('selected');
+            }
+        });
+    });
+
+    // Fix for multiple selection issue - ensure HTML5 radio button behavior
+    root.querySelectorAll('.quiz-options').forEach(optionsGroup => {
+        const radios = optionsGroup.querySelectorAll('input[type="radio"]');
+        if (radios.length > 0) {
+            const groupName = radios[0].name;
+            radios.forEach(radio => {
+                // Ensure all radios in the same group have the same name
+                radio.name = groupName;
+            });
+        }
+    });
+}
+
+// Progressive delivery: only the first question comes with the page, the rest are fetched on demand
+const questionRequests = {};
+
+function loadQuestion(index) {
+    if (index < 0 || index >= totalQuestions || document.getElementById(`question-${index}`)) {
+        return Promise.resolve();
+    }
+    if (!questionRequests[index]) {
+        questionRequests[index] = fetch(`${quizConfig.questionUrl}?index=${index}`, { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(data => insertQuestion(index, data.html))
+            .catch(error => {
+                // Let the next navigation retry
+                delete questionRequests[index];
+                throw error;
+            });
+    }
+    return questionRequests[index];
+}
+
+function insertQuestion(index, html) {
+    if (document.getElementById(`question-${index}`)) return;
+    const template = document.createElement('template');
+    template.innerHTML = html.trim();
+    const container = template.content.firstElementChild;
+
+    // Keep the questions in order, ahead of the navigation buttons
+    const form = document.getElementById('quiz-form');
+    const nextContainer = Array.from(form.querySelectorAll('.quiz-question-container'))
+        .find(existing => parseInt(existing.id.split('-')[1]) > index);
+    form.insertBefore(container, nextContainer || form.querySelector('.quiz-navigation'));
+    setupRadioGroups(container);
+    restoreAnswers(container);
+}
+
+function prefetchQuestion(index) {
+    if (quizConfig.progressive) {
+        loadQuestion(index).catch(error => console.error('Error prefetching question:', error));
+    }
+}
+
+// Autosave: answers are sent in small batches as they change, so the final submit isn't the only copy
+const AUTOSAVE_DELAY = 1500;
+const AUTOSAVE_MAX_DELAY = 30000;
+const ANSWER_FIELD = /^(answer_\d+|match_\d+_\d+)$/;
+let autosaveSeq = quizConfig.autosaveSeq || 0;
+let autosaveDelay = AUTOSAVE_DELAY;
+let pendingAnswers = {};
+let autosaveTimer = null;
+let autosaveInFlight = false;
+
+function queueAutosave(input) {
+    if (!ANSWER_FIELD.test(input.name) || (input.type === 'radio' && !input.checked)) return;
+    pendingAnswers[input.name] = input.value;
+    clearTimeout(autosaveTimer);
+    autosaveTimer = setTimeout(flushAutosave, autosaveDelay);
+}
+
+function autosavePayload(answers) {
+    autosaveSeq++;
+    return JSON.stringify({ quiz_id: quizConfig.quizId, seq: autosaveSeq, answers: answers });
+}
+
+function flushAutosave() {
+    clearTimeout(autosaveTimer);
+    if (autosaveInFlight || Object.keys(pendingAnswers).length === 0) return;
+    const answers = pendingAnswers;
+    pendingAnswers = {};
+    autosaveInFlight = true;
+    fetch(quizConfig.autosaveUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json' },
+        body: autosavePayload(answers)
+    })
+        .then(response => {
+            if (response.status >= 500 || response.status === 429) throw new Error(`HTTP ${response.status}`);
+            // Rejected saves (e.g. the quiz was already submitted) aren't retried - the form still has the answers
+            autosaveDelay = AUTOSAVE_DELAY;
+        })
+        .catch(error => {
+            // Keep the answers for the next try, unless they changed again meanwhile
+            pendingAnswers = Object.assign(answers, pendingAnswers);
+            autosaveDelay = Math.min(autosaveDelay * 2, AUTOSAVE_MAX_DELAY);
+            console.error('Autosave failed:', error);
+        })
+        .finally(() => {
+            autosaveInFlight = false;
+            if (Object.keys(pendingAnswers).length > 0) {
+                autosaveTimer = setTimeout(flushAutosave, autosaveDelay);
+            }
+        });
+}
+
+function submitQuiz() {
+    // The form carries every answer - nothing left to autosave
+    clearTimeout(autosaveTimer);
+    pendingAnswers = {};
+    document.getElementById('quiz-form').submit();
+}
+
+// Put back the answers saved before a reload
+function restoreAnswers(root = document) {
+    Object.entries(quizConfig.savedAnswers || {}).forEach(([name, value]) => {
+        root.querySelectorAll(`[name="${name}"]`).forEach(input => {
+            if (input.type === 'radio') {
+                if (input.value === value) {
+                    input.checked = true;
+                    const option = input.closest('.quiz-option');
+                    if (option) option.classList.add('selected');
+                }
+            } else {
+                input.value = value;
+            }
+        });
+    });
+}
+
+// Last chance for unsaved answers when the page goes away without submitting
+window.addEventListener('pagehide', function() {
+    if (Object.keys(pendingAnswers).length > 0 && navigator.sendBeacon) {
+        const body = new Blob([autosavePayload(pendingAnswers)], { type: 'application/json' });
+        if (navigator.sendBeacon(quizConfig.autosaveUrl, body)) pendingAnswers = {};
+    }
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Fix radio button selection issues first
+    setupRadioGroups();
+    restoreAnswers();
+
+    // Typed answers and selects are saved as they change; radios through uncheckOthers
+    const quizForm = document.getElementById('quiz-form');
+    quizForm.addEventListener('input', event => queueAutosave(event.target));
+    quizForm.addEventListener('change', event => queueAutosave(event.target));
+
+    // Initialize the first question as visible
+    if (totalQuestions > 0) {
+        const firstQuestion = document.getElementById('question-0');
+        if (firstQuestion) {
+            firstQuestion.style.display = 'block';
+
+            // Start timer for first question only if not already started
+            if (!questionTimeStarted[0]) {
+                startQuestionTimer(0);
+                questionTimeStarted[0] = true;
+            }
+                } else {
+            const anyQuestion = document.querySelector('.quiz-question-container');
+            if (anyQuestion) {
+                anyQuestion.style.display = 'block';
+                const index = parseInt(anyQuestion.id.split('-')[1]);
+                if (!isNaN(index) && !questionTimeStarted[index]) {
+                    startQuestionTimer(index);
+                    questionTimeStarted[index] = true;
+                }
+            }
+        }
+        } else {
+        console.error("No questions found in the quiz!");
+        const quizContainer = document.querySelector('.quiz-container');
+        const noQuestionsMsg = document.createElement('div');
+        noQuestionsMsg.style.padding = '20px';
+        noQuestionsMsg.style.backgroundColor = '#f8d7da';
+        noQuestionsMsg.style.color = '#721c24';
+        noQuestionsMsg.style.borderRadius = '5px';
+        noQuestionsMsg.style.marginTop = '20px';
+        noQuestionsMsg.style.textAlign = 'center';
+        noQuestionsMsg.textContent = 'This quiz has no questions. Please go back and choose another quiz.';
+        quizContainer.appendChild(noQuestionsMsg);
+    }
+
+    // Have the second question ready before the student moves on
+    prefetchQuestion(1);
+
+    // Set up tab visibility detection
+    setupTabDetection();
+
+    // Add event handlers for navigation buttons
+    document.getElementById('prev-btn').addEventListener('click', function() {
+        if (currentQuestionIndex > 0) {
+            showQuestion(currentQuestionIndex - 1);
+        }
+    });
+
+    document.getElementById('next-btn').addEventListener('click', function() {
+        if (currentQuestionIndex < totalQuestions - 1) {
+            showQuestion(currentQuestionIndex + 1);
+            } else {
+            // On last question, show submit button
+            document.getElementById('next-btn').style.display = 'none';
+            document.getElementById('submit-btn').style.display = 'block';
+        }
+    });
+
+    // Submit button handler
+    document.getElementById('submit-btn').addEventListener('click', function() {
+        submitQuiz();
+    });
+});
+
+// Keep the tab detection function
+function setupTabDetection() {
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            handleTabSwitch();
+        }
+    });
+}
+
+function handleTabSwitch() {
+    tabSwitchCount++;
+
+    // Display warning
+    const warningElement = document.createElement('div');
+    warningElement.className = 'tab-switch-warning';
+    warningElement.textContent = `Warning: Tab switch detected! (${tabSwitchCount}/${MAX_TAB_SWITCHES})`;
+    warningElement.style.backgroundColor = '#ffcc00';
+    warningElement.style.color = '#000';
+    warningElement.style.padding = '10px';
+    warningElement.style.margin = '10px 0';
+    warningElement.style.borderRadius = '5px';
+    warningElement.style.fontWeight = 'bold';
+    warningElement.style.textAlign = 'center';
+
+    // Add to top of quiz container
+    const quizContainer = document.querySelector('.quiz-container');
+    quizContainer.insertBefore(warningElement, quizContainer.firstChild);
+
+    // Remove after 5 seconds
+    setTimeout(() => {
+        warningElement.remove();
+    }, 5000);
+
+    // If max switches reached, submit/fail the quiz
+    if (tabSwitchCount >= MAX_TAB_SWITCHES) {
+        alert("You have switched tabs too many times. The quiz will be submitted now.");
+        submitQuiz();
+    }
+}
+
+// Update show question function
+function showQuestion(index) {
+    try {
+        // Validate index
+        if (index < 0 || index >= totalQuestions) {
+            return;
+        }
+
+        // Not loaded yet (progressive delivery) - fetch it, then show it
+        if (!document.getElementById(`question-${index}`)) {
+            loadQuestion(index)
+                .then(() => {
+                    if (document.getElementById(`question-${index}`)) showQuestion(index);
+                })
+                .catch(error => console.error('Error loading question:', error));
+            return;
+        }
+
+        // Hide all questions first
+        const questionContainers = document.querySelectorAll('.quiz-question-container');
+        questionContainers.forEach(container => {
+            container.style.display = 'none';
+        });
+
+        // Show the selected question
+        const targetContainer = document.getElementById(`question-${index}`);
+        if (targetContainer) {
+            targetContainer.style.display = 'block';
+            currentQuestionIndex = index;
+            updateProgressBar();
+
+            // Start timer for this question ONLY if not already started
+            if (!questionTimeStarted[index]) {
+                startQuestionTimer(index);
+                questionTimeStarted[index] = true;
+            }
+
+            prefetchQuestion(index + 1);
+            flushAutosave();
+        } else {
+            // Fallback - if the target isn't found, show the first question
+            if (questionContainers.length > 0) {
+                questionContainers[0].style.display = 'block';
+            }
+        }
+    } catch (error) {
+        console.error('Error in showQuestion function:', error);
+    }
+}
+
+function updateProgressBar() {
+    // Update progress dots
+    const progressDots = document.querySelectorAll('.progress-dot');
+    progressDots.forEach((dot, i) => {
+        if (i === currentQuestionIndex) {
+            dot.classList.add('active');
+        } else {
+            dot.classList.remove('active');
+        }
+    });
+
+    // Update current question input field
+    const currentQuestionInput = document.getElementById('current_question');
+    if (currentQuestionInput) {
+        currentQuestionInput.value = currentQuestionIndex;
+    }
+
+    // Update navigation buttons
+    const prevBtn = document.getElementById('prev-btn');
+    const nextBtn = document.getElementById('next-btn');
+    const submitBtn = document.getElementById('submit-btn');
+
+    if (prevBtn) prevBtn.disabled = currentQuestionIndex === 0;
+
+    if (nextBtn && submitBtn) {
+        if (currentQuestionIndex === totalQuestions - 1) {
+            nextBtn.style.display = 'none';
+            submitBtn.style.display = 'block';
+        } else {
+            nextBtn.style.display = 'block';
+            submitBtn.style.display = 'none';
+        }
+    }
+}
+
+// Only use per-question timer - no global timer
+function startQuestionTimer(index) {
+    // Don't restart the timer if we're navigating back to this question
+    if (questionTimers[index]) return;
+
+    const progressFill = document.getElementById(`progress-fill-${index}`);
+    if (!progressFill) return;
+
+    // Get time limit from the question data
+    let timeLimit = Number(quizConfig.timeLimits[index]) || 30; // default 30
+
+    let timeLeft = timeLimit;
+
+    // Update progress bar immediately before starting the timer
+    progressFill.style.width = '100%';
+
+    // Display time remaining above the question
+    const currentQuestionContainer = document.getElementById(`question-${index}`);
+    if (currentQuestionContainer) {
+        // Create or get the countdown element
+        let countdownElement = currentQuestionContainer.querySelector('.countdown-display');
+        if (!countdownElement) {
+            countdownElement = document.createElement('div');
+            countdownElement.className = 'countdown-display';
+            countdownElement.style.textAlign = 'center';
+            countdownElement.style.fontWeight = 'bold';
+            countdownElement.style.color = '#4f46e5';
+            countdownElement.style.margin = '10px 0';
+            countdownElement.style.fontSize = '16px';
+            currentQuestionContainer.insertBefore(countdownElement, currentQuestionContainer.firstChild);
+        }
+
+        // Set initial display
+        countdownElement.textContent = `Time remaining: ${timeLeft} seconds`;
+    }
+
+    questionTimers[index] = setInterval(function() {
+        timeLeft--;
+
+        // Update countdown display
+        if (currentQuestionContainer) {
+            const countdownElement = currentQuestionContainer.querySelector('.countdown-display');
+            if (countdownElement) {
+                countdownElement.textContent = `Time remaining: ${timeLeft} seconds`;
+
+                // Change color as time gets low
+                if (timeLeft <= 5) {
+                    countdownElement.style.color = '#ef4444';
+                } else if (timeLeft <= 10) {
+                    countdownElement.style.color = '#f59e0b';
+                }
+            }
+        }
+
+        // Update progress bar
+        const percentLeft = (timeLeft / timeLimit) * 100;
+        progressFill.style.width = `${percentLeft}%`;
+
+        // Add warning classes as time gets low
+        if (timeLeft <= 5) {
+            progressFill.classList.add('danger');
+        } else if (timeLeft <= 10) {
+            progressFill.classList.add('warning');
+            progressFill.classList.remove('danger');
+        }
+
+        if (timeLeft <= 0) {
+            clearInterval(questionTimers[index]);
+
+            // Disable ALL navigation buttons
+            const prevBtn = document.getElementById('prev-btn');
+            const nextBtn = document.getElementById('next-btn');
+            if (prevBtn) prevBtn.disabled = true;
+            if (nextBtn) nextBtn.disabled = true;
+
+            // Disable radio buttons for the current question
+            if (currentQuestionContainer) {
+                const inputs = currentQuestionContainer.querySelectorAll('input, textarea, select');
+                inputs.forEach(input => {
+                    input.disabled = true;
+                });
+
+                // Show timeout message
+                if (countdownElement) {
+                    countdownElement.textContent = "Time's up! Moving to next question...";
+                    countdownElement.style.color = '#ef4444';
+                }
+            }
+
+            // If all questions are done, submit the quiz
+            const allDone = Object.keys(questionTimeStarted).length === totalQuestions && 
+                           Object.values(questionTimeStarted).every(started => started);
+
+            if (allDone) {
+                // Submit the quiz only when all questions have been seen and timed out
+                setTimeout(function() {
+                    alert("All questions completed. Submitting quiz...");
+                    submitQuiz();
+                }, 1000);
+            }
+            else if (index < totalQuestions - 1) {
+                // Move to next question after 2 seconds if not the last question
+                setTimeout(function() {
+                    showQuestion(index + 1);
+                    // Re-enable the next button for new question (but not prev button)
+                    if (nextBtn) nextBtn.disabled = false;
+                }, 2000);
+            }
+            else {
+                // If it's the last question, show submit button
+                const submitBtn = document.getElementById('submit-btn');
+                if (submitBtn) {
+                    submitBtn.disabled = false;
+                    submitBtn.style.display = 'block';
+                }
+            }
+            }
+        }, 1000);
+    }
+
+// Function to show the success modal
+function showModal(message, isSuccess = true) {
+    const modal = document.getElementById('successModal');
+    const modalTitle = modal.querySelector('.modal-title');
+    const modalIcon = modal.querySelector('.modal-icon i');
+
+    document.getElementById('successMessage').textContent = message;
+
+    if (isSuccess) {
+        modalTitle.textContent = 'Success!';
+        modalIcon.className = 'fas fa-check-circle';
+        modalIcon.style.color = '#4CAF50';
+    } else {
+        modalTitle.textContent = 'Notice';
+        modalIcon.className = 'fas fa-exclamation-circle';
+        modalIcon.style.color = '#f39c12';
+    }
+
+    modal.style.display = 'block';
+
+    // Auto hide after 3 seconds
+    setTimeout(function() {
+        modal.style.display = 'none';
+    }, 3000);
+}
+
+// Modal close functionality
+document.addEventListener('DOMContentLoaded', function() {
+    // Close modal when clicking the X
+    document.querySelector('.close').addEventListener('click', function() {
+        document.getElementById('successModal').style.display = 'none';
+    });
+
+    // Close modal when clicking outside of it
+    window.addEventListener('click', function(event) {
+        if (event.target == document.getElementById('successModal')) {
+            document.getElementById('successModal').style.display = 'none';
+        }
+    });
+
+    // Check for flash messages
+    JSON.parse(document.getElementById('flash-messages').textContent).forEach(function(flash) {
+        showModal(flash[1], flash[0] !== "error");
+    });
+});
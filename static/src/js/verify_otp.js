@@ -0,0 +1,43 @@
+const inputs = document.querySelectorAll('.otp-input');
+inputs.forEach((input, index) => {
+    input.addEventListener('keyup', (e) => {
+        if (e.key !== 'Backspace' && index < inputs.length - 1 && input.value) {
+            inputs[index + 1].focus();
+        }
+        if (e.key === 'Backspace' && index > 0 && !input.value) {
+            inputs[index - 1].focus();
+        }
+    });
+
+    input.addEventListener('paste', (e) => {
+        e.preventDefault();
+        const paste = e.clipboardData.getData('text');
+        inputs.forEach((input, i) => {
+            input.value = paste[i] || '';
+        });
+    });
+});
+
+let timeLeft = 600;
+const timerDisplay = document.getElementById('timer');
+const resendBtn = document.getElementById('resend-btn');
+
+function updateTimer() {
+    const minutes = Math.floor(timeLeft / 60);
+    const seconds = timeLeft % 60;
+    timerDisplay.textContent = `${minutes}:${seconds.toString().padStart(2, '0')}`;
+
+    if (timeLeft === 0) {
+        clearInterval(timerInterval);
+        resendBtn.disabled = false;
+    } else {
+        timeLeft--;
+    }
+}
+
+const timerInterval = setInterval(updateTimer, 1000);
+updateTimer();
+
+setTimeout(() => {
+    resendBtn.disabled = false;
+}, 60000);
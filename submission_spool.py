@@ -0,0 +1,312 @@
+"""
+Durable ingest spool for graded quiz submissions.
+
+When a timed exam ends, every student submits within the same few seconds.
+With SUBMISSION_SPOOL=1 submit_quiz still grades in the request, but then
+only appends the graded attempt to a local spool and returns. A background
+writer drains the spool in batches: one users.txt rewrite and one multi-row
+INSERT into quiz_attempts per batch instead of one of each per student.
+
+Spool layout (SPOOL_DIR):
+  seg-<pid>-<ns>.log     append-only JSON lines, one graded attempt each. A
+                         record is fsync'd before submit_quiz returns. Every
+                         worker process writes its own segments and rolls to
+                         a new one after SEGMENT_MAX_BYTES.
+  seg-<pid>-<ns>.offset  bytes of the segment already applied
+  .drain.lock            held (flock) by the one process draining at a time
+
+Exactly-once: a batch is applied first and its offset advanced after, so a
+crash in between replays the batch on restart. Applying is idempotent on
+the attempt id - the file store skips attempts it already has and
+quiz_attempts.attempt_uuid is a unique key - so a replayed batch changes
+nothing. Until an attempt is drained, find() serves it straight from the
+spool (results page, one-attempt check).
+
+Settings (environment):
+  SUBMISSION_SPOOL      1 to spool submissions, 0 (default) to record them in the request
+  SPOOL_DIR             spool directory (default spool)
+  SPOOL_BATCH_SIZE      attempts per users.txt rewrite / INSERT (default 200)
+  SPOOL_FLUSH_INTERVAL  seconds between drains (default 0.5)
+"""
+import atexit
+import contextlib
+import os
+import threading
+import time
+
+import app_logging
+import json_codec
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Unavailable on Windows - a single process drains there
+    fcntl = None
+
+SUBMISSION_SPOOL = os.getenv('SUBMISSION_SPOOL', '0') == '1'
+SPOOL_DIR = os.getenv('SPOOL_DIR', 'spool')
+SPOOL_BATCH_SIZE = int(os.getenv('SPOOL_BATCH_SIZE', '200'))
+SPOOL_FLUSH_INTERVAL = float(os.getenv('SPOOL_FLUSH_INTERVAL', '0.5'))
+
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+# Longest wait between retries while the stores keep failing
+MAX_RETRY_DELAY = 30.0
+
+log = app_logging.get_logger('submission_spool')
+
+# Writes graded attempts to the stores; set by init_app
+_apply = None
+
+_append_lock = threading.Lock()
+_sync_lock = threading.Lock()
+_segment = None  # This process's current segment
+_fd = None
+_written = 0  # Records written by this process
+_synced = 0  # Records known to be fsync'd
+_drain_lock = threading.Lock()
+_writer = None
+_writer_pid = None
+_stop = threading.Event()
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _open_segment():
+    global _segment, _fd
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    _segment = os.path.join(SPOOL_DIR, f'seg-{os.getpid()}-{time.time_ns()}.log')
+    _fd = os.open(_segment, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    # Make the new file's directory entry durable too
+    _fsync_dir(SPOOL_DIR)
+
+def _close_segment():
+    """Called with both locks held: sync and close the current segment so the next append starts a new one"""
+    global _segment, _fd, _synced
+    os.fsync(_fd)
+    os.close(_fd)
+    _synced = _written
+    _segment = _fd = None
+
+def append(record):
+    """
+    Durably spool one graded attempt (must carry 'attempt_id'); returns once
+    it is on disk. Concurrent appends share one fsync (group commit).
+    """
+    global _written, _synced
+    data = json_codec.dumpb(record) + b'\n'
+    started = time.perf_counter()
+    with _append_lock:
+        # A forked worker must not keep appending to its parent's segment
+        if _segment is None or not os.path.basename(_segment).startswith(f'seg-{os.getpid()}-'):
+            if _fd is not None:
+                os.close(_fd)
+            _open_segment()
+        os.write(_fd, data)
+        _written += 1
+        ticket = _written
+        if os.fstat(_fd).st_size >= SEGMENT_MAX_BYTES:
+            with _sync_lock:
+                _close_segment()
+    with _sync_lock:
+        # Whoever gets here first syncs every record written so far, the others find theirs already done
+        if _synced < ticket:
+            target = _written
+            os.fsync(_fd)
+            _synced = max(_synced, target)
+    metrics.record_file_write(len(data), time.perf_counter() - started)
+    metrics.registry.inc_counter('quiz_spool_appended_total', 'Graded submissions written to the spool')
+    _ensure_writer()
+
+def _segments():
+    try:
+        names = os.listdir(SPOOL_DIR)
+    except OSError:
+        return []
+    return sorted(os.path.join(SPOOL_DIR, name) for name in names if name.startswith('seg-') and name.endswith('.log'))
+
+def _offset_path(segment):
+    return segment[:-len('.log')] + '.offset'
+
+def _read_offset(segment):
+    try:
+        with open(_offset_path(segment)) as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def _write_offset(segment, offset):
+    tmp_path = _offset_path(segment) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(offset))
+    os.replace(tmp_path, _offset_path(segment))
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _is_sealed(segment, segments):
+    """True once nothing will be appended to the segment again"""
+    if segment == _segment:
+        return False
+    pid = int(os.path.basename(segment).split('-')[1])
+    if pid == os.getpid():
+        return True
+    newer = any(other > segment and os.path.basename(other).startswith(f'seg-{pid}-') for other in segments)
+    return newer or not _pid_alive(pid)
+
+def _pending_records(segment):
+    """(offset after each record, record) for the complete records not applied yet, and the unread tail size"""
+    offset = _read_offset(segment)
+    with open(segment, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    complete = data[:data.rfind(b'\n') + 1]
+    records = []
+    position = offset
+    for line in complete.splitlines(keepends=True):
+        position += len(line)
+        try:
+            records.append((position, json_codec.loads(line)))
+        except ValueError:
+            log.error("Skipping unreadable spool record at %s in %s", position - len(line), segment)
+    return records, len(data) - len(complete)
+
+def find(predicate):
+    """First spooled attempt not yet drained that matches predicate(record), or None"""
+    for segment in _segments():
+        try:
+            records, tail = _pending_records(segment)
+        except OSError:
+            continue  # Drained and removed meanwhile
+        for position, record in records:
+            if predicate(record):
+                return record
+    return None
+
+@contextlib.contextmanager
+def _drain_guard():
+    """Yields True for the one thread (per process) and process (flock) allowed to drain right now"""
+    if not _drain_lock.acquire(blocking=False):
+        yield False
+        return
+    fd = None
+    try:
+        if fcntl is not None:
+            try:
+                os.makedirs(SPOOL_DIR, exist_ok=True)
+                fd = os.open(os.path.join(SPOOL_DIR, '.drain.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+        yield True
+    finally:
+        if fd is not None:
+            os.close(fd)  # Releases the flock
+        _drain_lock.release()
+
+def drain():
+    """
+    Apply every complete spooled record in batches of SPOOL_BATCH_SIZE.
+    Returns the number applied (0 if another thread or process is draining).
+    Raises whatever the apply function raises; the failed batch stays spooled.
+    """
+    with _drain_guard() as allowed:
+        if not allowed:
+            return 0
+        applied = 0
+        backlog = 0
+        segments = _segments()
+        for segment in segments:
+            # Decided before reading, so a segment is never removed with records appended after the read
+            sealed = _is_sealed(segment, segments)
+            records, tail = _pending_records(segment)
+            for start in range(0, len(records), SPOOL_BATCH_SIZE):
+                batch = records[start:start + SPOOL_BATCH_SIZE]
+                started = time.perf_counter()
+                _apply([record for position, record in batch])
+                # Only after the batch is in the stores - a crash before this line replays it
+                _write_offset(segment, batch[-1][0])
+                applied += len(batch)
+                metrics.registry.inc_counter('quiz_spool_drained_total', 'Spooled submissions written to the stores',
+                                             value=len(batch))
+                metrics.registry.inc_counter('quiz_spool_batches_total', 'Spool batches written to the stores')
+                log.debug("Applied %s spooled submissions in %.1f ms", len(batch),
+                          (time.perf_counter() - started) * 1000)
+
+            if sealed:
+                if tail:
+                    # Torn final write of a crashed process - it was never acknowledged
+                    log.warning("Dropping %s bytes of incomplete record at the end of %s", tail, segment)
+                os.remove(segment)
+                try:
+                    os.remove(_offset_path(segment))
+                except OSError:
+                    pass
+            else:
+                backlog += tail
+        metrics.registry.set_gauge('quiz_spool_backlog_bytes', 'Bytes of incomplete records left in the spool',
+                                   backlog)
+        return applied
+
+def _run():
+    delay = SPOOL_FLUSH_INTERVAL
+    while not _stop.wait(delay):
+        try:
+            drain()
+            delay = SPOOL_FLUSH_INTERVAL
+        except Exception as e:
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+            log.error("Error draining the submission spool (retrying in %.1fs): %s", delay, e)
+
+def _ensure_writer():
+    """Start this process's writer thread (again after a fork)"""
+    global _writer, _writer_pid
+    if _apply is None or (_writer is not None and _writer_pid == os.getpid() and _writer.is_alive()):
+        return
+    with _append_lock:
+        if _writer is None or _writer_pid != os.getpid() or not _writer.is_alive():
+            _writer = threading.Thread(target=_run, name='submission-spool', daemon=True)
+            _writer_pid = os.getpid()
+            _writer.start()
+
+def flush():
+    """Drain everything now, e.g. at shutdown"""
+    try:
+        return drain()
+    except Exception as e:
+        log.error("Error draining the submission spool: %s", e)
+        return 0
+
+def _shutdown():
+    _stop.set()
+    flush()
+
+def init_app(app, apply):
+    """apply(records) writes a batch of graded attempts to the stores and must be idempotent"""
+    global _apply
+    if not SUBMISSION_SPOOL:
+        return
+    _apply = apply
+
+    # Started on the first request rather than at import, so it runs in each forked worker -
+    # it also replays whatever a crashed worker left in the spool
+    @app.before_request
+    def start_spool_writer():
+        _ensure_writer()
+
+    atexit.register(_shutdown)
@@ -0,0 +1,165 @@
+"""
+Persistent Jinja bytecode cache and template preloading.
+
+Without it every new worker (or serverless instance) parses and compiles
+each template on its first render, which shows up as slow first hits after
+a deploy or scale-out. Compiled templates are stored as bytecode files in
+TEMPLATE_CACHE_DIR, normally built once at deploy time by build_static.py,
+and loaded from there by every worker.
+
+The cache directory may be shared read-only: files are only ever written
+atomically (temp file + rename), a worker that can't write simply keeps its
+compiled templates in memory, and every bytecode file is keyed by the
+template's source checksum and the Python version, so an edited template or
+a different interpreter never loads stale bytecode.
+
+Settings (environment):
+  TEMPLATE_CACHE_DIR  bytecode directory (default template_cache/ next to app.py, empty to disable)
+  TEMPLATE_PRELOAD    load every template at startup instead of on first render (default 1)
+"""
+import os
+import tempfile
+import threading
+import time
+
+from jinja2 import BaseLoader, FileSystemBytecodeCache
+
+import app_logging
+
+TEMPLATE_CACHE_DIR = os.getenv(
+    'TEMPLATE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template_cache')
+)
+TEMPLATE_PRELOAD = os.getenv('TEMPLATE_PRELOAD', '1') == '1'
+
+log = app_logging.get_logger('template_cache')
+
+# Template name -> timings of its (last) load in this worker
+_timings = {}
+_timings_lock = threading.Lock()
+
+class SharedBytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache that tolerates a read-only or missing directory"""
+    def __init__(self, directory):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            pass
+        super().__init__(directory, '%s.jinja.cache')
+        self.writable = True
+
+    def dump_bytecode(self, bucket):
+        if not self.writable:
+            return
+        name = self._get_cache_filename(bucket)
+        try:
+            # Write under a temporary name and rename, so other workers never see a partial file
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    bucket.write_bytecode(f)
+                os.chmod(tmp_name, 0o644)
+                os.replace(tmp_name, name)
+            except BaseException:
+                try:
+                    os.remove(tmp_name)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            self.writable = False
+            log.info("Template bytecode cache %s is read-only (%s) - compiled templates stay in memory",
+                     self.directory, e)
+
+class TimedLoader(BaseLoader):
+    """
+    Wraps the app's template loader and records, per template, how long the
+    source lookup, bytecode cache read and compile took.
+    """
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_source(self, environment, template):
+        return self.loader.get_source(environment, template)
+
+    def list_templates(self):
+        return self.loader.list_templates()
+
+    def load(self, environment, name, globals=None):
+        # Same steps as BaseLoader.load, with a timer around each one
+        started = time.perf_counter()
+        source, filename, uptodate = self.get_source(environment, name)
+        looked_up = time.perf_counter()
+
+        code = None
+        bcc = environment.bytecode_cache
+        if bcc is not None:
+            bucket = bcc.get_bucket(environment, name, filename, source)
+            code = bucket.code
+        bytecode = 'off' if bcc is None else ('hit' if code is not None else 'miss')
+        cache_read = time.perf_counter()
+
+        if code is None:
+            code = environment.compile(source, name, filename)
+            if bcc is not None:
+                bucket.code = code
+                bcc.set_bucket(bucket)
+        compiled = time.perf_counter()
+
+        template = environment.template_class.from_code(environment, code, globals or {}, uptodate)
+        with _timings_lock:
+            _timings[name] = {
+                'template': name,
+                'bytecode': bytecode,
+                'lookup_ms': round((looked_up - started) * 1000, 3),
+                'cache_read_ms': round((cache_read - looked_up) * 1000, 3),
+                'compile_ms': round((compiled - cache_read) * 1000, 3) if bytecode != 'hit' else 0.0,
+                'total_ms': round((time.perf_counter() - started) * 1000, 3)
+            }
+        return template
+
+def timings():
+    with _timings_lock:
+        return [dict(_timings[name]) for name in sorted(_timings)]
+
+def preload(app):
+    """Load (and compile if needed) every template now instead of on its first render"""
+    env = app.jinja_env
+    started = time.perf_counter()
+    errors = {}
+    for name in env.list_templates(extensions=['html']):
+        try:
+            env.get_template(name)
+        except Exception as e:
+            errors[name] = str(e)
+            log.error("Error preloading template %s: %s", name, e)
+    elapsed = time.perf_counter() - started
+    log_report(elapsed)
+    return errors
+
+def precompile(app):
+    """Deploy-time build: compile every template into the bytecode cache from scratch"""
+    env = app.jinja_env
+    if env.bytecode_cache is None:
+        raise RuntimeError('TEMPLATE_CACHE_DIR is empty - the bytecode cache is disabled')
+    env.bytecode_cache.clear()
+    env.cache.clear()
+    with _timings_lock:
+        _timings.clear()
+    return preload(app)
+
+def log_report(elapsed):
+    rows = timings()
+    hits = sum(1 for row in rows if row['bytecode'] == 'hit')
+    log.info(
+        "Loaded %s templates in %.1f ms (%s from bytecode cache, %s compiled): lookup %.1f ms, compile %.1f ms",
+        len(rows), elapsed * 1000, hits, len(rows) - hits,
+        sum(row['lookup_ms'] for row in rows), sum(row['compile_ms'] for row in rows),
+        extra={'templates': rows}
+    )
+
+def init_app(app):
+    """Install the bytecode cache and the timing loader; call before the first render"""
+    env = app.jinja_env
+    if TEMPLATE_CACHE_DIR:
+        env.bytecode_cache = SharedBytecodeCache(TEMPLATE_CACHE_DIR)
+    env.loader = TimedLoader(env.loader)
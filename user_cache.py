@@ -0,0 +1,120 @@
+"""
+Two-layer cache for get_user_by_email().
+
+A single start_quiz -> submit_quiz -> quiz_results flow looks the same
+student up several times, each a MySQL round trip (or a users.txt parse
+without a database). Lookups now go through:
+
+  1. a per-request memo (flask.g) - repeated lookups within one request
+  2. a per-worker LRU of USER_CACHE_SIZE users, each kept USER_CACHE_TTL
+     seconds
+
+Writers call invalidate(email) after changing an account (update_user,
+delete_user, create_user, create_teacher, password and username changes),
+which drops it from both layers of this worker. Other workers can serve
+the old record for up to USER_CACHE_TTL seconds, so keep it short. Unknown
+emails are never cached in the LRU, so a new signup is visible to every
+worker straight away.
+
+Hits and misses per layer are counted in quiz_user_cache_requests_total and
+the worker's LRU hit ratio is reported as quiz_user_cache_hit_ratio.
+
+Settings (environment):
+  USER_CACHE       1 (default) to cache, 0 to look every user up
+  USER_CACHE_TTL   seconds a user stays in the worker cache (default 30)
+  USER_CACHE_SIZE  users kept per worker (default 5000)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+import metrics
+
+USER_CACHE = os.getenv('USER_CACHE', '1') == '1'
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '5000'))
+
+_lock = threading.Lock()
+_users = OrderedDict()  # email -> (expires at, user)
+_hits = 0
+_misses = 0
+_generation = 0  # Bumped by invalidate(), so a lookup racing with a write isn't cached
+
+def _count(layer, result):
+    metrics.registry.inc_counter('quiz_user_cache_requests_total', 'User lookups by cache layer and result',
+                                 {'layer': layer, 'result': result})
+
+def _report():
+    total = _hits + _misses
+    metrics.registry.set_gauge('quiz_user_cache_hit_ratio', "Share of this worker's user lookups served by its cache",
+                               _hits / total if total else 0.0)
+    metrics.registry.set_gauge('quiz_user_cache_entries', 'Users held in the worker cache', len(_users))
+
+def _memo():
+    if not has_request_context():
+        return None
+    memo = g.get('_user_memo')
+    if memo is None:
+        memo = g._user_memo = {}
+    return memo
+
+def get(email, load):
+    """The user with this email, from the caches or load(email); callers get their own copy"""
+    global _hits, _misses
+    if not USER_CACHE or not email:
+        return load(email)
+    memo = _memo()
+    if memo is not None and email in memo:
+        _count('request', 'hit')
+        user = memo[email]
+        return dict(user) if user else user
+    if memo is not None:
+        _count('request', 'miss')
+
+    now = time.monotonic()
+    with _lock:
+        cached = _users.get(email)
+        if cached is not None and cached[0] > now:
+            _users.move_to_end(email)
+            _hits += 1
+            user = cached[1]
+        else:
+            _misses += 1
+            user = None
+        generation = _generation
+        _report()
+    if user is not None:
+        _count('worker', 'hit')
+    else:
+        _count('worker', 'miss')
+        user = load(email)
+        if user:
+            with _lock:
+                if generation != _generation:
+                    return dict(user)
+                _users[email] = (now + USER_CACHE_TTL, user)
+                _users.move_to_end(email)
+                while len(_users) > USER_CACHE_SIZE:
+                    _users.popitem(last=False)
+    if memo is not None:
+        memo[email] = user
+    return dict(user) if user else user
+
+def invalidate(email=None):
+    """Forget one user (or everyone) in this worker - call after writing an account"""
+    global _generation
+    memo = _memo()
+    with _lock:
+        _generation += 1
+        if email is None:
+            _users.clear()
+        else:
+            _users.pop(email, None)
+    if memo is not None:
+        if email is None:
+            memo.clear()
+        else:
+            memo.pop(email, None)
@@ -0,0 +1,312 @@
+"""
+Email-indexed users.txt.
+
+users.txt stays one JSON object (email -> user record), so load_users() and
+every tool that reads it keep working, but it is written one user per line:
+
+  {
+  "a@school.edu": {"username": "a", ..., "quiz_history": [...]},
+  "b@school.edu": {...}
+  }
+
+Next to it, users.txt.idx records the byte offset and length of every
+user's record together with the users.txt it belongs to (inode, size,
+mtime). get() looks the email up in the index and reads and parses only
+that record - a login no longer parses every student's quiz history.
+
+The index also maps every quiz id to the emails with that quiz in their
+quiz_history. quiz_emails() answers "who attempted this quiz" without a
+scan, and update() rewrites just those users' records - everyone else's
+bytes are copied over unparsed - so resetting a quiz costs its attempts,
+not the whole user base.
+
+Every save() rewrites the file (write to a temp file, then rename) and
+rebuilds the index in the same pass. When the index doesn't match users.txt
+(written by an older version, edited by hand), it is rebuilt by scanning
+the lines, and a file not in the one-user-per-line layout is compacted
+into it first. Workers keep the parsed index in memory until users.txt
+changes.
+
+Read-modify-write cycles (load_users() -> change -> save_users()) run
+inside locked(): a thread lock plus an flock on users.txt.lock, so two
+submits - in the same worker or in two - can no longer both read the old
+file and the second save drop the first one's attempt. save() and update()
+take the lock themselves; it is reentrant within a thread.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+import app_logging
+import json_codec
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Unavailable on Windows - writes are only serialized within the process there
+    fcntl = None
+
+INDEX_SUFFIX = '.idx'
+LOCK_SUFFIX = '.lock'
+
+log = app_logging.get_logger('user_store')
+
+_lock = threading.Lock()
+# users.txt path -> (stamp, {'offsets': {email: (offset, length)}, 'quizzes': {quiz_id: [email, ...]}})
+_indexes = {}
+
+# Serializes users.txt writers: the thread lock within a worker, the flock across workers
+_write_lock = threading.RLock()
+_held = threading.local()
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold the users.txt write lock; wrap every read-modify-write of the file in it"""
+    with _write_lock:
+        depth = getattr(_held, 'depth', 0)
+        _held.depth = depth + 1
+        fd = None
+        try:
+            # Only the outermost holder takes the flock - a second flock from this process would wait on the first
+            if depth == 0 and fcntl is not None:
+                fd = os.open(path + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)  # Releases the flock
+            _held.depth = depth
+
+def _stamp(st):
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+def _tmp_path(path):
+    # Unique per writer, so two threads saving at once never write into the same temp file
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+def _quiz_ids(user):
+    return {entry.get('quiz_id') for entry in user.get('quiz_history') or []
+            if isinstance(entry, dict) and entry.get('quiz_id')}
+
+def _encode(user):
+    return json_codec.dumpb(user)
+
+def _set_index(path, stamp, offsets, quizzes):
+    index = {'offsets': offsets, 'quizzes': quizzes}
+    tmp_path = _tmp_path(path + INDEX_SUFFIX)
+    with open(tmp_path, 'wb') as f:
+        f.write(json_codec.dumpb(dict(index, stamp=stamp)))
+    os.replace(tmp_path, path + INDEX_SUFFIX)
+    with _lock:
+        _indexes[path] = (stamp, index)
+
+def _write(path, records, quizzes):
+    """Write (email, encoded record) pairs in order plus their index; returns the bytes written"""
+    parts = [b'{\n']
+    position = 2
+    offsets = {}
+    last = len(records) - 1
+    for i, (email, record) in enumerate(records):
+        key = json.dumps(email).encode('utf-8') + b': '
+        offsets[email] = (position + len(key), len(record))
+        line = key + record + (b',\n' if i < last else b'\n')
+        parts.append(line)
+        position += len(line)
+    parts.append(b'}\n')
+    data = b''.join(parts)
+
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        stamp = _stamp(os.fstat(f.fileno()))
+    # Replaced, not rewritten in place, so readers never see a half-written file
+    os.replace(tmp_path, path)
+    _set_index(path, stamp, offsets, quizzes)
+    return len(data)
+
+def save(path, users):
+    """Write every user (one per line) and its index"""
+    started = time.perf_counter()
+    records = []
+    quizzes = {}
+    for email, user in users.items():
+        records.append((email, _encode(user)))
+        for quiz_id in _quiz_ids(user):
+            quizzes.setdefault(quiz_id, []).append(email)
+    with locked(path):
+        nbytes = _write(path, records, quizzes)
+    metrics.record_file_write(nbytes, time.perf_counter() - started)
+
+def _key_matches(data, email, location):
+    key = json.dumps(email).encode('utf-8') + b': '
+    return data[location[0] - len(key):location[0]] == key
+
+def update(path, changed):
+    """
+    Replace (or add) the records of the users in `changed`, copying every
+    other record's bytes as they are
+    """
+    with locked(path):
+        _update(path, changed)
+
+def _update(path, changed):
+    started = time.perf_counter()
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        save(path, changed)
+        return
+    with f:
+        data = f.read()
+        index = _index(path, _stamp(os.fstat(f.fileno())))
+    if index is not None and not all(_key_matches(data, email, index['offsets'][email])
+                                     for email in changed if email in index['offsets']):
+        index = None  # Stamped for another file saved within the same mtime tick (see get())
+    if index is None:
+        # Not indexed yet - the full rewrite indexes it
+        users = json_codec.loads(data or b'{}')
+        users.update(changed)
+        save(path, users)
+        return
+    metrics.record_file_read(len(data), time.perf_counter() - started)
+
+    quizzes = {quiz_id: set(emails) for quiz_id, emails in index['quizzes'].items()}
+    records = []
+    for email, (offset, length) in sorted(index['offsets'].items(), key=lambda item: item[1][0]):
+        record = data[offset:offset + length]
+        if email in changed:
+            for quiz_id in _quiz_ids(json_codec.loads(record)):
+                quizzes.get(quiz_id, set()).discard(email)
+            record = _encode(changed[email])
+            for quiz_id in _quiz_ids(changed[email]):
+                quizzes.setdefault(quiz_id, set()).add(email)
+        records.append((email, record))
+    for email, user in changed.items():
+        if email not in index['offsets']:
+            records.append((email, _encode(user)))
+            for quiz_id in _quiz_ids(user):
+                quizzes.setdefault(quiz_id, set()).add(email)
+    nbytes = _write(path, records, {quiz_id: sorted(emails) for quiz_id, emails in quizzes.items() if emails})
+    metrics.record_file_write(nbytes, time.perf_counter() - started)
+
+def _scan(data):
+    """The index of a one-user-per-line file, None if it isn't in that layout"""
+    decoder = json.JSONDecoder()
+    offsets = {}
+    quizzes = {}
+    lines = data.split(b'\n')
+    if lines[0] != b'{' or lines[-1] != b'':
+        return None
+    position = len(lines[0]) + 1
+    for line in lines[1:-1]:
+        if line != b'}':
+            if not line.startswith(b'"'):
+                return None
+            text = line.decode('utf-8')
+            try:
+                email, key_end = decoder.raw_decode(text)
+            except ValueError:
+                return None
+            key_length = len(text[:key_end].encode('utf-8'))
+            record = line[key_length:]
+            if record.endswith(b','):
+                record = record[:-1]
+            if not record.startswith(b': {') or not record.endswith(b'}'):
+                return None
+            offsets[email] = (position + key_length + 2, len(record) - 2)
+            try:
+                for quiz_id in _quiz_ids(json_codec.loads(record[2:])):
+                    quizzes.setdefault(quiz_id, []).append(email)
+            except ValueError:
+                return None
+        position += len(line) + 1
+    return offsets, quizzes
+
+def rebuild_index(path):
+    """Index users.txt again, compacting it into the one-user-per-line layout if needed"""
+    with open(path, 'rb') as f:
+        data = f.read()
+        stamp = _stamp(os.fstat(f.fileno()))
+    scanned = _scan(data)
+    if scanned is None:
+        log.info("Compacting %s into one user per line", path)
+        save(path, json_codec.loads(data or b'{}'))
+        return
+    _set_index(path, stamp, *scanned)
+
+def _index(path, stamp):
+    cached = _indexes.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path + INDEX_SUFFIX, 'rb') as f:
+            index = json_codec.loads(f.read())
+        if index.pop('stamp', None) == stamp and 'quizzes' in index:
+            with _lock:
+                _indexes[path] = (stamp, index)
+            return index
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _current_index(path):
+    """The index of users.txt as it is now, rebuilt if it is missing or stale (None without users.txt)"""
+    for attempt in range(2):
+        try:
+            stamp = _stamp(os.stat(path))
+        except OSError:
+            return None
+        index = _index(path, stamp)
+        if index is not None:
+            return index
+        if attempt == 0:
+            try:
+                rebuild_index(path)
+            except (OSError, ValueError) as e:
+                log.error("Error indexing %s: %s", path, e)
+                return None
+    return None
+
+def get(path, email):
+    """One user's record (None if there is none), reading only that record"""
+    started = time.perf_counter()
+    for attempt in range(2):
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+        with f:
+            # The open file is the version the index has to match, even if users.txt is replaced meanwhile
+            index = _index(path, _stamp(os.fstat(f.fileno())))
+            if index is not None:
+                location = index['offsets'].get(email)
+                if location is None:
+                    return None
+                # Read the key too: an index stamped for a file saved within the same mtime tick
+                # (same inode number reused, same size) shows up as a key mismatch
+                key = json.dumps(email).encode('utf-8') + b': '
+                f.seek(location[0] - len(key))
+                data = f.read(len(key) + location[1])
+                if data.startswith(key) and data.endswith(b'}'):
+                    metrics.record_file_read(len(data), time.perf_counter() - started)
+                    return json_codec.loads(data[len(key):])
+        if attempt == 0:
+            try:
+                rebuild_index(path)
+            except (OSError, ValueError) as e:
+                log.error("Error indexing %s: %s", path, e)
+                return None
+    return None
+
+def emails(path):
+    """Every email in users.txt, from the index"""
+    index = _current_index(path)
+    return set(index['offsets']) if index else set()
+
+def quiz_emails(path, quiz_id):
+    """Emails of the users with an attempt at quiz_id in their quiz_history"""
+    index = _current_index(path)
+    return list(index['quizzes'].get(quiz_id, [])) if index else []